@@ -0,0 +1,92 @@
+"""
+Compress and decompress bytes in memory, to use convpress as a library.
+Every call has its own Convpress, ByteGenerator and random number generator,
+prints nothing and doesn't touch any file,
+so calls can run in many threads at once.
+"""
+
+import io
+import random
+
+from arguments import compress_args_error, compress_parser
+from classes.ByteGenerator import ByteGenerator
+from classes.Convpress import Convpress, RepetitionPenaltyType, UnexpectedHeaderFormat
+from classes.Metrics import Metrics
+from classes.TimeBudget import TimeBudget
+from convpress import run_passes
+from utils.block_stream import STREAM_MARKER, read_block_frames, read_stream_header
+
+# options of convpress.py that are about files, not about how the data is compressed
+UNSUPPORTED_PARAMS = ["stream", "block_size", "sample_size", "metrics", "profile",
+                      "checkpoint", "checkpoint_every", "checkpoint_seconds", "resume"]
+
+
+def compress_args(params: dict):
+    """
+    the compression arguments: the defaults of convpress.py
+    with the params (named like its long options, ps=50, g=10, until_no_gain=True...) set
+    """
+    args = compress_parser(with_files=False).parse_args([])
+    for name, value in params.items():
+        if name in UNSUPPORTED_PARAMS or not hasattr(args, name):
+            raise TypeError(f"compress_bytes() got an unexpected parameter '{name}'")
+        setattr(args, name, value)
+    error = compress_args_error(args)
+    if error is not None:
+        raise ValueError(error)
+    return args
+
+
+def compress_bytes(data: bytes, seed: int = None, **params) -> bytes:
+    """
+    Compress the data like convpress.py would and return the whole compressed file.
+    The params are convpress.py's options (ps=50, g=10, passes=2, time_budget=5.0...),
+    the same seed with the same params gives the same output.
+    """
+    args = compress_args(params)
+    time_budget = TimeBudget(args.time_budget)
+
+    convpress = Convpress(ByteGenerator("latin1"))
+    convpress.set_verbose(False)
+    convpress.set_rng(random.Random(seed))
+    convpress.set_repetition_penalty_type(RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS)
+    convpress.set_match_cache_size(args.mcs)
+
+    convpress.set_workers(args.workers)
+    try:
+        convpress.load_bytelist_for_compression(bytearray(data))
+        header = run_passes(convpress, args, Metrics(), time_budget)
+    finally:
+        convpress.close()
+
+    return header + bytes(convpress.get_bytelist())
+
+
+def decompress_bytes(blob: bytes, all_layers: bool = True) -> bytes:
+    """
+    Decompress a whole compressed file (or block stream) held in memory,
+    with all_layers every layer its (version 2) headers say was stacked on another.
+    Layers aren't guessed, so data under a header that isn't flagged as nested
+    is never taken for another layer.
+    Raises UnexpectedHeaderFormat if it isn't valid.
+    """
+    convpress = Convpress(ByteGenerator("latin1"))
+    convpress.set_verbose(False)
+
+    if bytes(blob[:len(STREAM_MARKER)]) == STREAM_MARKER:
+        stream = io.BytesIO(blob)
+        try:
+            header = read_stream_header(stream)
+        except ValueError as exception:
+            raise UnexpectedHeaderFormat(str(exception)) from exception
+        convpress.load_bytelist_for_decompression(memoryview(header))
+        frames = read_block_frames(
+            stream, number_of_filters=len(convpress.get_decompress_filters()))
+        return b"".join(convpress.decompress_blocks(frames))
+
+    convpress.load_bytelist_for_decompression(memoryview(blob))
+    if all_layers:
+        convpress.decompress_all_layers(guess_layers=False)
+    else:
+        convpress.decompress()
+    return bytes(convpress.get_bytelist())
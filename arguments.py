@@ -1,16 +1,23 @@
 """
-command line arguments for compression and decompression
+command line arguments for compression, decompression, benchmarking and the server
 """
 
 import argparse
+import json
 
 
-def parse_args_compress():
-    """command line arguments for compression"""
+def compress_parser(with_files: bool = True) -> argparse.ArgumentParser:
+    """
+    parser of the compression arguments
+    (without the input and output files, parsing nothing gives the defaults)
+    """
     parser = argparse.ArgumentParser(
         description='Compress a file using ConvPress.')
-    parser.add_argument('input_file', type=argparse.FileType('rb'))
-    parser.add_argument('output_file', type=argparse.FileType('wb'))
+    if with_files:
+        parser.add_argument('input_file', type=argparse.FileType('rb'),
+                            help='file to compress, - for stdin')
+        parser.add_argument('output_file', type=str,
+                            help='compressed file, - for stdout')
     parser.add_argument('--ps', '--population_size', type=int,
                         default=75, help='max number of filters in each generation (default is 75)'
                         )
@@ -29,17 +36,207 @@ def parse_args_compress():
     parser.add_argument('--scp', '--survival_chance_percentage', type=float,
                         default=0.5, help='percentage (between 0 and 1.0) of filters that survive in each generation (based on their scores). ex: 0.40 (default is 0.5)',
                         )
-    return parser.parse_args()
+    parser.add_argument('--mcs', '--match_cache_size', type=int,
+                        default=4096, help='how many kernels have their matches cached between generations, 0 disables the cache (default is 4096)',
+                        )
+    parser.add_argument('--workers', type=int,
+                        default=1, help='how many processes convolve the filters of each generation, and compress the blocks with --stream (default is 1)',
+                        )
+    parser.add_argument('--suffix_index', action='store_true',
+                        help='index the input with a suffix array so rare kernels are found without scanning the whole input (building it peaks at about 25 bytes of memory per input byte and takes around 1.5 seconds per MB, the index then keeps 5 bytes per input byte)',
+                        )
+    parser.add_argument('--seed_strategy', '--seed-strategy', choices=['random', 'ngram'],
+                        default='random', help='how the first generation is created: random bytes from the input, or the most frequent n-grams and gapped n-grams of the input (default is random)',
+                        )
+    parser.add_argument('--srp', '--seed_random_percentage', type=float,
+                        default=0.2, help='percentage (between 0 and 1.0) of random filters mixed into the first generation when seeding with n-grams. ex: 0.3 (default is 0.2)',
+                        )
+    parser.add_argument('--stream', action='store_true',
+                        help='find the filters on a sample from the start of the input, then compress block by block, so memory use doesn\'t grow with the input size',
+                        )
+    parser.add_argument('--block_size', '--block-size', type=int,
+                        default=1048576, help='bytes read and compressed at a time with --stream (default is 1048576)',
+                        )
+    parser.add_argument('--sample_size', '--sample-size', type=int,
+                        default=1048576, help='bytes from the start of the input the filters are found on with --stream (default is 1048576)',
+                        )
+    parser.add_argument('--passes', type=int,
+                        default=None, help='how many times the output is compressed again in memory, each pass stacking its header on the previous output (default is 1, or no limit with --until_no_gain)',
+                        )
+    parser.add_argument('--until_no_gain', '--until-no-gain', action='store_true',
+                        help='keep compressing the output again until a pass doesn\'t make it smaller (the last pass is then discarded)',
+                        )
+    parser.add_argument('--patience', type=int,
+                        default=None, help='stop the generations early when the best score hasn\'t improved by more than --min_delta in this many generations (default is to run them all)',
+                        )
+    parser.add_argument('--min_delta', '--min-delta', type=float,
+                        default=0.0, help='how much the best score has to go up to count as an improvement for --patience (default is 0.0)',
+                        )
+    parser.add_argument('--time_budget', '--time-budget', type=float,
+                        default=None, help='seconds the whole run has to fit in: the generations (and passes) stop when another one wouldn\'t leave time to compress and write the output (not with --stream)',
+                        )
+    parser.add_argument('--checkpoint', type=str,
+                        default=None, help='file the state of the genetic algorithm is saved to during the generations, to --resume from if the run is stopped',
+                        )
+    parser.add_argument('--checkpoint_every', '--checkpoint-every', type=int,
+                        default=None, help='save a checkpoint every this many generations (default is every generation, unless --checkpoint_seconds is given)',
+                        )
+    parser.add_argument('--checkpoint_seconds', '--checkpoint-seconds', type=float,
+                        default=None, help='save a checkpoint when this many seconds passed since the last one',
+                        )
+    parser.add_argument('--resume', type=str,
+                        default=None, help='continue the generations from a checkpoint made from the same input (with the same options)',
+                        )
+    parser.add_argument('--metrics', type=str,
+                        default=None, help='file the time of each phase (load, convolve, score, selection, reproduce, mutation, compress, header, write) and the counters are written to, as JSON lines',
+                        )
+    parser.add_argument('--profile', type=str, nargs='?', const='convpress-profile',
+                        default=None, help='profile each phase with cProfile and dump the stats to PROFILE.<phase>.prof (default prefix is convpress-profile)',
+                        )
+    return parser
+
+
+def compress_args_error(args) -> str:
+    """what's wrong with a combination of compression arguments (None if nothing)"""
+    if args.passes is not None and args.passes < 1:
+        return "--passes must be at least 1"
+    if args.stream and (args.passes is not None or args.until_no_gain):
+        return "--stream can't be combined with --passes or --until_no_gain"
+    if args.block_size < 1 or args.sample_size < 1:
+        return "--block_size and --sample_size must be at least 1"
+    if args.stream and args.time_budget is not None:
+        return "--stream can't be combined with --time_budget"
+    if args.time_budget is not None and args.time_budget <= 0:
+        return "--time_budget must be more than 0"
+    if args.patience is not None and args.patience < 1:
+        return "--patience must be at least 1"
+    if (args.checkpoint is not None or args.resume is not None) and \
+            (args.stream or args.passes is not None or args.until_no_gain):
+        return "--checkpoint and --resume can't be combined with --stream, --passes or --until_no_gain"
+    if args.checkpoint_every is not None and args.checkpoint_every < 1:
+        return "--checkpoint_every must be at least 1"
+    return None
+
+
+def parse_args_compress(args_list: list = None):
+    """command line arguments for compression (from sys.argv, or from args_list if given)"""
+    parser = compress_parser()
+    args = parser.parse_args(args_list)
+    error = compress_args_error(args)
+    if error is not None:
+        parser.error(error)
+    return args
+
+
+def byte_range(text: str):
+    """parse START:END (END excluded, either can be left out) into (start, end or None)"""
+    try:
+        start_text, end_text = text.split(":")
+        start = int(start_text) if start_text else 0
+        end = int(end_text) if end_text else None
+    except ValueError as exception:
+        raise argparse.ArgumentTypeError(f"'{text}' isn't START:END") from exception
+    if start < 0 or (end is not None and end < start):
+        raise argparse.ArgumentTypeError(f"'{text}' isn't a valid range")
+    return start, end
 
 
 def parse_args_decompress():
     """command line arguments for decompression"""
     parser = argparse.ArgumentParser(
         description='Decompress a file using ConvPress.')
-    parser.add_argument('input_file', type=argparse.FileType('rb'))
-    parser.add_argument('output_file', type=argparse.FileType('wb'))
+    parser.add_argument('input_file', type=argparse.FileType('rb'),
+                        help='compressed file (a block stream is detected), - for stdin')
+    parser.add_argument('output_file', type=str,
+                        help='decompressed file, - for stdout')
+    parser.add_argument('--workers', type=int,
+                        default=1, help='how many processes decompress the blocks of a block stream (default is 1)',
+                        )
+    parser.add_argument('--range', type=byte_range,
+                        default=None, help='only decompress the original bytes from START up to END (excluded), ex: 1000:2000. Block streams only read the blocks that hold them',
+                        )
+    parser.add_argument('--all_layers', '--all-layers', action='store_true',
+                        help='if the file was compressed more than once, keep decompressing in memory until the original data comes out (passes stacked in one run are flagged in their headers. A file recompressed by another run is unwound when it has a version 2 header and decompresses to exactly the original length that header holds. For version 1 headers it\'s a guess: data that starts like one is unwound too)',
+                        )
+    return parser.parse_args()
+
+
+def parse_args_benchmark():
+    """command line arguments for the benchmark"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark ConvPress on synthetic data.')
+    parser.add_argument('--seed', type=int,
+                        default=0, help='seed for the synthetic data and the genetic algorithm, same seed same run (default is 0)',
+                        )
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[65536, 262144, 1048576], help='sizes in bytes of the synthetic data (default is 65536 262144 1048576)',
+                        )
+    parser.add_argument('--corpora', nargs='+', choices=['repetitive', 'text', 'random'],
+                        default=['repetitive', 'text', 'random'], help='kinds of synthetic data, from low to high entropy (default is all of them)',
+                        )
+    parser.add_argument('--ps', '--population_size', type=int,
+                        default=30, help='number of filters convolved and scored, and population size of the end to end run (default is 30)',
+                        )
+    parser.add_argument('--g', '--generations', type=int,
+                        default=5, help='generations of the end to end run (default is 5)',
+                        )
+    parser.add_argument('--repeat', type=int,
+                        default=3, help='how many times each step is timed, the fastest time is kept (default is 3)',
+                        )
+    parser.add_argument('--output', type=str,
+                        default='-', help='json file for the results, - for stdout (default is -)',
+                        )
     return parser.parse_args()
 
 
+def parse_args_server():
+    """command line arguments for the compression server"""
+    parser = argparse.ArgumentParser(
+        description='Serve ConvPress compression and decompression on a unix socket, with worker processes kept warm.')
+    parser.add_argument('--socket', type=str,
+                        default='/tmp/convpress.sock', help='path of the unix socket to listen on (default is /tmp/convpress.sock)',
+                        )
+    parser.add_argument('--workers', type=int,
+                        default=2, help='how many worker processes run the jobs (default is 2)',
+                        )
+    parser.add_argument('--max_pending', '--max-pending', type=int,
+                        default=16, help='jobs queued or running at most, more are refused as busy (default is 16)',
+                        )
+    parser.add_argument('--max_size', '--max-size', type=int,
+                        default=268435456, help='largest payload accepted, in bytes (default is 268435456)',
+                        )
+    args = parser.parse_args()
+    if args.workers < 1 or args.max_pending < 1:
+        parser.error("--workers and --max_pending must be at least 1")
+    return args
+
+
+def parse_args_client():
+    """command line arguments for the client of the compression server"""
+    parser = argparse.ArgumentParser(
+        description='Compress or decompress a file with a running ConvPress server.')
+    parser.add_argument('operation', choices=['compress', 'decompress', 'stats', 'shutdown'],
+                        help='what the server should do')
+    parser.add_argument('input_file', type=argparse.FileType('rb'), nargs='?',
+                        help='file to compress or decompress, - for stdin')
+    parser.add_argument('output_file', type=str, nargs='?',
+                        help='output file, - for stdout')
+    parser.add_argument('--socket', type=str,
+                        default='/tmp/convpress.sock', help='path of the server\'s unix socket (default is /tmp/convpress.sock)',
+                        )
+    parser.add_argument('--params', type=json.loads,
+                        default={}, help='parameters of the job as json, like convpress.py\'s options for compress, ex: \'{"seed": 1, "ps": 50, "g": 10}\'',
+                        )
+    parser.add_argument('--timeout', type=float,
+                        default=None, help='seconds to wait for the server (default is to wait as long as it takes)',
+                        )
+    args = parser.parse_args()
+    if args.operation in ['compress', 'decompress'] and args.output_file is None:
+        parser.error(f"{args.operation} needs an input_file and an output_file")
+    if not isinstance(args.params, dict):
+        parser.error("--params must be a json object")
+    return args
+
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the hot paths of convpress on synthetic data, with results as json.
+The same seed gives the same data and the same genetic algorithm run.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+
+import numpy as np
+
+from arguments import parse_args_benchmark, parse_args_compress
+from classes.ByteGenerator import ByteGenerator
+from classes.Convpress import Convpress
+from classes.ConvGeneticAlgorithm import ConvGeneticAlgorithm
+from classes.Metrics import Metrics
+from classes.TimeBudget import TimeBudget
+from convpress import compress_pass, seed_population
+from utils.benchmark import (baselines, byte_entropy, make_corpus, measure,
+                             scaling_exponent, throughput)
+from utils.streaming import write_output
+
+STEPS = ["convolve_all", "calculate_generation_score", "compress", "decompress", "end_to_end"]
+
+
+def loaded_convpress(data: bytes) -> Convpress:
+    """a Convpress with the data loaded and the match cache off, so every run does the work"""
+    convpress = Convpress(ByteGenerator("latin1"))
+    convpress.set_match_cache_size(0)
+    convpress.load_bytelist_for_compression(bytearray(data))
+    return convpress
+
+
+def benchmark_corpus(data: bytes, seed: int, compress_args, repeat: int):
+    """time every step on one piece of data, returns the steps and the compression ratio"""
+
+    def population():
+        random.seed(seed)
+        genetic_algorithm = ConvGeneticAlgorithm()
+        seed_population(loaded_convpress(data), genetic_algorithm, compress_args)
+        return genetic_algorithm.get_population()
+
+    filters = population()
+
+    def convolved():
+        convpress = loaded_convpress(data)
+        convpress.convolve_all(filters)
+        return convpress
+
+    # compress sets the code of each filter, so every run gets its own filters,
+    # built in the setup so only compress and the header are timed
+    def loaded_with_filters():
+        return loaded_convpress(data), population()
+
+    def compressed(convpress_and_filters) -> bytes:
+        convpress, filters_to_use = convpress_and_filters
+        used_filters = convpress.compress(filters_to_use=filters_to_use)
+        return convpress.generate_header(used_filters=used_filters) + bytes(convpress.get_bytelist())
+
+    compressed_data = compressed(loaded_with_filters())
+
+    def loaded_for_decompression():
+        convpress = Convpress(ByteGenerator("latin1"))
+        convpress.load_bytelist_for_decompression(memoryview(compressed_data))
+        return convpress
+
+    def seeded_convpress():
+        random.seed(seed)
+        return loaded_convpress(data)
+
+    def end_to_end(convpress: Convpress) -> bytes:
+        used_filters = compress_pass(convpress, compress_args, Metrics(), TimeBudget())
+        return convpress.generate_header(used_filters=used_filters) + bytes(convpress.get_bytelist())
+
+    measured = {
+        "convolve_all": measure(lambda: loaded_convpress(data),
+                                lambda convpress: convpress.convolve_all(filters), repeat),
+        "calculate_generation_score": measure(
+            convolved, lambda convpress: convpress.calculate_generation_score(), repeat),
+        "compress": measure(loaded_with_filters, compressed, repeat),
+        "decompress": measure(loaded_for_decompression,
+                              lambda convpress: convpress.decompress(), repeat),
+        "end_to_end": measure(seeded_convpress, end_to_end, 1),
+    }
+
+    steps = {}
+    for step in STEPS:
+        steps[step] = {
+            "seconds": measured[step]["seconds"],
+            "mb_per_s": throughput(len(data), measured[step]["seconds"]),
+            "peak_memory_bytes": measured[step]["peak_memory_bytes"]
+        }
+    ratio = len(measured["end_to_end"]["result"]) / max(len(data), 1)
+    return steps, ratio
+
+
+def main():
+    """Benchmarks convpress on synthetic data of several sizes and entropies."""
+
+    args = parse_args_benchmark()
+    compress_args = parse_args_compress(
+        ["-", "-", "--ps", str(args.ps), "--g", str(args.g), "--mcs", "0"])
+
+    results = {
+        "seed": args.seed,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "settings": {
+            "sizes": args.sizes,
+            "corpora": args.corpora,
+            "population_size": args.ps,
+            "generations": args.g,
+            "repeat": args.repeat
+        },
+        "runs": [],
+        "scaling_exponents": {}
+    }
+
+    for corpus in args.corpora:
+        for size in sorted(args.sizes):
+            print(f"{corpus} {size} bytes", file=sys.stderr)
+            data = make_corpus(corpus, size, args.seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                steps, ratio = benchmark_corpus(data, args.seed, compress_args, args.repeat)
+            baseline_results = baselines(data, args.repeat)
+            results["runs"].append({
+                "corpus": corpus,
+                "size": size,
+                "entropy_bits_per_byte": byte_entropy(data),
+                "steps": steps,
+                "compression_ratio": {
+                    "convpress": ratio,
+                    "zlib": baseline_results["zlib"]["ratio"],
+                    "lzma": baseline_results["lzma"]["ratio"]
+                },
+                "baselines": baseline_results
+            })
+
+        corpus_runs = [run for run in results["runs"] if run["corpus"] == corpus]
+        results["scaling_exponents"][corpus] = {
+            step: scaling_exponent([run["size"] for run in corpus_runs],
+                                   [run["steps"][step]["seconds"] for run in corpus_runs])
+            for step in STEPS
+        }
+
+    write_output(args.output, [(json.dumps(results, indent=2) + "\n").encode()])
+
+
+if __name__ == '__main__':
+    main()
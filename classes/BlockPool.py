@@ -0,0 +1,74 @@
+"""
+Pool of processes for compressing and decompressing the blocks of a block stream in parallel
+"""
+from collections import deque
+from multiprocessing import get_context
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from utils.block_stream import compress_block, decompress_block
+
+# filters of the stream each worker process receives once, in _set_filters
+_worker_filters: Tuple[List[bytes], List[bytes], bytes] = None
+
+
+def _set_filters(kernels: List[bytes], codes: List[bytes], wildcard_byte: bytes):
+    """pool initializer: keep the stream's filters in the worker"""
+    global _worker_filters  # pylint: disable=global-statement
+    _worker_filters = (kernels, codes, wildcard_byte)
+
+
+def _compress_block(block: bytes) -> bytes:
+    """compress one block with the stream's filters"""
+    kernels, codes, wildcard_byte = _worker_filters
+    return compress_block(block, kernels, codes, wildcard_byte)
+
+
+def _decompress_frame(frame: Tuple[bytes, bytes]) -> bytearray:
+    """decompress one (mask, compressed block) frame with the stream's filters"""
+    kernels, codes, wildcard_byte = _worker_filters
+    mask, payload = frame
+    return decompress_block(mask, payload, kernels, codes, wildcard_byte)
+
+
+class BlockPool:
+    """
+    Compresses or decompresses the blocks of a stream on all cores,
+    giving the results back in the same order as the blocks.
+    Only a few blocks per worker are in flight at a time,
+    so memory use doesn't grow with the input size.
+    """
+
+    def __init__(self, workers: int, kernels: List[bytes], codes: List[bytes],
+                 wildcard_byte: bytes):
+        self.workers = workers
+        self.max_pending = workers * 2
+        self.pool = get_context().Pool(
+            processes=workers,
+            initializer=_set_filters,
+            initargs=(kernels, codes, wildcard_byte)
+        )
+
+    def map_ordered(self, function: Callable, items: Iterable) -> Iterator:
+        """apply the function to every item in the workers, yielding the results in order"""
+        pending = deque()
+        for item in items:
+            pending.append(self.pool.apply_async(function, (item,)))
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def compress_blocks(self, blocks: Iterable[bytes]) -> Iterator[bytes]:
+        """compressed blocks, ready to be written, in the same order as the blocks"""
+        return self.map_ordered(_compress_block, blocks)
+
+    def decompress_frames(self, frames: Iterable[Tuple[bytes, bytes]]) -> Iterator[bytearray]:
+        """decompressed blocks in the same order as the frames"""
+        return self.map_ordered(_decompress_frame, frames)
+
+    def close(self) -> None:
+        """stop the workers"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
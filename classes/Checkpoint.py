@@ -0,0 +1,89 @@
+"""
+Checkpoint of the genetic algorithm, to resume a run that was stopped
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+import hashlib
+import json
+import zlib
+from typing import List
+
+from utils.file_writing import write_atomically
+
+MARKER = b"cc"
+VERSION = 1
+
+
+class CheckpointMismatch(Exception):
+    """Error for when a checkpoint isn't valid or was made from other data"""
+
+
+@dataclass()
+class Checkpoint:
+    """
+    State of the genetic algorithm at the start of a generation:
+    the population about to be convolved, the scores of the generations before it,
+    the best of those generations, the random number generator state,
+    and the wildcard and fingerprint of the data, to check it's resumed on the same input.
+    Written as "cc" + 1 byte version + zlib compressed json (kernels as latin1 strings).
+    """
+
+    fingerprint: str
+    wildcard_byte: bytes
+    generation: int
+    population: List[bytes] = field(default_factory=list)
+    generation_scores: List[float] = field(default_factory=list)
+    best_generation: int = 0
+    best_population: List[bytes] = field(default_factory=list)
+    rng_state: tuple = None
+
+    @staticmethod
+    def fingerprint_of(data) -> str:
+        """fingerprint of the data being compressed"""
+        return hashlib.sha256(data).hexdigest()
+
+    def to_bytes(self) -> bytes:
+        """the checkpoint as it's written to the file"""
+        version, internal_state, gauss_next = self.rng_state
+        state = {
+            "fingerprint": self.fingerprint,
+            "wildcard_byte": self.wildcard_byte.decode("latin1"),
+            "generation": self.generation,
+            "population": [kernel.decode("latin1") for kernel in self.population],
+            "generation_scores": self.generation_scores,
+            "best_generation": self.best_generation,
+            "best_population": [kernel.decode("latin1") for kernel in self.best_population],
+            "rng_state": [version, list(internal_state), gauss_next]
+        }
+        return MARKER + bytes([VERSION]) + zlib.compress(json.dumps(state).encode("utf-8"), 9)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> Checkpoint:
+        """parse a checkpoint written by to_bytes"""
+        if data[:2] != MARKER or data[2:3] != bytes([VERSION]):
+            raise CheckpointMismatch("Not a checkpoint, or one of another version.")
+        try:
+            state = json.loads(zlib.decompress(data[3:]).decode("utf-8"))
+            version, internal_state, gauss_next = state["rng_state"]
+            return Checkpoint(
+                fingerprint=state["fingerprint"],
+                wildcard_byte=state["wildcard_byte"].encode("latin1"),
+                generation=state["generation"],
+                population=[kernel.encode("latin1") for kernel in state["population"]],
+                generation_scores=state["generation_scores"],
+                best_generation=state["best_generation"],
+                best_population=[kernel.encode("latin1") for kernel in state["best_population"]],
+                rng_state=(version, tuple(internal_state), gauss_next)
+            )
+        except (ValueError, KeyError, TypeError, zlib.error) as exception:
+            raise CheckpointMismatch("Checkpoint is truncated or corrupted.") from exception
+
+    def save(self, path: str) -> None:
+        """write the checkpoint, replacing the previous one only once it's complete"""
+        write_atomically(path, [self.to_bytes()])
+
+    @staticmethod
+    def load(path: str) -> Checkpoint:
+        """read a checkpoint file"""
+        with open(path, "rb") as checkpoint_file:
+            return Checkpoint.from_bytes(checkpoint_file.read())
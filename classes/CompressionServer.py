@@ -0,0 +1,211 @@
+"""
+Server that compresses and decompresses on a pool of processes kept warm between jobs
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+import os
+import time
+from typing import Dict, Tuple
+
+from api import compress_bytes, decompress_bytes
+from classes.ByteGenerator import RanOutOfPossibleBytes
+from classes.Convpress import UnexpectedHeaderFormat
+from utils.server_protocol import (ProtocolError, encode_message, read_header, read_payload,
+                                   read_payload_length)
+
+OPERATIONS = ["compress", "decompress", "stats", "shutdown"]
+
+# jobs whose errors are sent back to the client as they are
+# (anything else is answered as an internal error)
+JOB_ERRORS = (TypeError, ValueError, UnexpectedHeaderFormat, RanOutOfPossibleBytes)
+
+
+def _warm_up() -> int:
+    """run a tiny compression, so the worker has everything loaded before the first job"""
+    data = b"warm up " * 64
+    decompress_bytes(compress_bytes(data, seed=0, ps=4, g=2))
+    return os.getpid()
+
+
+def _run_job(operation: str, payload: bytes, params: Dict) -> Tuple[bytes, int, float]:
+    """run a job in a worker, returns the output, the worker's pid and the seconds it took"""
+    start = time.perf_counter()
+    if operation == "compress":
+        output = compress_bytes(payload, **params)
+    else:
+        output = decompress_bytes(payload, **params)
+    return output, os.getpid(), time.perf_counter() - start
+
+
+class CompressionServer:
+    """
+    Listens on a unix socket for compress and decompress jobs
+    and runs them on a pool of worker processes started (and warmed up) beforehand,
+    so jobs don't pay for starting python and loading numpy.
+    Every connection sends requests one after the other, each answered with the job's stats.
+    At most max_pending jobs are queued or running: past that, jobs are refused as busy
+    (instead of piling up), and payloads over max_size bytes are refused before being read.
+    A job failing any other way gets an internal error, and if a worker died
+    the workers are started again, so the following jobs still run.
+    """
+
+    def __init__(self, workers: int, max_pending: int, max_size: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_size = max_size
+        self.executor: ProcessPoolExecutor = None
+        self.pending = 0
+        self.next_job = 0
+        self.stopping: asyncio.Event = None
+        self.started = time.time()
+        self.totals = {
+            "jobs": 0, "failed": 0, "busy": 0, "too_big": 0,
+            "bytes_in": 0, "bytes_out": 0, "run_seconds": 0.0
+        }
+
+    async def start_workers(self) -> None:
+        """start the worker processes and warm every one of them up"""
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context())
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)])
+
+    async def restart_workers(self, broken_executor: ProcessPoolExecutor) -> None:
+        """
+        replace a pool that lost a worker (once, however many jobs saw it break),
+        the server stops if the new workers can't be started
+        """
+        if self.executor is not broken_executor:
+            return
+        broken_executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            await self.start_workers()
+        except Exception:  # pylint: disable=broad-except
+            self.stopping.set()
+
+    async def serve(self, socket_path: str) -> None:
+        """start the workers, then answer requests on the unix socket until a shutdown request"""
+        self.stopping = asyncio.Event()
+        await self.start_workers()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+        try:
+            async with server:
+                await self.stopping.wait()
+        finally:
+            self.close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def close(self) -> None:
+        """stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def get_stats(self) -> Dict:
+        """totals since the server started, and the jobs queued or running right now"""
+        return {
+            **self.totals,
+            "pending": self.pending,
+            "workers": self.workers,
+            "uptime_seconds": time.time() - self.started
+        }
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """answer the requests of one connection until it's closed"""
+        try:
+            while True:
+                request = await read_header(reader)
+                if request is None:
+                    break
+                payload_length = await read_payload_length(reader)
+                if payload_length > self.max_size:
+                    # the payload isn't read, so the connection can't be used anymore
+                    self.totals["too_big"] += 1
+                    writer.write(encode_message({
+                        "ok": False, "error": "too_big",
+                        "message": f"Payloads are limited to {self.max_size} bytes."
+                    }))
+                    await writer.drain()
+                    break
+                payload = await read_payload(reader, payload_length)
+                answer, output = await self.answer(request, payload)
+                writer.write(encode_message(answer, output))
+                await writer.drain()
+                if self.stopping.is_set():
+                    break
+        except asyncio.CancelledError:
+            # the server is shutting down while the connection waits for a request
+            pass
+        except (ProtocolError, ConnectionError) as exception:
+            try:
+                writer.write(encode_message(
+                    {"ok": False, "error": "protocol", "message": str(exception)}))
+                await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def answer(self, request: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        """the answer to one request and its payload"""
+        operation = request.get("op")
+        params = request.get("params", {})
+        if operation not in OPERATIONS or not isinstance(params, dict):
+            return {"ok": False, "error": "bad_request",
+                    "message": f"op must be one of {', '.join(OPERATIONS)}, params an object."}, b""
+        if operation == "stats":
+            return {"ok": True, "stats": self.get_stats()}, b""
+        if operation == "shutdown":
+            self.stopping.set()
+            return {"ok": True}, b""
+
+        if self.pending >= self.max_pending:
+            self.totals["busy"] += 1
+            return {"ok": False, "error": "busy",
+                    "message": f"{self.pending} jobs are already queued or running."}, b""
+
+        return await self.run_job(operation, payload, params)
+
+    async def run_job(self, operation: str, payload: bytes, params: Dict) -> Tuple[Dict, bytes]:
+        """run a job on the workers, the answer has its stats"""
+        job = self.next_job
+        self.next_job += 1
+        self.pending += 1
+        start = time.perf_counter()
+        executor = self.executor
+        try:
+            output, worker_pid, run_seconds = await asyncio.get_running_loop().run_in_executor(
+                executor, _run_job, operation, payload, params)
+        except JOB_ERRORS as exception:
+            self.totals["failed"] += 1
+            return {"ok": False, "error": type(exception).__name__,
+                    "message": str(exception), "job": job}, b""
+        except Exception as exception:  # pylint: disable=broad-except
+            self.totals["failed"] += 1
+            if isinstance(exception, BrokenProcessPool):
+                await self.restart_workers(executor)
+            return {"ok": False, "error": "internal",
+                    "message": f"{type(exception).__name__}: {exception}", "job": job}, b""
+        finally:
+            self.pending -= 1
+
+        total_seconds = time.perf_counter() - start
+        self.totals["jobs"] += 1
+        self.totals["bytes_in"] += len(payload)
+        self.totals["bytes_out"] += len(output)
+        self.totals["run_seconds"] += run_seconds
+        return {"ok": True, "stats": {
+            "job": job,
+            "op": operation,
+            "input_size": len(payload),
+            "output_size": len(output),
+            "queued_seconds": max(total_seconds - run_seconds, 0.0),
+            "run_seconds": run_seconds,
+            "worker_pid": worker_pid
+        }}, output
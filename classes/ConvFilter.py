@@ -7,7 +7,7 @@ from __future__ import annotations
 import random
 from typing import List
 
-from utils.bytes_operations import bytestring_to_bytelist
+from utils.varint import encode_varint
 
 
 class ConvFilter:
@@ -30,21 +30,23 @@ class ConvFilter:
         """Gets the byte that this filter represents"""
         return self.byte_it_represents
 
-    def randomize_from_list(self, unique_bytelist: list, wildcard_chance: float, wildcard_byte):
+    def randomize_from_list(self, unique_bytelist: list, wildcard_chance: float, wildcard_byte,
+                            rng: random.Random = random):
         """
         Randomize kernel bytes using a list of bytes,
         all indexes (except both ends) have a wildcard_chance
         of receiving a wildcard_byte
+        (rng is the random number generator, the random module by default)
         """
         new_kernel = []
         used_wildcard_once = False
         for kernel_idx in range(self.get_size()):
-            rand_idx = random.randrange(len(unique_bytelist))
+            rand_idx = rng.randrange(len(unique_bytelist))
             byte_to_use = unique_bytelist[rand_idx]
 
             if used_wildcard_once is False:
                 if kernel_idx > 0 and kernel_idx < (self.get_size() - 1):
-                    if random.uniform(0.0, 1.0) < wildcard_chance:
+                    if rng.uniform(0.0, 1.0) < wildcard_chance:
                         byte_to_use = wildcard_byte
                         used_wildcard_once = True
 
@@ -54,13 +56,14 @@ class ConvFilter:
 
     def set_kernel_bytes_using_bytestring(self, bytestring: bytes):
         """set kernel bytes using a bytestring"""
-        self.kernel = bytestring_to_bytelist(bytestring)
+        self.kernel = [bytestring[idx:idx+1] for idx in range(len(bytestring))]
 
-    def crossover(self, other: ConvFilter):
+    def crossover(self, other: ConvFilter, rng: random.Random = random):
         """
         Crossover the information
         between 2 filters
         to create a new one
+        (rng is the random number generator, the random module by default)
         """
 
         new_filter = ConvFilter(self.get_size())
@@ -69,14 +72,14 @@ class ConvFilter:
         random_skip = 0
         size_diff = abs(self.get_size() - other.get_size())
         if size_diff > 0:
-            random_skip = random.randrange(size_diff)
+            random_skip = rng.randrange(size_diff)
 
         smaller_size = self.get_size()
         if other.get_size() < smaller_size:
             smaller_size = other.get_size()
 
         for idx in range(smaller_size):
-            if random.choice([0, 1]) == 1:
+            if rng.choice([0, 1]) == 1:
                 if self.get_size() > other.get_size():
                     new_filter.kernel[random_skip + idx] = other.kernel[idx]
                 else:
@@ -96,13 +99,17 @@ class ConvFilter:
         """get kernel's list of bytes"""
         return self.kernel
 
+    def get_kernel_bytestring(self) -> bytes:
+        """get kernel as one bytestring"""
+        return b"".join(self.kernel)
+
     def get_size(self):
         """get kernel's size"""
         return len(self.kernel)
 
     def calculate_footprint_in_bytes(self):
         """calculate how many bytes this filter will use in the file header"""
-        extrabytes = 3  # see Convpress.generate_header()
+        extrabytes = 1 + len(encode_varint(self.get_size()))  # see Header.to_bytes()
         return self.get_size() + extrabytes
 
     def __eq__(self, other: ConvFilter):
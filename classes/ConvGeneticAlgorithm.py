@@ -8,9 +8,13 @@ from utils.banner import print_banner
 
 
 class ConvGeneticAlgorithm:
-    """Genetic Algorhithm"""
+    """
+    Genetic Algorhithm
+    (rng is the random number generator, the random module by default)
+    """
 
-    def __init__(self):
+    def __init__(self, rng: random.Random = random):
+        self.rng = rng
         self.population: List[ConvFilter] = []
         self.mutation_chance = 0.05
         self.generations: List[List[ConvFilter]] = []
@@ -21,6 +25,10 @@ class ConvGeneticAlgorithm:
         """Adds filter"""
         self.population.append(filter_to_add)
 
+    def get_rng(self) -> random.Random:
+        """get the random number generator"""
+        return self.rng
+
     def set_mutation_chance(self, percentage: float) -> None:
         """Set mutation chance with value between 0.0 and 1.0"""
         self.mutation_chance = percentage
@@ -65,14 +73,14 @@ class ConvGeneticAlgorithm:
 
     def should_mutate(self):
         """random chance of mutation"""
-        return random.uniform(0, 1) < self.mutation_chance
+        return self.rng.uniform(0, 1) < self.mutation_chance
 
     def mutation(self, mutation_byte_list: List[bytes]):
         """Mutate one byte of the kernel"""
         for filter_to_mutate in self.population:
             if self.should_mutate():
-                rand_filter_idx = random.randrange(filter_to_mutate.get_size())
-                rand_byte_idx = random.randrange(len(mutation_byte_list))
+                rand_filter_idx = self.rng.randrange(filter_to_mutate.get_size())
+                rand_byte_idx = self.rng.randrange(len(mutation_byte_list))
                 filter_to_mutate.kernel[rand_filter_idx] = mutation_byte_list[rand_byte_idx]
 
     def get_generation_with_best_score(self):
@@ -85,6 +93,34 @@ class ConvGeneticAlgorithm:
                 index_max = idx
         return index_max
 
+    def generations_without_improvement(self, min_delta: float = 0.0) -> int:
+        """
+        how many generations ran since the best score last improved
+        by more than min_delta (0 if the last generation did)
+        """
+        best_score = None
+        last_improvement = 0
+        for idx, score in enumerate(self.generation_scores):
+            if best_score is None or score > best_score + min_delta:
+                best_score = score
+                last_improvement = idx
+        if best_score is None:
+            return 0
+        return len(self.generation_scores) - 1 - last_improvement
+
+    def restore(self, population: List[ConvFilter], generation_scores: List[float],
+                best_generation: int, best_population: List[ConvFilter]):
+        """
+        continue from a checkpoint: the population of the next generation,
+        the scores of the ones before it and the best of them
+        (the only one kept in the history, the others are never loaded again)
+        """
+        self.population = population
+        self.generation_scores = list(generation_scores)
+        self.history = [[] for _ in generation_scores]
+        if self.history:
+            self.history[best_generation] = best_population
+
     def get_generation_scores(self):
         """get list of the scores from all generations"""
         return self.generation_scores
@@ -98,12 +134,12 @@ class ConvGeneticAlgorithm:
         new_filters = []
         while len(new_filters) < max_filters:
 
-            rand_idx = random.randrange(len(self.population))
+            rand_idx = self.rng.randrange(len(self.population))
             mommy = self.population[rand_idx]
-            rand_idx = random.randrange(len(self.population))
+            rand_idx = self.rng.randrange(len(self.population))
             daddy = self.population[rand_idx]
 
-            baby = mommy.crossover(daddy)
+            baby = mommy.crossover(daddy, rng=self.rng)
             new_filters.append(baby)
 
         self.population = new_filters
@@ -0,0 +1,73 @@
+"""
+Pool of processes for convolving many filters in parallel
+"""
+from multiprocessing import get_context, shared_memory
+from typing import List, Tuple
+
+import numpy as np
+
+from utils.convolution import convolve_numpy
+
+# shared memory block each worker process attaches to once, in _attach_shared_data
+_worker_shared_data: shared_memory.SharedMemory = None
+
+
+def _attach_shared_data(name: str):
+    """pool initializer: attach the worker to the shared input data"""
+    global _worker_shared_data  # pylint: disable=global-statement
+    _worker_shared_data = shared_memory.SharedMemory(name=name)
+
+
+def _convolve_shared_data(task: Tuple[bytes, bytes, int]) -> List[int]:
+    """convolve one kernel against the first data_size bytes of the shared data"""
+    kernel, wildcard_byte, data_size = task
+    data = np.ndarray((data_size,), dtype=np.uint8, buffer=_worker_shared_data.buf)
+    return convolve_numpy(data, kernel, wildcard_byte)
+
+
+class ConvolutionPool:
+    """
+    Spreads the convolution of a population across processes.
+    The input data is copied once into shared memory,
+    so it's never pickled for the workers.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool = None
+        self.shared_data: shared_memory.SharedMemory = None
+        self.data_size = 0
+
+    def load(self, buffer) -> None:
+        """copy the data to be convolved into the shared memory"""
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        if self.shared_data is None or self.shared_data.size < len(data):
+            self.close()
+            self.shared_data = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+            self.pool = get_context().Pool(
+                processes=self.workers,
+                initializer=_attach_shared_data,
+                initargs=(self.shared_data.name,)
+            )
+        shared_array = np.ndarray((len(data),), dtype=np.uint8, buffer=self.shared_data.buf)
+        shared_array[:] = data
+        del shared_array
+        self.data_size = len(data)
+
+    def convolve_many(self, kernels: List[bytes], wildcard_byte: bytes) -> List[List[int]]:
+        """convolve all kernels, results are in the same order as the kernels"""
+        tasks = [(kernel, wildcard_byte, self.data_size) for kernel in kernels]
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        return self.pool.map(_convolve_shared_data, tasks, chunksize=chunksize)
+
+    def close(self) -> None:
+        """stop the workers and free the shared memory"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.shared_data is not None:
+            self.shared_data.close()
+            self.shared_data.unlink()
+            self.shared_data = None
+        self.data_size = 0
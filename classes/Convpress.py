@@ -4,13 +4,29 @@ Convpress module
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from io import TextIOWrapper
+import random
+
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
 
-from typing import List
 from classes.ByteGenerator import ByteGenerator
 from classes.ConvFilter import ConvFilter
-
-from utils.bytes_operations import bytestring_to_bytelist
+from classes.ConvolutionPool import ConvolutionPool
+from classes.CoverageTracker import CoverageTracker
+from classes.Header import FLAG_NESTED, Header
+from classes.MatchCache import MatchCache
+from classes.SuffixIndex import SuffixIndex
+
+from utils.block_stream import (blocks_in_range, decompress_block, frames_start, read_block_table,
+                                read_frame_at, read_stream_header)
+from utils.convolution import convolve_numpy
+from utils.coverage import sum_per_filter
 from utils.custom_map import map_easein
+from utils.decompression import decompress_buffer
+from utils.file_loading import byte_histogram, map_file, read_into_bytearray
+from utils.streaming import write_output
+from utils.substitution import substitute_matches
 
 
 class RanOutOfPossibleBytes(Exception):
@@ -34,6 +50,15 @@ class RepetitionPenaltyType(Enum):
     PERMISSIVE = auto()  # permissive
 
 
+class ConvolutionBackend(Enum):
+    """
+    Implementations that can be used
+    to find the matches of a filter in the input data
+    """
+    PYTHON = auto()  # byte by byte scan
+    NUMPY = auto()  # vectorized sliding window comparison
+
+
 @dataclass()
 class Convpress:
     """
@@ -44,45 +69,113 @@ class Convpress:
     and generating the output file
     """
 
-    byte_list: List[bytes] = field(default_factory=list)
+    byte_list: bytearray = field(default_factory=bytearray)
     unique_byte_list: List[bytes] = field(default_factory=list)
     input_file: TextIOWrapper = None
-    output_file: TextIOWrapper = None
+    output_file: str = None
     wildcard_byte: bytes = None
     current_filters_scores: List[float] = field(default_factory=list)
     current_filters_matches: List[List[int]] = field(default_factory=list)
     bytes_to_decompress: List[bytes] = field(default_factory=list)
     decompress_filters: List[ConvFilter] = field(default_factory=list)
-    indexes_affected_by_filters: List[List[bool]] = field(default_factory=list)
+    filters_covered_positions: List[np.ndarray] = field(default_factory=list)
     filters_in_use: List[ConvFilter] = field(default_factory=list)
+    original_length: int = None
+    data_is_nested: bool = False
+    decompress_header: Header = None
     penalty_type: RepetitionPenaltyType = RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS
+    convolution_backend: ConvolutionBackend = ConvolutionBackend.NUMPY
 
     def __init__(self, byte_generator: ByteGenerator):
         """resets everything"""
 
         self.byte_generator = byte_generator
+        self.match_cache = MatchCache()
+        self.coverage_tracker = CoverageTracker()
+        self.match_index: SuffixIndex = None
+        self.convolution_pool: ConvolutionPool = None
+        self.pool_data_is_stale = True
+        self.verbose = True
+        self.rng = random
         self.reset()
 
     def reset(self):
         """ reset the things the need to be reseted """
 
-        self.byte_list = []
+        self.byte_list = bytearray()
         self.unique_byte_list = []
         self.input_file = None
         self.wildcard_byte = None
         self.current_filters_scores = []
         self.current_filters_matches = []
-        self.indexes_affected_by_filters = []
+        self.filters_covered_positions = []
         self.decompress_filters = []
         self.bytes_to_decompress = []
         self.filters_in_use = []
+        self.original_length = None
+        self.data_is_nested = False
+        self.decompress_header = None
+        self.data_changed()
+
+    def data_changed(self):
+        """forget everything that was derived from the previous data"""
+        self.match_cache.clear()
+        self.coverage_tracker.reset()
+        self.match_index = None
+        self.pool_data_is_stale = True
+
+    def build_match_index(self):
+        """
+        Index the current data with a suffix array,
+        so convolve only checks the positions where the kernel's rarest literal part occurs.
+        The index is dropped as soon as the data changes.
+        """
+        self.match_index = SuffixIndex(self.byte_list)
+
+    def set_workers(self, workers: int):
+        """set how many processes convolve the population (1 convolves in this process)"""
+        self.close()
+        if workers > 1:
+            self.convolution_pool = ConvolutionPool(workers)
+            self.pool_data_is_stale = True
+
+    def close(self):
+        """stop the worker processes, if there are any"""
+        if self.convolution_pool is not None:
+            self.convolution_pool.close()
+            self.convolution_pool = None
+
+    def set_verbose(self, verbose: bool):
+        """set whether progress messages are printed"""
+        self.verbose = verbose
+
+    def is_verbose(self) -> bool:
+        """whether progress messages are printed"""
+        return self.verbose
+
+    def set_rng(self, rng: random.Random):
+        """set the random number generator the genetic algorithm uses"""
+        self.rng = rng
+
+    def get_rng(self) -> random.Random:
+        """get the random number generator the genetic algorithm uses (the random module by default)"""
+        return self.rng
+
+    def log(self, message: str):
+        """print a progress message (unless verbose is off)"""
+        if self.verbose:
+            print(message)
+
+    def set_byte_generator(self, byte_generator: ByteGenerator):
+        """set the generator of the bytes that represent the filters (a new one starts over)"""
+        self.byte_generator = byte_generator
 
-    def set_output_file(self, output_file: TextIOWrapper):
-        """set the output file"""
+    def set_output_file(self, output_file: str):
+        """set the path of the output file"""
         self.output_file = output_file
 
-    def get_bytelist(self) -> list:
-        """get the bytelist"""
+    def get_bytelist(self) -> bytearray:
+        """get the bytelist (one compact buffer holding every byte)"""
         return self.byte_list
 
     def get_unique_bytelist(self) -> list:
@@ -93,48 +186,62 @@ class Convpress:
         """get wildcard byte that is currently being used"""
         return self.wildcard_byte
 
+    def get_decompress_filters(self) -> List[ConvFilter]:
+        """get the filters read from the header, in the order they were applied"""
+        return self.decompress_filters
+
+    def get_bytes_to_decompress(self) -> List[bytes]:
+        """get the bytes that represent each filter read from the header"""
+        return self.bytes_to_decompress
+
     def load_bytelist_from_bytestring(self, bytestring: bytes):
         """loads bytelist using a bytestring"""
-        self.byte_list = bytestring_to_bytelist(bytestring)
+        self.byte_list = bytearray(bytestring)
+        self.data_changed()
 
     def load_file_for_decompression(self, filename: TextIOWrapper):
         """loads file for decompressing it"""
         self.reset()
         self.input_file = filename
 
-        print(f"Loading file: {self.input_file.name}")
+        self.log(f"Loading file: {self.input_file.name}")
 
-        # parse header
-        try:
-            cp_marker = self.input_file.read(2)
-            if cp_marker != b'cp':
-                raise UnexpectedHeaderFormat(
-                    "First two bytes aren't the correct marker.")
+        data = map_file(self.input_file)
+        self.input_file.close()
 
-            self.wildcard_byte = self.input_file.read(1)
+        self.load_bytelist_for_decompression(data)
 
-            number_of_filters = int(self.input_file.read(4).decode())
-            print(f"Found {number_of_filters} filters")
+    def load_bytelist_for_decompression(self, data: memoryview):
+        """parse the header at the start of the data and keep the rest to be decompressed"""
+
+        self.decompress_filters = []
+        self.bytes_to_decompress = []
 
-            for _ in range(number_of_filters):
-                byte_to_decompress = self.input_file.read(1)
-                self.bytes_to_decompress.append(byte_to_decompress)
+        header_length = self.parse_header(data)
+        self.log(f"Found {len(self.decompress_filters)} filters")
 
-                filter_size = int(self.input_file.read(2).decode())
-                new_filter = ConvFilter(filter_size)
-                for k in range(filter_size):
-                    new_filter.kernel[k] = self.input_file.read(1)
-                self.decompress_filters.append(new_filter)
+        self.log("Loading data")
+        self.byte_list = data[header_length:]
 
+    def parse_header(self, data: memoryview) -> int:
+        """
+        Parse the header at the start of the data (version 1 or 2, see generate_header)
+        and return how many bytes it takes
+        """
+        try:
+            header, header_length = Header.from_buffer(data)
         except Exception as exception:
             raise UnexpectedHeaderFormat(str(exception)) from exception
 
-        print("Loading data")
-        byte = self.input_file.read(1)
-        while byte:
-            self.byte_list.append(byte)
-            byte = self.input_file.read(1)
-        self.input_file.close()
+        self.decompress_header = header
+        self.wildcard_byte = header.wildcard_byte
+        for code, kernel in zip(header.codes, header.kernels):
+            self.bytes_to_decompress.append(code)
+            new_filter = ConvFilter(len(kernel))
+            new_filter.set_kernel_bytes_using_bytestring(kernel)
+            self.decompress_filters.append(new_filter)
+
+        return header_length
 
     def load_file(self, filename: TextIOWrapper):
         """loads a file for compressing it"""
@@ -142,40 +249,113 @@ class Convpress:
         self.reset()
         self.input_file = filename
 
-        byte = self.input_file.read(1)
-        while byte:
-            self.byte_list.append(byte)
-            if byte not in self.unique_byte_list:
-                self.unique_byte_list.append(byte)
-            byte = self.input_file.read(1)
+        byte_list = read_into_bytearray(self.input_file)
         self.input_file.close()
 
+        self.load_bytelist_for_compression(byte_list)
+
+    def load_bytelist_for_compression(self, byte_list: bytearray, nested: bool = False):
+        """
+        use the bytelist as the data to compress
+        (finds its unique bytes and picks a wildcard byte that isn't one of them).
+        nested tells if the data is a compressed file stacked by another pass (like run_passes does)
+        and is written in the header flags, so decompression knows to keep going.
+        It isn't guessed from the data: plain data can look like a header too.
+        """
+
+        self.byte_list = byte_list
+        self.data_changed()
+        self.original_length = None
+        self.data_is_nested = nested
+
+        histogram = byte_histogram(self.byte_list)
+        self.unique_byte_list = [
+            bytes([byte]) for byte in np.flatnonzero(histogram)]
+
         self.wildcard_byte = self.byte_generator.get_next_available_byte(
             except_those=self.unique_byte_list
             )
 
     def convolve_all(self, filters_to_convolve: List[ConvFilter]):
-        """convolve all filters and save their matches"""
+        """
+        convolve all filters and save their matches.
+        Kernels that were already convolved (survivors, duplicated children)
+        get their matches from the cache.
+        """
         self.filters_in_use = filters_to_convolve
+        if self.convolution_pool is not None:
+            self.current_filters_matches = self.__convolve_all_in_pool()
+            return
+
         self.current_filters_matches = []
         for filter_to_convolve in self.filters_in_use:
-            matches = self.convolve(filter_to_convolve)
+            cache_key = (filter_to_convolve.get_kernel_bytestring(), self.wildcard_byte)
+            matches = self.match_cache.get(cache_key)
+            if matches is None:
+                matches = self.convolve(filter_to_convolve)
+                self.match_cache.put(cache_key, matches)
             self.current_filters_matches.append(matches)
 
-    def convolve(self, filter_to_convolve: ConvFilter):
+    def __convolve_all_in_pool(self) -> List[List[int]]:
+        """
+        convolve the kernels that aren't cached in the worker processes
+        (always with the numpy backend) and return the matches
+        in the same order as filters_in_use
+        """
+        if self.pool_data_is_stale:
+            self.convolution_pool.load(self.byte_list)
+            self.pool_data_is_stale = False
+
+        cache_keys = [
+            (filter_to_convolve.get_kernel_bytestring(), self.wildcard_byte)
+            for filter_to_convolve in self.filters_in_use
+        ]
+        matches_by_key = {}
+        for cache_key in cache_keys:
+            if cache_key not in matches_by_key:
+                matches_by_key[cache_key] = self.match_cache.get(cache_key)
+
+        missing_keys = [key for key, matches in matches_by_key.items() if matches is None]
+        convolved = self.convolution_pool.convolve_many(
+            [kernel for kernel, _ in missing_keys], self.wildcard_byte)
+        for cache_key, matches in zip(missing_keys, convolved):
+            self.match_cache.put(cache_key, matches)
+            matches_by_key[cache_key] = matches
+
+        return [matches_by_key[cache_key] for cache_key in cache_keys]
+
+    def convolve(self, filter_to_convolve: ConvFilter) -> List[int]:
         """Convolve filter and return perfect matches"""
+        if self.convolution_backend is ConvolutionBackend.NUMPY:
+            if self.match_index is not None:
+                matches = self.match_index.convolve(
+                    filter_to_convolve.get_kernel_bytestring(), self.wildcard_byte)
+                if matches is not None:
+                    return matches
+            return convolve_numpy(
+                self.byte_list,
+                filter_to_convolve.get_kernel_bytestring(),
+                self.wildcard_byte
+            )
+        return self.convolve_python(filter_to_convolve)
+
+    def convolve_python(self, filter_to_convolve: ConvFilter) -> List[int]:
+        """Convolve filter byte by byte and return perfect matches"""
         kernel = filter_to_convolve.get_kernel()
+        literals = [
+            (kernel_idx, kernel_byte[0])
+            for kernel_idx, kernel_byte in enumerate(kernel)
+            if kernel_byte != self.wildcard_byte
+        ]
         matches = []
         bytelist_idx = 0
 
         while bytelist_idx < len(self.byte_list) - filter_to_convolve.get_size():
             match = True
-            for kernel_idx in range(filter_to_convolve.get_size()):
-                if kernel[kernel_idx] == self.wildcard_byte:
-                    continue
-                if kernel[kernel_idx] == self.byte_list[bytelist_idx+kernel_idx]:
-                    continue
-                match = False
+            for kernel_idx, kernel_byte in literals:
+                if kernel_byte != self.byte_list[bytelist_idx+kernel_idx]:
+                    match = False
+                    break
             if match:
                 matches.append(bytelist_idx)
                 bytelist_idx += filter_to_convolve.get_size()
@@ -189,66 +369,43 @@ class Convpress:
         Calculate the generation score
         by calculating the percentage of the input file it covers
         """
-        self.__generate_boolean_lists_of_filters_matches()
-
-        indexes_repetition_count: List[int] = [
-            0 for i in range(len(self.byte_list))]
-        for boolean_list in self.indexes_affected_by_filters:
-            for idx, item in enumerate(boolean_list):
-                if item:
-                    indexes_repetition_count[idx] += 1
-
-        self.current_filters_scores = []
-        for boolean_list in self.indexes_affected_by_filters:
-            score = self.calculate_one_score(
-                affected_by_filter=boolean_list,
-                bytes_repetition=indexes_repetition_count
-            )
-            self.current_filters_scores.append(score)
-
-        return self.__calculate_string_coverage()
-
-    def __generate_boolean_lists_of_filters_matches(self):
+        keys = [
+            (filter_in_use.get_kernel_bytestring(), self.wildcard_byte)
+            for filter_in_use in self.filters_in_use
+        ]
+        self.filters_covered_positions = self.coverage_tracker.update(
+            keys=keys,
+            matches_per_filter=self.current_filters_matches,
+            data_size=len(self.byte_list)
+        )
+
+        # only the filters over bytes whose counts changed get a new score,
+        # the penalties other than dividing depend on the population size too
+        keys_to_score = self.coverage_tracker.keys_to_score(
+            keys, context=(self.penalty_type, len(self.filters_in_use)))
+        self.coverage_tracker.set_scores(keys_to_score, self.calculate_scores(
+            [self.coverage_tracker.get_positions(key) for key in keys_to_score],
+            self.coverage_tracker.get_counts()).tolist())
+        self.current_filters_scores = self.coverage_tracker.get_scores(keys)
+
+        return self.coverage_tracker.get_covered_bytes() / len(self.byte_list)
+
+    def calculate_scores(self, positions_per_filter: List[np.ndarray],
+                         bytes_repetition: np.ndarray) -> np.ndarray:
         """
-        This functions generate booleans lists
-        that have the same length as the input file and
-        they hold true where that byte matched with the filter
-        or false where it didn't
+        Calculate the scores of all filters at once,
+        each covered byte adds 1.0 with the repetition penalty applied
         """
 
-        self.indexes_affected_by_filters = []
-        for idx_matches, filter_matches in enumerate(self.current_filters_matches):
-
-            filter_to_read = self.filters_in_use[idx_matches]
-            boolean_indexes_it_affects = [
-                False for i in range(len(self.byte_list))]
-
-            for match_index in filter_matches:
-                for k in range(filter_to_read.get_size()):
-                    if filter_to_read.get_kernel()[k] != self.wildcard_byte:
-                        boolean_indexes_it_affects[match_index+k] = True
+        if len(positions_per_filter) == 0:
+            return np.zeros(0)
+        penalized = self.apply_repetition_penalty(
+            1.0,
+            bytes_repetition[np.concatenate(positions_per_filter)]
+        )
+        return sum_per_filter(penalized, positions_per_filter)
 
-            self.indexes_affected_by_filters.append(
-                boolean_indexes_it_affects)
-
-    def __calculate_string_coverage(self) -> float:
-
-        boolean_unique_matches = [False for i in range(len(self.byte_list))]
-        count = 0
-
-        if len(self.indexes_affected_by_filters) == 0:
-            self.__generate_boolean_lists_of_filters_matches()
-
-        for bool_match_list in self.indexes_affected_by_filters:
-            for idx, bool_affected in enumerate(bool_match_list):
-                if bool_affected:
-                    if not boolean_unique_matches[idx]:
-                        boolean_unique_matches[idx] = True
-                        count += 1
-
-        return count / len(self.byte_list)
-
-    def calculate_one_score(self, affected_by_filter: List[bool], bytes_repetition: List[int]):
+    def calculate_one_score(self, covered_by_filter: np.ndarray, bytes_repetition: np.ndarray):
         """
         Calculate score for one filter
         by using how many matches it had
@@ -256,39 +413,49 @@ class Convpress:
         affects the same places as other filters
         """
 
-        score = 0
-        for idx_affected, affected in enumerate(affected_by_filter):
-            if affected:
-                score += self.apply_repetition_penalty(
-                    1.0,
-                    bytes_repetition[idx_affected]
-                )
-        return score
+        return float(self.calculate_scores([covered_by_filter], bytes_repetition)[0])
 
-    def apply_repetition_penalty(self, score: float, repetitions: int):
-        """apply penalty for repetition"""
-        if repetitions > 1:
+    def apply_repetition_penalty(self, score: float, repetitions):
+        """apply penalty for repetition (to one repetition count or an array of them)"""
 
-            possible_types = [item.value for item in RepetitionPenaltyType]
-            if self.penalty_type.value not in possible_types:
-                raise ValueError("Invalid penalty_type.")
+        possible_types = [item.value for item in RepetitionPenaltyType]
+        if self.penalty_type.value not in possible_types:
+            raise ValueError("Invalid penalty_type.")
 
-            if self.penalty_type is RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS:
-                return score / repetitions
+        repetitions = np.asarray(repetitions)
 
+        if self.penalty_type is RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS:
+            penalized = score / np.maximum(repetitions, 1)
+        else:
+            ratio = (repetitions - 1) / max(len(self.filters_in_use) - 1, 1)
             if self.penalty_type is RepetitionPenaltyType.LINEARLY_PROPORTIONAL:
-                ratio = (repetitions - 1) / (len(self.filters_in_use) - 1)
-                return score - (score * ratio)
-
-            if self.penalty_type is RepetitionPenaltyType.PERMISSIVE:
-                return score - (score * map_easein(ratio))
+                penalized = score - (score * ratio)
+            else:
+                penalized = score - (score * map_easein(ratio))
 
-        return score
+        return np.where(repetitions > 1, penalized, score)
 
     def set_repetition_penalty_type(self, penalty_type: RepetitionPenaltyType):
         """set the repetition penalty type"""
         self.penalty_type = penalty_type
 
+    def set_match_cache_size(self, max_size: int):
+        """set how many kernels' matches are kept between generations (0 disables it)"""
+        self.match_cache.max_size = max_size
+        self.match_cache.clear()
+
+    def get_match_cache(self) -> MatchCache:
+        """get the cache of kernel matches (and its hit/miss counters)"""
+        return self.match_cache
+
+    def set_convolution_backend(self, convolution_backend: ConvolutionBackend):
+        """set the implementation used to find filter matches"""
+        self.convolution_backend = convolution_backend
+
+    def get_current_filters_matches(self) -> List[List[int]]:
+        """get the matches of each convolved filter"""
+        return self.current_filters_matches
+
     def get_current_filters_scores(self) -> list:
         """get list of convolved filters scores"""
         return self.current_filters_scores
@@ -304,27 +471,25 @@ class Convpress:
 
     def generate_header(self, used_filters: List[ConvFilter]) -> bytes:
         """
-        Generate the header with necessary data for later decompression.
-        Returns a byte string like this: "cp$002003ima02pa02os"
-        2 bytes to represent the convpress marker: "cp"
-        + 1 byte to represent the wildcard
-        + 4 bytes to represent the number of filters (from 0000 to 9999)
-        then for each filter
-            + 1 byte to represent the byte used to replace the filter ocurrences
-            + 2 bytes to represent the filter size (00 to 99)
-            + the filter itself (number of bytes will be the same as the filter size)
-        """
-
-        encoding = self.byte_generator.get_encoding()
-        header = "cp".encode(encoding)
-        header += self.wildcard_byte
-        header += f"{len(used_filters):04}".encode(encoding)
-        for filter_to_write in used_filters:
-            header += filter_to_write.get_byte_it_represents()
-            header += f"{filter_to_write.get_size():02}".encode(encoding)
-            for byte in filter_to_write.get_kernel():
-                header += byte
-        return header
+        Generate the header with necessary data for later decompression
+        (version 2, see the Header class for the layout):
+        the wildcard, the filters in the order they were applied,
+        the length of the data before compress() if it was called
+        and whether that data was itself a compressed file.
+        """
+
+        flags = FLAG_NESTED if self.data_is_nested else 0
+        return Header(
+            wildcard_byte=self.wildcard_byte,
+            codes=[filter_to_write.get_byte_it_represents() for filter_to_write in used_filters],
+            kernels=[filter_to_write.get_kernel_bytestring() for filter_to_write in used_filters],
+            flags=flags,
+            original_length=self.original_length
+        ).to_bytes()
+
+    def set_original_length(self, original_length: int):
+        """set the length of the data before compression that goes in the header (None for none)"""
+        self.original_length = original_length
 
     def compress(self, filters_to_use: List[ConvFilter]) -> None:
         """
@@ -333,6 +498,7 @@ class Convpress:
         """
 
         actually_used: List[ConvFilter] = []
+        self.original_length = len(self.byte_list)
 
         for filter_to_convolve in filters_to_use:
 
@@ -360,46 +526,142 @@ class Convpress:
         For every match, replace the first byte
         for the byte that represents the filter
         and remove the rest from the array
+        (bytes under the filter's wildcards are kept)
         """
 
-        filter_wildcard_indexes = filter_used.get_wildcards_indexes(
-            wildcard_byte=self.get_wildcard_byte())
-
-        for matched_idx in matches:
-            self.byte_list[matched_idx] = filter_used.get_byte_it_represents()
+        if len(matches) == 0:
+            return
 
-        indexes_to_pop = []
-        for byte_idx, byte in enumerate(self.byte_list):
-            if byte == filter_used.get_byte_it_represents():
-                for filter_idx in range(filter_used.get_size()):
-                    if filter_idx > 0 and filter_idx not in filter_wildcard_indexes:
-                        indexes_to_pop.append(byte_idx+filter_idx)
-
-        for index in reversed(indexes_to_pop):
-            self.byte_list.pop(index)
+        self.byte_list = substitute_matches(
+            self.byte_list,
+            matches=matches,
+            kernel=filter_used.get_kernel_bytestring(),
+            wildcard_byte=self.get_wildcard_byte(),
+            newbyte=filter_used.get_byte_it_represents()
+        )
+        self.data_changed()
 
     def decompress(self) -> None:
         """
         Decompress the bytelist by replacing the bytes
         for its corresponding filter's kernel
         """
-        for idx, byte in enumerate(self.byte_list):
-            for byte_decompress_idx, byte_to_decompress in enumerate(self.bytes_to_decompress):
-                if byte != byte_to_decompress:
-                    continue
+        try:
+            self.byte_list = decompress_buffer(
+                self.byte_list,
+                codes=self.bytes_to_decompress,
+                kernels=[
+                    filter_used.get_kernel_bytestring()
+                    for filter_used in self.decompress_filters
+                ],
+                wildcard_byte=self.wildcard_byte,
+                output_length=self.decompress_header.original_length
+            )
+        except ValueError as exception:
+            raise UnexpectedHeaderFormat(str(exception)) from exception
 
-                self.replace_byte_for_kernel(
-                    idx, self.decompress_filters[byte_decompress_idx])
+    def decompress_blocks(self, frames: Iterable[Tuple[bytes, bytes]]) -> Iterator[bytearray]:
+        """
+        Decompress the (mask, compressed block) frames of a block stream one at a time,
+        with the filters of the stream's header (see load_bytelist_for_decompression)
+        """
+        kernels = [filter_used.get_kernel_bytestring() for filter_used in self.decompress_filters]
+        try:
+            for mask, payload in frames:
+                yield decompress_block(
+                    mask, payload, kernels, self.bytes_to_decompress, self.wildcard_byte)
+        except ValueError as exception:
+            raise UnexpectedHeaderFormat(str(exception)) from exception
+
+    def decompress_range(self, file, start: int, end: int = None) -> bytes:
+        """
+        Decompress only the original bytes from start up to end (exclusive, None for the end)
+        of a block stream file, reading just the blocks its block table says hold them
+        """
+        try:
+            header = read_stream_header(file)
+            entries = read_block_table(file)
+        except ValueError as exception:
+            raise UnexpectedHeaderFormat(str(exception)) from exception
+        self.load_bytelist_for_decompression(memoryview(header))
+
+        if end is None:
+            end = sum(original_length for original_length, _ in entries)
+        blocks = blocks_in_range(entries, frames_start(len(header)), start, end)
+        self.log(f"Reading {len(blocks)} of {len(entries)} blocks")
+
+        try:
+            frames = [
+                read_frame_at(file, file_offset, compressed_length, len(self.decompress_filters))
+                for file_offset, compressed_length, _ in blocks
+            ]
+        except ValueError as exception:
+            raise UnexpectedHeaderFormat(str(exception)) from exception
+
+        parts = []
+        for (_, _, original_offset), block in zip(blocks, self.decompress_blocks(frames)):
+            parts.append(memoryview(block)[
+                max(start - original_offset, 0):max(end - original_offset, 0)])
+        return b"".join(parts)
+
+    def decompress_all_layers(self, guess_layers: bool = True) -> int:
+        """
+        Decompress, then keep decompressing in memory while the result
+        is itself a convpress file (the output of recompressing).
+        Passes stacked in one run are flagged as nested in their version 2 header.
+        A file recompressed by another run isn't, so (unless guess_layers is False)
+        the data is also taken for another layer if it starts with a version 2 header
+        with the original length and decompresses to exactly that length,
+        or with a version 1 header of at least one filter and decompresses without errors.
+        The version 1 guess is weak: plain data that looks like that is still unwound.
+        Returns how many layers were decompressed.
+        """
+        self.decompress()
+        layers = 1
+        while True:
+            decompressed = self.byte_list
+            is_nested = self.decompress_header.is_nested()
+            if not is_nested and not (guess_layers and self.looks_like_a_layer(decompressed)):
+                return layers
+            try:
+                self.load_bytelist_for_decompression(memoryview(decompressed))
+                self.decompress()
+            except UnexpectedHeaderFormat:
+                if is_nested:
+                    raise
+                self.byte_list = decompressed
+                return layers
+            layers += 1
+
+    @staticmethod
+    def looks_like_a_layer(data) -> bool:
+        """
+        whether data that isn't flagged as nested could be another compressed layer:
+        it starts with a version 2 header with the original length
+        (decompressing checks the data expands to exactly that length),
+        or with a version 1 header of at least one filter
+        (a header with no filters always "decompresses", so it proves nothing)
+        """
+        try:
+            header, _ = Header.from_buffer(memoryview(data))
+        except (ValueError, IndexError):
+            return False
+        if header.version >= 2:
+            return header.original_length is not None
+        return len(header.kernels) > 0
 
     def output_file_from_bytelist(self, header: bytes = None) -> None:
-        """Saves the current bytelist to a file."""
+        """
+        Saves the header and the current bytelist to the output file ("-" for stdout).
+        The file is only replaced once everything was written.
+        """
 
+        chunks = []
         if header is not None:
-            self.output_file.write(header)
+            chunks.append(header)
+        chunks.append(memoryview(self.byte_list))
 
-        for byte in self.byte_list:
-            self.output_file.write(byte)
-        self.output_file.close()
+        write_output(self.output_file, chunks)
 
     def replace_byte_for_kernel(self, byte_index: int, filter_for_decompression: ConvFilter):
         """
@@ -411,6 +673,6 @@ class Convpress:
             if kernel_byte == self.wildcard_byte:
                 continue
             if kernel_idx == 0:
-                self.byte_list[byte_index] = kernel_byte
+                self.byte_list[byte_index] = kernel_byte[0]
             else:
-                self.byte_list.insert(byte_index + kernel_idx, kernel_byte)
+                self.byte_list.insert(byte_index + kernel_idx, kernel_byte[0])
@@ -0,0 +1,114 @@
+"""
+Coverage counts kept between generations
+"""
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.coverage import covered_positions
+
+
+class CoverageTracker:
+    """
+    Keeps how many filters of the population cover each byte of the data.
+    Between generations only the difference is applied:
+    filters that died are subtracted and new (or changed) filters are added,
+    so the cost follows the population churn instead of its size.
+    The score of each filter is kept too, and only dropped when a count
+    under one of its positions changed, so only those filters are rescored.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.covered_bytes = 0
+        self.multiplicity: Counter = Counter()
+        self.positions: Dict[Hashable, np.ndarray] = {}
+        self.changed_positions: List[np.ndarray] = []
+        self.scores: Dict[Hashable, float] = {}
+        self.score_context: Optional[Hashable] = None
+
+    def reset(self, data_size: int = 0) -> None:
+        """forget the population and start counting over data of that size"""
+        self.counts = np.zeros(data_size, dtype=np.int64)
+        self.covered_bytes = 0
+        self.multiplicity = Counter()
+        self.positions = {}
+        self.changed_positions = []
+        self.scores = {}
+        self.score_context = None
+
+    def update(self, keys: List[Tuple[bytes, bytes]], matches_per_filter: List[List[int]],
+               data_size: int) -> List[np.ndarray]:
+        """
+        Move the counts to a new population. Keys are (kernel, wildcard byte)
+        for each filter, in the same order as their matches.
+        Returns the covered positions of each filter.
+        """
+        if len(self.counts) != data_size:
+            self.reset(data_size)
+
+        self.changed_positions = []
+        new_multiplicity = Counter(keys)
+        for key, matches in zip(keys, matches_per_filter):
+            if key not in self.positions:
+                self.positions[key] = covered_positions(matches, key[0], key[1])
+
+        for key in set(self.multiplicity) | set(new_multiplicity):
+            delta = new_multiplicity[key] - self.multiplicity[key]
+            if delta != 0:
+                self.__add(self.positions[key], delta)
+            if new_multiplicity[key] == 0:
+                del self.positions[key]
+                self.scores.pop(key, None)
+
+        self.multiplicity = new_multiplicity
+        self.__forget_changed_scores()
+        return [self.positions[key] for key in keys]
+
+    def __add(self, positions: np.ndarray, delta: int) -> None:
+        """add delta to the count of every position (positions are unique)"""
+        covered_before = np.count_nonzero(self.counts[positions])
+        self.counts[positions] += delta
+        self.covered_bytes += int(np.count_nonzero(self.counts[positions])) - int(covered_before)
+        self.changed_positions.append(positions)
+
+    def __forget_changed_scores(self) -> None:
+        """drop the scores of the filters covering a position whose count changed"""
+        if len(self.changed_positions) == 0 or len(self.scores) == 0:
+            return
+        changed = np.zeros(len(self.counts), dtype=bool)
+        for positions in self.changed_positions:
+            changed[positions] = True
+        for key in [key for key in self.scores if changed[self.positions[key]].any()]:
+            del self.scores[key]
+
+    def keys_to_score(self, keys: List[Hashable], context: Hashable) -> List[Hashable]:
+        """
+        The keys (once each) that have no score kept.
+        Scores kept under another context (penalty settings) are all dropped first.
+        """
+        if context != self.score_context:
+            self.scores = {}
+            self.score_context = context
+        return [key for key in dict.fromkeys(keys) if key not in self.scores]
+
+    def set_scores(self, keys: List[Hashable], scores: List[float]) -> None:
+        """keep the scores of the keys until a count under them changes"""
+        self.scores.update(zip(keys, scores))
+
+    def get_scores(self, keys: List[Hashable]) -> List[float]:
+        """get the kept score of every key"""
+        return [self.scores[key] for key in keys]
+
+    def get_positions(self, key: Hashable) -> np.ndarray:
+        """get the covered positions of a filter in the population"""
+        return self.positions[key]
+
+    def get_counts(self) -> np.ndarray:
+        """get how many filters cover each byte"""
+        return self.counts
+
+    def get_covered_bytes(self) -> int:
+        """get how many bytes are covered by at least one filter"""
+        return self.covered_bytes
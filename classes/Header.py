@@ -0,0 +1,127 @@
+"""
+Header of a compressed file: the wildcard and the filters needed to decompress it
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+import struct
+from typing import List, Tuple
+
+from utils.varint import decode_varint, encode_varint
+
+V1_MARKER = b"cp"
+V2_MARKER = b"CP"
+
+# flags of the v2 header
+FLAG_NESTED = 1  # the data under this header is itself a compressed file (a previous pass)
+FLAG_ORIGINAL_LENGTH = 2  # the header holds the length of the data before it was compressed
+
+
+@dataclass()
+class Header:
+    """
+    Version 1 (ascii digits, up to 9999 filters of up to 99 bytes):
+        "cp" + 1 byte wildcard + 4 digits number of filters
+        then for each filter: 1 byte code + 2 digits size + the kernel
+
+    Version 2 (binary, varints are LEB128, no limits):
+        "CP" + 1 byte version (2) + varint flags
+        + varint original length (only with FLAG_ORIGINAL_LENGTH)
+        + 1 byte wildcard + varint number of filters
+        then for each filter: 1 byte code + varint size + the kernel
+    """
+
+    wildcard_byte: bytes
+    codes: List[bytes] = field(default_factory=list)
+    kernels: List[bytes] = field(default_factory=list)
+    version: int = 2
+    flags: int = 0
+    original_length: int = None
+
+    def is_nested(self) -> bool:
+        """whether the data under this header is itself a compressed file"""
+        return bool(self.flags & FLAG_NESTED)
+
+    def to_bytes(self) -> bytes:
+        """the header as it's written at the start of the file"""
+        if self.version == 1:
+            return self.__to_bytes_v1()
+
+        flags = self.flags & ~FLAG_ORIGINAL_LENGTH
+        if self.original_length is not None:
+            flags |= FLAG_ORIGINAL_LENGTH
+        parts = [V2_MARKER, struct.pack("B", 2), encode_varint(flags)]
+        if self.original_length is not None:
+            parts.append(encode_varint(self.original_length))
+        parts.append(self.wildcard_byte)
+        parts.append(encode_varint(len(self.kernels)))
+        for code, kernel in zip(self.codes, self.kernels):
+            parts.append(code)
+            parts.append(encode_varint(len(kernel)))
+            parts.append(kernel)
+        return b"".join(parts)
+
+    def __to_bytes_v1(self) -> bytes:
+        """the version 1 header, for files that older versions have to read"""
+        if len(self.kernels) > 9999 or any(len(kernel) > 99 for kernel in self.kernels):
+            raise ValueError("Version 1 headers hold up to 9999 filters of up to 99 bytes.")
+        parts = [V1_MARKER, self.wildcard_byte, f"{len(self.kernels):04}".encode("latin1")]
+        for code, kernel in zip(self.codes, self.kernels):
+            parts.append(code)
+            parts.append(f"{len(kernel):02}".encode("latin1"))
+            parts.append(kernel)
+        return b"".join(parts)
+
+    @staticmethod
+    def from_buffer(data: memoryview) -> Tuple[Header, int]:
+        """
+        Parse the header at the start of the data (version 1 or 2)
+        and return it with how many bytes it takes
+        """
+        data = memoryview(data)
+        marker = bytes(data[0:2])
+        if marker == V2_MARKER:
+            return Header.__from_buffer_v2(data)
+        if marker == V1_MARKER:
+            return Header.__from_buffer_v1(data)
+        raise ValueError("First two bytes aren't the correct marker.")
+
+    @staticmethod
+    def __from_buffer_v1(data: memoryview) -> Tuple[Header, int]:
+        """parse a version 1 header"""
+        header = Header(wildcard_byte=bytes(data[2:3]), version=1)
+        number_of_filters = int(bytes(data[3:7]).decode())
+        offset = 7
+        for _ in range(number_of_filters):
+            header.codes.append(bytes(data[offset:offset+1]))
+            filter_size = int(bytes(data[offset+1:offset+3]).decode())
+            offset += 3
+            header.kernels.append(bytes(data[offset:offset+filter_size]))
+            offset += filter_size
+        if offset > len(data):
+            raise ValueError("Header is truncated.")
+        return header, offset
+
+    @staticmethod
+    def __from_buffer_v2(data: memoryview) -> Tuple[Header, int]:
+        """parse a version 2 header"""
+        if len(data) < 3:
+            raise ValueError("Header is truncated.")
+        (version,) = struct.unpack_from("B", data, 2)
+        if version != 2:
+            raise ValueError(f"Header version {version} isn't supported.")
+        flags, offset = decode_varint(data, 3)
+        original_length = None
+        if flags & FLAG_ORIGINAL_LENGTH:
+            original_length, offset = decode_varint(data, offset)
+        # FLAG_ORIGINAL_LENGTH is implied by original_length not being None
+        header = Header(wildcard_byte=bytes(data[offset:offset+1]), version=2,
+                        flags=flags & ~FLAG_ORIGINAL_LENGTH, original_length=original_length)
+        number_of_filters, offset = decode_varint(data, offset + 1)
+        for _ in range(number_of_filters):
+            header.codes.append(bytes(data[offset:offset+1]))
+            filter_size, offset = decode_varint(data, offset + 1)
+            header.kernels.append(bytes(data[offset:offset+filter_size]))
+            offset += filter_size
+        if offset > len(data):
+            raise ValueError("Header is truncated.")
+        return header, offset
@@ -0,0 +1,52 @@
+"""
+Cache of filter matches
+"""
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+
+class MatchCache:
+    """
+    Bounded least-recently-used cache of the matches found for each kernel,
+    so filters that didn't change between generations aren't convolved again
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[List[int]]:
+        """get the matches cached for the key, None if they aren't cached"""
+        matches = self.entries.get(key)
+        if matches is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return matches
+
+    def put(self, key: Hashable, matches: List[int]) -> None:
+        """cache the matches for the key, dropping the least recently used ones"""
+        if self.max_size <= 0:
+            return
+        self.entries[key] = matches
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """forget all cached matches (the data they were found in changed)"""
+        self.entries.clear()
+
+    def get_hits(self) -> int:
+        """get how many lookups found cached matches"""
+        return self.hits
+
+    def get_misses(self) -> int:
+        """get how many lookups had to be convolved"""
+        return self.misses
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,82 @@
+"""
+Timing and counters of the compression phases, written as JSON lines
+"""
+import cProfile
+from contextlib import contextmanager
+import json
+import time
+from typing import Dict
+
+
+class Metrics:
+    """
+    Times phases (load, convolve, score, selection...) and keeps counters.
+    Every phase and event is written as one JSON line to the metrics file, if there is one,
+    and with a profile prefix every phase is also profiled with cProfile
+    and its stats dumped to <prefix>.<phase>.prof when closed.
+    Phases shouldn't be nested (only one cProfile profiler can be active at a time).
+    """
+
+    def __init__(self, metrics_file: str = None, profile_prefix: str = None):
+        self.output = open(metrics_file, "w", encoding="utf-8") if metrics_file else None
+        self.profile_prefix = profile_prefix
+        self.profilers: Dict[str, cProfile.Profile] = {}
+        self.context: Dict = {}
+        self.phase_seconds: Dict[str, float] = {}
+        self.phase_counts: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+
+    def set_context(self, **fields) -> None:
+        """fields added to every line from now on (like the pass number)"""
+        self.context.update(fields)
+
+    @contextmanager
+    def phase(self, name: str, **fields):
+        """time (and profile) the code inside the with block as the phase name"""
+        profiler = None
+        if self.profile_prefix is not None:
+            profiler = self.profilers.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+            self.phase_counts[name] = self.phase_counts.get(name, 0) + 1
+            self.emit("phase", phase=name, seconds=seconds, **fields)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """add to a counter (totals are in the summary)"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def emit(self, event: str, **fields) -> None:
+        """write one JSON line for the event"""
+        if self.output is None:
+            return
+        self.output.write(json.dumps({"event": event, **self.context, **fields}) + "\n")
+        self.output.flush()
+
+    def get_phase_seconds(self) -> Dict[str, float]:
+        """total seconds spent in each phase"""
+        return self.phase_seconds
+
+    def get_counters(self) -> Dict[str, int]:
+        """get the counters"""
+        return self.counters
+
+    def close(self) -> None:
+        """write the summary line, dump the profiles and close the metrics file"""
+        self.context = {}
+        self.emit("summary", phases={
+            name: {"count": self.phase_counts[name], "seconds": seconds}
+            for name, seconds in self.phase_seconds.items()
+        }, counters=self.counters)
+        for name, profiler in self.profilers.items():
+            profiler.dump_stats(f"{self.profile_prefix}.{name}.prof")
+        self.profilers = {}
+        if self.output is not None:
+            self.output.close()
+            self.output = None
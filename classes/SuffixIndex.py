@@ -0,0 +1,161 @@
+"""
+Suffix array index over the input data
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from utils.convolution import (buffer_as_array, filter_candidate_positions,
+                               kernel_literal_mask, select_non_overlapping)
+
+
+def dense_ranks(keys: np.ndarray, rank_type):
+    """
+    sort the keys and rank them 0, 1, 2... (equal keys get the same rank),
+    returns the order, the ranks and how many different keys there are.
+    Pass keys nothing else refers to, they're freed as soon as they're sorted.
+    """
+    order = np.argsort(keys).astype(rank_type)
+    sorted_keys = keys[order]
+    del keys
+    sorted_ranks = np.empty(len(order), dtype=rank_type)
+    sorted_ranks[:1] = 0
+    np.cumsum(sorted_keys[1:] != sorted_keys[:-1], dtype=rank_type, out=sorted_ranks[1:])
+    del sorted_keys
+    ranks = np.empty(len(order), dtype=rank_type)
+    ranks[order] = sorted_ranks
+    different_keys = int(sorted_ranks[-1]) + 1 if len(order) > 0 else 0
+    return order, ranks, different_keys
+
+
+def first_bytes_keys(data: np.ndarray) -> np.ndarray:
+    """sort keys of the suffixes made of their first 4 bytes"""
+    size = len(data)
+    # bytes are shifted to 1..256 so that 0 can mark the positions past the end
+    padded = np.zeros(size + 3, dtype=np.int64)
+    padded[:size] = data
+    padded[:size] += 1
+    keys = padded[:-3] << 27
+    for shift, start in [(18, 1), (9, 2), (0, 3)]:
+        keys |= padded[start:start + size] << shift
+    return keys
+
+
+def doubled_keys(rank: np.ndarray, prefix_length: int) -> np.ndarray:
+    """
+    sort keys of the suffixes made of the rank of their first prefix_length bytes
+    and, as 1 + its rank, of the next prefix_length bytes
+    (0 marks a second half past the end, which sorts the shorter suffix first)
+    """
+    keys = rank.astype(np.int64)
+    keys <<= 32
+    second_half = max(len(rank) - prefix_length, 0)
+    keys[:second_half] += rank[prefix_length:]
+    keys[:second_half] += 1
+    return keys
+
+
+def build_suffix_array(data: np.ndarray) -> np.ndarray:
+    """
+    Sort all suffixes of the data by prefix doubling:
+    suffixes are ranked by their first 4 bytes, then by their first 8 bytes
+    (the rank of the first half and the rank of the second half), and so on
+    until every suffix has a rank of its own.
+    Ranks are int32 when the data is under 2 GB, the peak is the 64 bit sort keys
+    with their order and ranks, about 25 bytes of memory per input byte.
+    """
+    size = len(data)
+    index_type = np.int32 if size < 2**31 else np.int64
+    if size == 0:
+        return np.zeros(0, dtype=index_type)
+
+    order, rank, different_ranks = dense_ranks(first_bytes_keys(data), index_type)
+    prefix_length = 4
+    while different_ranks != size:
+        del order
+        order, rank, different_ranks = dense_ranks(doubled_keys(rank, prefix_length), index_type)
+        prefix_length *= 2
+
+    return order
+
+
+class SuffixIndex:
+    """
+    Index of where every byte sequence occurs in the data.
+    Finding the occurrences of a sequence of m bytes is a binary search
+    over the sorted suffixes, O(m log n), instead of a scan of the whole data.
+    """
+
+    # above this share of the data, checking candidates isn't cheaper than a full scan
+    max_candidates_ratio = 0.25
+
+    def __init__(self, buffer):
+        self.data = bytes(buffer)
+        self.suffix_array = build_suffix_array(buffer_as_array(self.data))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __first_suffix_not_below(self, sequence: bytes, strictly_above: bool) -> int:
+        """binary search for the first suffix whose prefix is >= (or >) the sequence"""
+        low, high = 0, len(self.suffix_array)
+        sequence_size = len(sequence)
+        while low < high:
+            middle = (low + high) // 2
+            start = self.suffix_array[middle]
+            prefix = self.data[start:start + sequence_size]
+            if prefix < sequence or (strictly_above and prefix == sequence):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def count(self, sequence: bytes) -> int:
+        """how many times the sequence occurs in the data (overlaps included)"""
+        return (self.__first_suffix_not_below(sequence, strictly_above=True)
+                - self.__first_suffix_not_below(sequence, strictly_above=False))
+
+    def positions(self, sequence: bytes) -> np.ndarray:
+        """sorted positions where the sequence occurs in the data (overlaps included)"""
+        first = self.__first_suffix_not_below(sequence, strictly_above=False)
+        last = self.__first_suffix_not_below(sequence, strictly_above=True)
+        return np.sort(self.suffix_array[first:last]).astype(np.intp)
+
+    @staticmethod
+    def literal_segments(kernel: bytes, wildcard_byte: bytes) -> List[Tuple[int, bytes]]:
+        """split the kernel around its wildcards into (offset, literal bytes) segments"""
+        segments = []
+        literal_mask = kernel_literal_mask(kernel, wildcard_byte)
+        start = None
+        for kernel_idx, is_literal in enumerate(list(literal_mask) + [False]):
+            if is_literal and start is None:
+                start = kernel_idx
+            elif not is_literal and start is not None:
+                segments.append((start, kernel[start:kernel_idx]))
+                start = None
+        return segments
+
+    def candidate_positions(self, kernel: bytes, wildcard_byte: bytes):
+        """
+        Positions where the kernel may match, taken from its rarest literal segment.
+        Returns None when the kernel is too common for the index to pay off.
+        """
+        segments = self.literal_segments(kernel, wildcard_byte)
+        if len(segments) == 0:
+            return None
+        offset, segment = min(segments, key=lambda item: self.count(item[1]))
+        if self.count(segment) > len(self.data) * self.max_candidates_ratio:
+            return None
+        return self.positions(segment) - offset
+
+    def convolve(self, kernel: bytes, wildcard_byte: bytes) -> List[int]:
+        """
+        Same matches as convolve_numpy, only checking the candidate positions,
+        None if a full scan should be used instead
+        """
+        candidates = self.candidate_positions(kernel, wildcard_byte)
+        if candidates is None:
+            return None
+        matching = filter_candidate_positions(
+            buffer_as_array(self.data), candidates, kernel, wildcard_byte)
+        return select_non_overlapping(matching, len(kernel))
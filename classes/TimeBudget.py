@@ -0,0 +1,44 @@
+"""
+Time limit of a whole compression run
+"""
+import time
+
+# the final compress, header and write are reserved the time of this many of the slowest generation
+COMPRESS_RESERVE_GENERATIONS = 3
+
+
+class TimeBudget:
+    """
+    Keeps the time since the run started and how long the slowest generation took,
+    to tell whether one more generation (or pass) still leaves time
+    for compressing with the best generation and writing the output.
+    Without seconds there's no limit and everything fits.
+    """
+
+    def __init__(self, seconds: float = None):
+        self.seconds = seconds
+        self.start = time.perf_counter()
+        self.slowest_generation = 0.0
+
+    def elapsed(self) -> float:
+        """seconds since the run started"""
+        return time.perf_counter() - self.start
+
+    def remaining(self) -> float:
+        """seconds left (infinite without a limit)"""
+        if self.seconds is None:
+            return float("inf")
+        return self.seconds - self.elapsed()
+
+    def record_generation(self, seconds: float) -> None:
+        """keep how long a generation took"""
+        self.slowest_generation = max(self.slowest_generation, seconds)
+
+    def fits(self, seconds: float) -> bool:
+        """whether something that takes that long still leaves time to compress and write"""
+        reserve = self.slowest_generation * COMPRESS_RESERVE_GENERATIONS
+        return self.remaining() >= seconds + reserve
+
+    def next_generation_fits(self) -> bool:
+        """whether one more generation still leaves time to compress and write"""
+        return self.fits(self.slowest_generation)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Client of the compression server: sends a file to compress or decompress and writes the result.
+"""
+
+import json
+import sys
+
+from arguments import parse_args_client
+from utils.server_protocol import send_request
+from utils.streaming import write_output
+
+
+def main():
+    """Sends one job to a running compression server."""
+
+    args = parse_args_client()
+
+    payload = b""
+    if args.input_file is not None:
+        payload = args.input_file.read()
+        args.input_file.close()
+
+    answer, output = send_request(args.socket, args.operation, payload, args.params, args.timeout)
+    if not answer["ok"]:
+        sys.exit(f"{answer['error']}: {answer.get('message', '')}")
+
+    if args.operation in ["compress", "decompress"]:
+        write_output(args.output_file, [output])
+    print(json.dumps(answer.get("stats", {})), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,76 +3,246 @@
 File compression using convolutions and a genetic algorithm the find the best filters.
 """
 
-import random
+import sys
+import time
+from collections import deque
+from typing import List
 from arguments import parse_args_compress
-from classes.ByteGenerator import ByteGenerator
+from classes.BlockPool import BlockPool
+from classes.Checkpoint import Checkpoint, CheckpointMismatch
+from classes.ByteGenerator import ByteGenerator, RanOutOfPossibleBytes
 from classes.ConvFilter import ConvFilter
 from classes.Convpress import Convpress, RepetitionPenaltyType
 from classes.ConvGeneticAlgorithm import ConvGeneticAlgorithm
+from classes.Metrics import Metrics
+from classes.TimeBudget import TimeBudget
+from utils.block_stream import block_table, compress_block, end_of_stream, stream_header
+from utils.ngram import top_ngram_kernels
+from utils.streaming import messages_to_stderr, prefetch, read_blocks, write_output
 
 
-def main():
-    """Uses genetic algorithms and convolutions to compress a file."""
-
-    args = parse_args_compress()
-
-    byte_generator = ByteGenerator("latin1")
-    convpress = Convpress(byte_generator)
-    genetic_algorithm = ConvGeneticAlgorithm()
+def seed_population(convpress: Convpress, genetic_algorithm: ConvGeneticAlgorithm, args):
+    """
+    Create the first generation: random filters,
+    or (with --seed_strategy ngram) filters made from the most frequent
+    n-grams and gapped n-grams, with some random ones mixed in.
+    """
 
-    print(f"Loading: {args.input_file.name}")
-    convpress.load_file(filename=args.input_file)
-
-    convpress.set_output_file(output_file=args.output_file)
-
-    convpress.set_repetition_penalty_type(RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS)
-
-    
+    filters_to_create = args.ps
+    if args.seed_strategy == "ngram":
+        random_filters = round(args.ps * args.srp)
+        kernels = top_ngram_kernels(
+            buffer=convpress.get_bytelist(),
+            sizes=range(args.fsmin, args.fsmax+1),
+            wildcard_byte=convpress.get_wildcard_byte(),
+            how_many=args.ps - random_filters
+        )
+        for kernel in kernels:
+            new_filter = ConvFilter(len(kernel))
+            new_filter.set_kernel_bytes_using_bytestring(kernel)
+            genetic_algorithm.add_filter(new_filter)
+        filters_to_create -= len(kernels)
 
-    for _ in range(args.ps):
-        filter_size = random.randrange(args.fsmin, args.fsmax+1)
+    for _ in range(filters_to_create):
+        filter_size = genetic_algorithm.get_rng().randrange(args.fsmin, args.fsmax+1)
         new_filter = ConvFilter(filter_size)
         new_filter.randomize_from_list(
             unique_bytelist=convpress.get_unique_bytelist(),
             wildcard_chance=0.5,
-            wildcard_byte=convpress.get_wildcard_byte()
+            wildcard_byte=convpress.get_wildcard_byte(),
+            rng=genetic_algorithm.get_rng()
         )
         genetic_algorithm.add_filter(new_filter)
 
-    genetic_algorithm.set_mutation_chance(percentage=args.mcp)
+
+def kernels_to_filters(kernels: List[bytes]) -> List[ConvFilter]:
+    """filters with those kernels"""
+    filters = []
+    for kernel in kernels:
+        new_filter = ConvFilter(len(kernel))
+        new_filter.set_kernel_bytes_using_bytestring(kernel)
+        filters.append(new_filter)
+    return filters
+
+
+def save_checkpoint(convpress: Convpress, genetic_algorithm: ConvGeneticAlgorithm, path: str):
+    """save the state of the genetic algorithm before the generation that's about to run"""
+
+    best_generation = genetic_algorithm.get_generation_with_best_score()
+    Checkpoint(
+        fingerprint=Checkpoint.fingerprint_of(convpress.get_bytelist()),
+        wildcard_byte=convpress.get_wildcard_byte(),
+        generation=len(genetic_algorithm.get_generation_scores()),
+        population=[
+            new_filter.get_kernel_bytestring() for new_filter in genetic_algorithm.get_population()],
+        generation_scores=genetic_algorithm.get_generation_scores(),
+        best_generation=best_generation,
+        best_population=[
+            new_filter.get_kernel_bytestring()
+            for new_filter in genetic_algorithm.get_generation(best_generation)],
+        rng_state=genetic_algorithm.get_rng().getstate()
+    ).save(path)
+
+
+def resume_from_checkpoint(convpress: Convpress, genetic_algorithm: ConvGeneticAlgorithm,
+                           path: str):
+    """continue from a checkpoint made from the data currently loaded"""
+
+    checkpoint = Checkpoint.load(path)
+    if checkpoint.fingerprint != Checkpoint.fingerprint_of(convpress.get_bytelist()):
+        raise CheckpointMismatch("The checkpoint was made from another input.")
+    if checkpoint.wildcard_byte != convpress.get_wildcard_byte():
+        raise CheckpointMismatch("The checkpoint's wildcard byte isn't this input's.")
+
+    genetic_algorithm.restore(
+        population=kernels_to_filters(checkpoint.population),
+        generation_scores=checkpoint.generation_scores,
+        best_generation=checkpoint.best_generation,
+        best_population=kernels_to_filters(checkpoint.best_population)
+    )
+    genetic_algorithm.get_rng().setstate(checkpoint.rng_state)
+
+
+def checkpoint_is_due(args, generation: int, seconds_since_checkpoint: float) -> bool:
+    """
+    whether a checkpoint should be saved before the generation:
+    every --checkpoint_every generations and/or every --checkpoint_seconds,
+    every generation if neither was given
+    """
+    if args.checkpoint_every is None and args.checkpoint_seconds is None:
+        return True
+    if args.checkpoint_every is not None and generation % args.checkpoint_every == 0:
+        return True
+    return args.checkpoint_seconds is not None and seconds_since_checkpoint >= args.checkpoint_seconds
+
+
+def run_generations(convpress: Convpress, genetic_algorithm: ConvGeneticAlgorithm, args,
+                    metrics: Metrics, time_budget: TimeBudget) -> str:
+    """
+    Evolve the population for the number of generations asked, scoring each one,
+    or (with --patience) until the best score stops improving,
+    or (with --time_budget) until another generation wouldn't leave time to compress.
+    Starts after the generations already scored (when resumed from a checkpoint)
+    and, with --checkpoint, saves one before the generations it's due.
+    Returns why it stopped.
+    """
+
     generation_to_run = args.g
+    stop_reason = "generations"
+    generation_start = time.perf_counter()
+    first_generation = len(genetic_algorithm.get_generation_scores())
+    last_checkpoint = time.perf_counter()
+
+    for generation in range(first_generation, generation_to_run):
 
-    for generation in range(generation_to_run):
+        if args.checkpoint is not None and generation > first_generation and \
+                checkpoint_is_due(args, generation, time.perf_counter() - last_checkpoint):
+            with metrics.phase("checkpoint", generation=generation):
+                save_checkpoint(convpress, genetic_algorithm, args.checkpoint)
+            last_checkpoint = time.perf_counter()
 
-        print(f"generation {generation}")
+        convpress.log(f"generation {generation}")
         # genetic_algorithm.debug_population()
 
-        convpress.convolve_all(
-            filters_to_convolve=genetic_algorithm.get_population())
-        generation_score = convpress.calculate_generation_score()
+        with metrics.phase("convolve", generation=generation):
+            convpress.convolve_all(
+                filters_to_convolve=genetic_algorithm.get_population())
+        with metrics.phase("score", generation=generation):
+            generation_score = convpress.calculate_generation_score()
 
-        print(f"score: {generation_score}")
+        convpress.log(f"score: {generation_score}")
+        matches_found = sum(len(matches) for matches in convpress.get_current_filters_matches())
+        metrics.count("matches_found", matches_found)
+        metrics.emit("generation", generation=generation, score=generation_score,
+                     population=len(genetic_algorithm.get_population()),
+                     matches_found=matches_found)
 
         genetic_algorithm.add_generation_score(score=generation_score)
         genetic_algorithm.save_population()
 
+        # from the selection of the previous generation to this one's score
+        time_budget.record_generation(time.perf_counter() - generation_start)
+
         if generation >= generation_to_run - 1:
             break
 
-        genetic_algorithm.natural_selection(
-            chance_of_survival=args.scp,
-            scores=convpress.get_current_filters_scores()
-        )
+        if args.patience is not None and \
+                genetic_algorithm.generations_without_improvement(args.min_delta) >= args.patience:
+            stop_reason = "plateau"
+            break
+
+        if not time_budget.next_generation_fits():
+            stop_reason = "time_budget"
+            break
+
+        generation_start = time.perf_counter()
+
+        with metrics.phase("selection", generation=generation):
+            genetic_algorithm.natural_selection(
+                chance_of_survival=args.scp,
+                scores=convpress.get_current_filters_scores()
+            )
+
+        with metrics.phase("reproduce", generation=generation):
+            genetic_algorithm.reproduce(max_filters=args.ps)
+        with metrics.phase("mutation", generation=generation):
+            genetic_algorithm.mutation(
+                mutation_byte_list=convpress.get_unique_bytelist())
+            genetic_algorithm.wildcard_disease(
+                wildcard_byte=convpress.get_wildcard_byte())
+
+    generations_run = len(genetic_algorithm.get_generation_scores())
+    if stop_reason != "generations":
+        convpress.log(f"stopped early ({stop_reason}), "
+                      f"{generation_to_run - generations_run} generations saved")
+    metrics.emit("stop", reason=stop_reason, generations_run=generations_run,
+                 generations_saved=generation_to_run - generations_run)
+    metrics.count("generations_saved", generation_to_run - generations_run)
+
+    return stop_reason
+
+
+def compress_pass(convpress: Convpress, args, metrics: Metrics,
+                  time_budget: TimeBudget) -> List[ConvFilter]:
+    """
+    Evolve a population of filters for the data currently loaded,
+    compress the data with the best generation and return the filters actually used.
+    """
+
+    if len(convpress.get_bytelist()) == 0:
+        convpress.log("Nothing to compress")
+        convpress.set_original_length(0)
+        return []
+
+    genetic_algorithm = ConvGeneticAlgorithm(rng=convpress.get_rng())
 
-        genetic_algorithm.reproduce(max_filters=args.ps)
-        genetic_algorithm.mutation(
-            mutation_byte_list=convpress.get_unique_bytelist())
-        genetic_algorithm.wildcard_disease(
-            wildcard_byte=convpress.get_wildcard_byte())
+    if args.suffix_index:
+        convpress.log("Indexing input")
+        with metrics.phase("index"):
+            convpress.build_match_index()
 
-    print('-------------------------')
+    if args.seed_strategy == "ngram":
+        convpress.log("Counting n-grams")
+    if args.resume is not None:
+        convpress.log(f"Resuming from {args.resume}")
+        resume_from_checkpoint(convpress, genetic_algorithm, args.resume)
+    else:
+        with metrics.phase("seed"):
+            seed_population(convpress, genetic_algorithm, args)
+
+    genetic_algorithm.set_mutation_chance(percentage=args.mcp)
+
+    run_generations(convpress, genetic_algorithm, args, metrics, time_budget)
+
+    convpress.log('-------------------------')
     generation_with_best_score = genetic_algorithm.get_generation_with_best_score()
-    print(f"best generation: {generation_with_best_score}")
+    convpress.log(f"best generation: {generation_with_best_score}")
+    match_cache = convpress.get_match_cache()
+    convpress.log(f"match cache: {match_cache.get_hits()} hits, {match_cache.get_misses()} misses")
+    metrics.emit("best_generation", generation=generation_with_best_score,
+                 score=genetic_algorithm.get_generation_scores()[generation_with_best_score],
+                 match_cache_hits=match_cache.get_hits(),
+                 match_cache_misses=match_cache.get_misses())
 
     genetic_algorithm.load_population_from_history(
         generation=generation_with_best_score)
@@ -80,15 +250,189 @@ def main():
 
     # genetic_algorithm.debug_population()
 
-    print("Compressing...")
-    filters_actually_used = convpress.compress(
-        filters_to_use=genetic_algorithm.get_population())
+    convpress.log("Compressing...")
+    filters_to_use = genetic_algorithm.get_population()
+    with metrics.phase("compress", filters=len(filters_to_use)):
+        filters_actually_used = convpress.compress(filters_to_use=filters_to_use)
+    # compress() skips the filters with less than get_min_matches_necessary() matches
+    metrics.count("filters_rejected", len(filters_to_use) - len(filters_actually_used))
+    metrics.emit("compress", filters_used=len(filters_actually_used),
+                 filters_rejected=len(filters_to_use) - len(filters_actually_used),
+                 size=len(convpress.get_bytelist()))
+
+    if convpress.is_verbose():
+        genetic_algorithm.debug_population(list_of_filters=filters_actually_used)
+
+    return filters_actually_used
+
+
+def run_passes(convpress: Convpress, args, metrics: Metrics, time_budget: TimeBudget) -> bytes:
+    """
+    Compress the data, then keep compressing the output (header included)
+    in memory for the number of passes asked, or until a pass doesn't make it smaller
+    (or another pass wouldn't fit in the time budget).
+    Each pass starts over with a new ByteGenerator, like running convpress.py again would.
+    Returns the header of the last pass kept, the data is left in convpress.
+    """
+
+    # None is no limit (until a pass doesn't make it smaller)
+    passes_to_run = args.passes
+    if passes_to_run is None and not args.until_no_gain:
+        passes_to_run = 1
+
+    convpress.log("pass 1")
+    metrics.set_context(pass_number=1)
+    pass_start = time.perf_counter()
+    used_filters = compress_pass(convpress, args, metrics, time_budget)
+    with metrics.phase("header"):
+        header = convpress.generate_header(used_filters=used_filters)
+    output_size = len(header) + len(convpress.get_bytelist())
+
+    pass_number = 1
+    while passes_to_run is None or pass_number < passes_to_run:
+        if not time_budget.fits(time.perf_counter() - pass_start):
+            convpress.log("No time left for another pass")
+            metrics.emit("stop", reason="time_budget", passes_run=pass_number)
+            break
+        pass_start = time.perf_counter()
+        pass_number += 1
+        convpress.log(f"pass {pass_number}")
+        metrics.set_context(pass_number=pass_number)
+
+        previous_header, previous_bytelist = header, convpress.get_bytelist()
+        try:
+            convpress.set_byte_generator(ByteGenerator("latin1"))
+            convpress.load_bytelist_for_compression(
+                bytearray(header) + previous_bytelist, nested=True)
+            used_filters = compress_pass(convpress, args, metrics, time_budget)
+            with metrics.phase("header"):
+                header = convpress.generate_header(used_filters=used_filters)
+        except RanOutOfPossibleBytes:
+            convpress.log("No bytes left to represent filters, keeping the previous pass")
+            header = previous_header
+            convpress.load_bytelist_from_bytestring(previous_bytelist)
+            break
+
+        new_output_size = len(header) + len(convpress.get_bytelist())
+        convpress.log(f"pass {pass_number}: {output_size} -> {new_output_size} bytes")
+        if args.until_no_gain and new_output_size >= output_size:
+            convpress.log("No gain, keeping the previous pass")
+            header = previous_header
+            convpress.load_bytelist_from_bytestring(previous_bytelist)
+            break
+        output_size = new_output_size
+
+    return header
+
+
+def compress_stream(convpress: Convpress, args, metrics: Metrics):
+    """
+    Find the filters on a sample from the start of the input,
+    then compress the whole input block by block with them,
+    reading the next block while the current one is compressed
+    (with --workers, blocks are compressed on all the workers).
+    Only the sample and a few blocks per worker are in memory at a time.
+    """
+
+    blocks = prefetch(read_blocks(args.input_file, args.block_size))
+    sample_blocks = []
+    sample_size = 0
+    for block in blocks:
+        sample_blocks.append(block)
+        sample_size += len(block)
+        if sample_size >= args.sample_size:
+            break
+
+    convpress.log(f"Training on a sample of {min(sample_size, args.sample_size)} bytes")
+    convpress.load_bytelist_for_compression(bytearray(b"".join(sample_blocks)[:args.sample_size]))
+    filters_to_use = []
+    if sample_size > 0:
+        filters_to_use = compress_pass(convpress, args, metrics, TimeBudget())
+
+    # every block's original length is in the block table, the sample's isn't needed
+    convpress.set_original_length(None)
+    with metrics.phase("header"):
+        header = convpress.generate_header(used_filters=filters_to_use)
+    kernels = [filter_to_use.get_kernel_bytestring() for filter_to_use in filters_to_use]
+    codes = [filter_to_use.get_byte_it_represents() for filter_to_use in filters_to_use]
+    wildcard_byte = convpress.get_wildcard_byte()
+    convpress.close()
+    convpress.reset()
+
+    block_lengths = deque()
+
+    def all_blocks():
+        while sample_blocks:
+            block_lengths.append(len(sample_blocks[0]))
+            yield sample_blocks.pop(0)
+        for block in blocks:
+            block_lengths.append(len(block))
+            yield block
+
+    def stream_chunks(compressed_blocks):
+        yield stream_header(header)
+        table_entries = []
+        for block_number, compressed_block in enumerate(compressed_blocks):
+            convpress.log(f"block {block_number}")
+            table_entries.append((block_lengths.popleft(), len(compressed_block)))
+            metrics.emit("block", block=block_number, size=table_entries[-1][0],
+                         compressed_size=len(compressed_block))
+            yield compressed_block
+        yield end_of_stream(len(filters_to_use))
+        yield block_table(table_entries)
+
+    convpress.log("Compressing...")
+    # blocks are read, compressed and written as they go, so it's all one phase
+    with metrics.phase("write", filters=len(filters_to_use)):
+        if args.workers > 1:
+            block_pool = BlockPool(args.workers, kernels, codes, wildcard_byte)
+            try:
+                write_output(args.output_file,
+                             stream_chunks(block_pool.compress_blocks(all_blocks())))
+            finally:
+                block_pool.close()
+            return
+
+        write_output(args.output_file, stream_chunks(
+            compress_block(block, kernels, codes, wildcard_byte) for block in all_blocks()))
+
+
+def main():
+    """Uses genetic algorithms and convolutions to compress a file."""
+
+    args = parse_args_compress()
+    time_budget = TimeBudget(args.time_budget)
+
+    with messages_to_stderr(args.output_file):
+        byte_generator = ByteGenerator("latin1")
+        convpress = Convpress(byte_generator)
+
+        convpress.set_output_file(output_file=args.output_file)
+
+        convpress.set_repetition_penalty_type(RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS)
+        convpress.set_match_cache_size(args.mcs)
+
+        metrics = Metrics(args.metrics, args.profile)
+        convpress.set_workers(args.workers)
+        try:
+            if args.stream:
+                compress_stream(convpress, args, metrics)
+                return
 
-    genetic_algorithm.debug_population(list_of_filters=filters_actually_used)
+            convpress.log(f"Loading: {args.input_file.name}")
+            with metrics.phase("load"):
+                convpress.load_file(filename=args.input_file)
 
-    header = convpress.generate_header(used_filters=filters_actually_used)
+            header = run_passes(convpress, args, metrics, time_budget)
 
-    convpress.output_file_from_bytelist(header=header)
+            with metrics.phase("write"):
+                convpress.output_file_from_bytelist(header=header)
+        except CheckpointMismatch as exception:
+            # like the errors of the arguments, without a traceback
+            sys.exit(f"convpress.py: error: {exception}")
+        finally:
+            convpress.close()
+            metrics.close()
 
 
 if __name__ == '__main__':
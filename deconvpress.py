@@ -4,25 +4,92 @@ Program to decompress a file that was compressed by convpress.
 """
 
 from arguments import parse_args_decompress
+from classes.BlockPool import BlockPool
 from classes.ByteGenerator import ByteGenerator
-from classes.Convpress import Convpress
+from classes.Convpress import Convpress, UnexpectedHeaderFormat
+from utils.block_stream import STREAM_MARKER, read_block_frames, read_stream_header
+from utils.streaming import (messages_to_stderr, peek_bytes, prefetch, slice_blocks,
+                             write_output)
+
+def decompress_stream(convpress: Convpress, args):
+    """
+    Decompress a block stream one block at a time,
+    reading the next block while the current one is decompressed
+    (with --workers, blocks are decompressed on all the workers).
+    A --range stops reading once the blocks holding it were decompressed.
+    """
+
+    try:
+        header = read_stream_header(args.input_file)
+    except ValueError as exception:
+        raise UnexpectedHeaderFormat(str(exception)) from exception
+    convpress.load_bytelist_for_decompression(memoryview(header))
+    frames = prefetch(read_block_frames(
+        args.input_file, number_of_filters=len(convpress.get_decompress_filters())))
+
+    def in_range(blocks):
+        if args.range is None:
+            return blocks
+        start, end = args.range
+        return slice_blocks(blocks, start, end)
+
+    print("Decompressing...")
+    if args.workers > 1:
+        block_pool = BlockPool(
+            args.workers,
+            kernels=[
+                filter_used.get_kernel_bytestring()
+                for filter_used in convpress.get_decompress_filters()
+            ],
+            codes=convpress.get_bytes_to_decompress(),
+            wildcard_byte=convpress.get_wildcard_byte()
+        )
+        try:
+            write_output(args.output_file, in_range(block_pool.decompress_frames(frames)))
+        except ValueError as exception:
+            raise UnexpectedHeaderFormat(str(exception)) from exception
+        finally:
+            block_pool.close()
+        return
+
+    write_output(args.output_file, in_range(convpress.decompress_blocks(frames)))
+
 
 def main():
     """Decompresses a file that was compressed by convpress."""
 
     args = parse_args_decompress()
 
-    byte_generator = ByteGenerator("latin1")
-    convpress = Convpress(byte_generator)
+    with messages_to_stderr(args.output_file):
+        byte_generator = ByteGenerator("latin1")
+        convpress = Convpress(byte_generator)
 
-    convpress.load_file_for_decompression(args.input_file)
+        if peek_bytes(args.input_file, len(STREAM_MARKER)) == STREAM_MARKER:
+            print("Found a block stream")
+            if args.range is not None and args.input_file.seekable():
+                start, end = args.range
+                write_output(args.output_file, [convpress.decompress_range(args.input_file, start, end)])
+                return
+            decompress_stream(convpress, args)
+            return
 
-    convpress.set_output_file(args.output_file)
+        convpress.load_file_for_decompression(args.input_file)
 
-    print("Decompressing...")
-    convpress.decompress()
+        convpress.set_output_file(args.output_file)
+
+        print("Decompressing...")
+        if args.all_layers:
+            layers = convpress.decompress_all_layers()
+            print(f"Decompressed {layers} layers")
+        else:
+            convpress.decompress()
+
+        if args.range is not None:
+            start, end = args.range
+            write_output(args.output_file, [memoryview(convpress.get_bytelist())[start:end]])
+            return
 
-    convpress.output_file_from_bytelist()
+        convpress.output_file_from_bytelist()
 
 if __name__ == '__main__':
     main()
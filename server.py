@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Compression server: keeps worker processes warm and runs the jobs sent to its unix socket.
+"""
+
+import asyncio
+import sys
+
+from arguments import parse_args_server
+from classes.CompressionServer import CompressionServer
+
+
+def main():
+    """Serves compression and decompression jobs until a shutdown request."""
+
+    args = parse_args_server()
+
+    server = CompressionServer(args.workers, args.max_pending, args.max_size)
+    print(f"Listening on {args.socket} with {args.workers} workers", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
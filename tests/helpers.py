@@ -0,0 +1,43 @@
+"""
+Data and runs of the genetic algorithm shared by the tests
+"""
+import contextlib
+import io
+import random
+from typing import List, Tuple
+from arguments import parse_args_compress
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvGeneticAlgorithm import ConvGeneticAlgorithm
+from classes.Convpress import Convpress
+from classes.Metrics import Metrics
+from classes.TimeBudget import TimeBudget
+from convpress import run_generations, seed_population
+
+
+def loaded_convpress(seed: int, size: int) -> Convpress:
+    """
+    a Convpress loaded with size random bytes of a few letters and spaces,
+    random is seeded first, so the run that follows is the same every time
+    """
+    random.seed(seed)
+    data = bytes(random.choice(b"abcddd  ") for _ in range(size))
+    convpress = Convpress(ByteGenerator("latin1"))
+    convpress.load_bytelist_for_compression(bytearray(data))
+    return convpress
+
+
+def run_generations_with(args_list: List[str], seed: int,
+                         time_budget: TimeBudget = None) -> Tuple[str, ConvGeneticAlgorithm]:
+    """
+    run the generations on 2000 bytes with a population of 10 and the options,
+    returns the stop reason and the genetic algorithm
+    """
+    convpress = loaded_convpress(seed, 2000)
+    args = parse_args_compress(["-", "-", "--ps", "10"] + args_list)
+    genetic_algorithm = ConvGeneticAlgorithm()
+    seed_population(convpress, genetic_algorithm, args)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stop_reason = run_generations(
+            convpress, genetic_algorithm, args, Metrics(),
+            time_budget if time_budget is not None else TimeBudget())
+    return stop_reason, genetic_algorithm
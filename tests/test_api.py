@@ -0,0 +1,89 @@
+"""
+Test to check if compress_bytes and decompress_bytes round trip in memory, from many threads at once
+"""
+import contextlib
+import io
+import random
+import unittest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from api import compress_bytes, decompress_bytes
+from classes.Convpress import UnexpectedHeaderFormat
+from classes.Header import Header
+from utils.block_stream import block_table, compress_block, end_of_stream, stream_header
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compresses and decompresses bytes with the library functions"""
+
+    def setUp(self) -> None:
+        rng = random.Random(60)
+        words = [bytes(rng.choice(b"abcdefgh") for _ in range(rng.randrange(2, 7)))
+                 for _ in range(30)]
+        self.data = b" ".join(rng.choice(words) for _ in range(2000))
+        return super().setUp()
+
+    def test_roundtrip(self):
+        """Test one and several passes, and empty data"""
+
+        compressed = compress_bytes(self.data, seed=1, ps=20, g=5)
+        self.assertLess(len(compressed), len(self.data))
+        self.assertEqual(decompress_bytes(compressed), self.data)
+
+        compressed_again = compress_bytes(self.data, seed=1, ps=20, g=5, passes=3)
+        self.assertEqual(decompress_bytes(compressed_again), self.data)
+        self.assertNotEqual(decompress_bytes(compressed_again, all_layers=False), self.data)
+
+        self.assertEqual(decompress_bytes(compress_bytes(b"")), b"")
+
+        looks_like_a_header = b"cpa0000 " + self.data
+        self.assertEqual(decompress_bytes(compress_bytes(looks_like_a_header, seed=1, g=3)),
+                         looks_like_a_header)
+        version_1 = Header(wildcard_byte=b"?", version=1).to_bytes() + looks_like_a_header
+        self.assertEqual(decompress_bytes(version_1), looks_like_a_header)
+
+    def test_threads(self):
+        """Test that calls from many threads give what a single call gives, and print nothing"""
+
+        expected = compress_bytes(self.data, seed=2, ps=20, g=5)
+        printed = io.StringIO()
+        with contextlib.redirect_stdout(printed), ThreadPoolExecutor(8) as executor:
+            compressed = list(executor.map(
+                lambda seed: compress_bytes(self.data, seed=seed, ps=20, g=5), [2] * 8))
+            decompressed = list(executor.map(decompress_bytes, compressed))
+        self.assertEqual(printed.getvalue(), "")
+        self.assertEqual(compressed, [expected] * 8)
+        self.assertEqual(decompressed, [self.data] * 8)
+
+    def test_block_stream(self):
+        """Test that a block stream decompresses too"""
+
+        header = b"cp?0001\x0102ab"
+        chunks = [stream_header(header)]
+        table_entries = []
+        for start in range(0, len(self.data), 1000):
+            chunks.append(compress_block(self.data[start:start+1000], [b"ab"], [b"\x01"], b"?"))
+            table_entries.append((len(self.data[start:start+1000]), len(chunks[-1])))
+        chunks += [end_of_stream(1), block_table(table_entries)]
+        self.assertEqual(decompress_bytes(b"".join(chunks)), self.data)
+
+    def test_bad_input(self):
+        """Test unknown params, invalid combinations and data that isn't compressed"""
+
+        with self.assertRaises(TypeError):
+            compress_bytes(self.data, population=10)
+        with self.assertRaises(TypeError):
+            compress_bytes(self.data, stream=True)
+        with self.assertRaises(ValueError):
+            compress_bytes(self.data, patience=0)
+        for passes in [0, -1]:
+            with self.assertRaises(ValueError):
+                compress_bytes(self.data, passes=passes)
+        with self.assertRaises(UnexpectedHeaderFormat):
+            decompress_bytes(self.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
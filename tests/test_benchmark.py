@@ -0,0 +1,47 @@
+"""
+Test to check if the benchmark's synthetic data and measurements are reproducible
+"""
+import unittest
+import sys
+from utils.benchmark import (CORPUS_KINDS, byte_entropy, make_corpus, measure,
+                             scaling_exponent, throughput)
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Tests the pieces the benchmark is made of"""
+
+    def test_corpora(self):
+        """Test that the data has the size asked, is the same for a seed and grows in entropy"""
+
+        entropies = []
+        for kind in CORPUS_KINDS:
+            data = make_corpus(kind, 5000, seed=1)
+            self.assertEqual(len(data), 5000)
+            self.assertEqual(data, make_corpus(kind, 5000, seed=1))
+            self.assertNotEqual(data, make_corpus(kind, 5000, seed=2))
+            entropies.append(byte_entropy(data))
+        self.assertEqual(entropies, sorted(entropies))
+        self.assertLess(max(make_corpus("random", 5000, seed=1)), 192)
+
+    def test_measure(self):
+        """Test that setup isn't timed, run is, and its result is kept"""
+
+        measured = measure(lambda: list(range(1000)), sum, repeat=2)
+        self.assertEqual(measured["result"], sum(range(1000)))
+        self.assertGreater(measured["seconds"], 0)
+        self.assertGreaterEqual(measured["peak_memory_bytes"], 0)
+        self.assertAlmostEqual(throughput(2_000_000, 2.0), 1.0)
+
+    def test_scaling_exponent(self):
+        """Test linear and quadratic growth"""
+
+        sizes = [1000, 2000, 4000, 8000]
+        self.assertAlmostEqual(scaling_exponent(sizes, [size * 3e-6 for size in sizes]), 1.0)
+        self.assertAlmostEqual(scaling_exponent(sizes, [size ** 2 * 1e-9 for size in sizes]), 2.0)
+        self.assertIsNone(scaling_exponent([1000], [0.1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Test to check if compressing blocks in worker processes gives the same blocks, in order
+"""
+import random
+import unittest
+import sys
+from classes.BlockPool import BlockPool
+from utils.block_stream import compress_block, decompress_block
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compares compressing and decompressing blocks with and without worker processes"""
+
+    def setUp(self) -> None:
+        rng = random.Random(18)
+        self.kernels = [b"ab", b"c?a", b"ddd"]
+        self.codes = [b"\x01", b"\x02", b"\x03"]
+        self.blocks = [
+            bytes(rng.choice(b"abcddd") for _ in range(rng.randrange(1, 3000)))
+            for _ in range(25)
+        ]
+        self.block_pool = BlockPool(2, self.kernels, self.codes, b"?")
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.block_pool.close()
+        return super().tearDown()
+
+    def test_same_blocks_in_order(self):
+        """Test that the workers' blocks come back in the order they were given"""
+
+        compressed = list(self.block_pool.compress_blocks(iter(self.blocks)))
+        self.assertEqual(compressed, [
+            compress_block(block, self.kernels, self.codes, b"?") for block in self.blocks])
+
+        mask_length = 1
+        frames = [(block[:mask_length], block[mask_length + 10:]) for block in compressed]
+        self.assertEqual(
+            [bytes(block) for block in self.block_pool.decompress_frames(iter(frames))],
+            self.blocks)
+        self.assertEqual(
+            decompress_block(frames[0][0], frames[0][1], self.kernels, self.codes, b"?"),
+            self.blocks[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Test to check if data written as a block stream reads back block by block
+"""
+import io
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress, UnexpectedHeaderFormat
+from utils.block_stream import (block_table, compress_block, end_of_stream,
+                                read_block_frames, read_block_table, read_stream_header,
+                                stream_header)
+from utils.streaming import prefetch, read_blocks, slice_blocks
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Writes block streams and reads them back"""
+
+    def setUp(self) -> None:
+        self.kernels = [b"ab", b"c?a", b"ddd"]
+        self.codes = [b"\x01", b"\x02", b"\x03"]
+        self.wildcard_byte = b"?"
+        encoding = "latin1"
+        header_parts = [b"cp", self.wildcard_byte, b"0003"]
+        for kernel, code in zip(self.kernels, self.codes):
+            header_parts += [code, f"{len(kernel):02}".encode(encoding), kernel]
+        self.header = b"".join(header_parts)
+        return super().setUp()
+
+    def write_stream(self, data: bytes, block_size: int) -> io.BytesIO:
+        """write the data as a block stream in memory"""
+
+        chunks = [stream_header(self.header)]
+        table_entries = []
+        for block in read_blocks(io.BytesIO(data), block_size):
+            chunks.append(compress_block(block, self.kernels, self.codes, self.wildcard_byte))
+            table_entries.append((len(block), len(chunks[-1])))
+        chunks.append(end_of_stream(len(self.kernels)))
+        chunks.append(block_table(table_entries))
+        return io.BytesIO(b"".join(chunks))
+
+    def read_stream(self, stream: io.BytesIO) -> bytes:
+        """read a block stream back, one block at a time"""
+
+        convpress = Convpress(ByteGenerator("latin1"))
+        convpress.load_bytelist_for_decompression(memoryview(read_stream_header(stream)))
+        frames = read_block_frames(stream, number_of_filters=len(self.kernels))
+        return b"".join(convpress.decompress_blocks(prefetch(frames)))
+
+    def test_roundtrip(self):
+        """Test blocks of different sizes, one of them holding a code byte"""
+
+        rng = random.Random(15)
+        data = bytearray(rng.choice(b"abcddd") for _ in range(20000))
+        data[7000] = self.codes[0][0]
+        for block_size in [1, 999, 4096, 50000]:
+            stream = self.write_stream(bytes(data), block_size)
+            if block_size > 1:
+                self.assertLess(len(stream.getvalue()), len(data))
+            self.assertEqual(self.read_stream(stream), bytes(data))
+
+    def test_empty_input(self):
+        """Test that empty data makes a stream with no blocks"""
+
+        self.assertEqual(self.read_stream(self.write_stream(b"", 100)), b"")
+
+    def test_truncated_stream(self):
+        """Test that a stream without its end is an error"""
+
+        data = bytes(random.Random(16).choice(b"abcd") for _ in range(5000))
+        stream = self.write_stream(data, 1000).getvalue()
+        with self.assertRaises(UnexpectedHeaderFormat):
+            self.read_stream(io.BytesIO(stream[:len(stream) // 2]))
+
+    def test_block_table(self):
+        """Test that the block table is found from the end of the stream"""
+
+        stream = self.write_stream(b"abcd" * 250, 300)
+        self.assertEqual([entry[0] for entry in read_block_table(stream)], [300, 300, 300, 100])
+        self.assertEqual(read_block_table(io.BytesIO(block_table([]))), [])
+        with self.assertRaises(ValueError):
+            read_block_table(io.BytesIO(b"bt"))
+
+    def test_range(self):
+        """Test decompressing byte ranges through the block table"""
+
+        rng = random.Random(19)
+        data = bytes(rng.choice(b"abcddd") for _ in range(10000))
+        stream = self.write_stream(data, 1000)
+        for start, end in [(0, 10), (995, 1005), (1000, 2000), (4321, 9876), (9990, None),
+                           (5, 5), (0, None), (12000, None), (9999, 20000)]:
+            convpress = Convpress(ByteGenerator("latin1"))
+            stream.seek(0)
+            self.assertEqual(convpress.decompress_range(stream, start, end), data[start:end])
+            self.assertEqual(
+                b"".join(slice_blocks([data[idx:idx+700] for idx in range(0, 10000, 700)],
+                                      start, end)),
+                data[start:end])
+
+    def test_prefetch(self):
+        """Test that prefetching keeps the order and raises the producer's errors"""
+
+        self.assertEqual(list(prefetch(iter(range(100)), depth=3)), list(range(100)))
+
+        def failing():
+            yield 1
+            raise RuntimeError("read failed")
+
+        with self.assertRaises(RuntimeError):
+            list(prefetch(failing()))
+
+    def test_filters_from_a_sample(self):
+        """Test compressing with filters that were used on a sample of the data"""
+
+        rng = random.Random(17)
+        data = bytes(rng.choice(b"xxyz") for _ in range(8000))
+        convpress = Convpress(ByteGenerator("latin1"))
+        convpress.load_bytelist_for_compression(bytearray(data[:2000]))
+        filters = []
+        for kernel in [b"xx", b"y\x00z"]:
+            new_filter = ConvFilter(len(kernel))
+            new_filter.set_kernel_bytes_using_bytestring(
+                kernel.replace(b"\x00", convpress.get_wildcard_byte()))
+            filters.append(new_filter)
+        used_filters = convpress.compress(filters_to_use=filters)
+        self.assertEqual(len(used_filters), 2)
+
+        self.header = convpress.generate_header(used_filters=used_filters)
+        self.kernels = [used.get_kernel_bytestring() for used in used_filters]
+        self.codes = [used.get_byte_it_represents() for used in used_filters]
+        self.wildcard_byte = convpress.get_wildcard_byte()
+        self.assertEqual(self.read_stream(self.write_stream(data, 3000)), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
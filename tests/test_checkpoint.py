@@ -0,0 +1,103 @@
+"""
+Test to check if a run resumed from a checkpoint ends like the run that wasn't stopped
+"""
+import contextlib
+import io
+import os
+import random
+import subprocess
+import tempfile
+import unittest
+import sys
+from arguments import parse_args_compress
+from classes.ByteGenerator import ByteGenerator
+from classes.Checkpoint import Checkpoint, CheckpointMismatch
+from classes.Convpress import Convpress
+from classes.Metrics import Metrics
+from classes.TimeBudget import TimeBudget
+from convpress import compress_pass
+
+sys.path.append("..")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Testing(unittest.TestCase):
+    """Saves checkpoints during a run and resumes from them"""
+
+    def setUp(self) -> None:
+        rng = random.Random(80)
+        self.data = bytes(rng.choice(b"abcdddeef  ") for _ in range(5000))
+        return super().setUp()
+
+    def run_pass(self, data: bytes, seed: int, args_list: list) -> bytes:
+        """compress the data in one pass, returns the header and the compressed data"""
+
+        convpress = Convpress(ByteGenerator("latin1"))
+        convpress.set_verbose(False)
+        convpress.set_rng(random.Random(seed))
+        convpress.load_bytelist_for_compression(bytearray(data))
+        args = parse_args_compress(["-", "-", "--ps", "20"] + args_list)
+        used_filters = compress_pass(convpress, args, Metrics(), TimeBudget())
+        return convpress.generate_header(used_filters) + bytes(convpress.get_bytelist())
+
+    def test_resume(self):
+        """Test that resuming from generation 4 gives the same output as the whole run"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.checkpoint")
+            whole_run = self.run_pass(self.data, 1, [
+                "--g", "8", "--checkpoint", path, "--checkpoint-every", "4"])
+
+            checkpoint = Checkpoint.load(path)
+            self.assertEqual(checkpoint.generation, 4)
+            self.assertEqual(len(checkpoint.generation_scores), 4)
+            self.assertEqual(Checkpoint.from_bytes(checkpoint.to_bytes()), checkpoint)
+
+            # the seed doesn't matter, the random number generator state is in the checkpoint
+            resumed = self.run_pass(self.data, 2, ["--g", "8", "--resume", path])
+            self.assertEqual(resumed, whole_run)
+
+    def test_mismatch(self):
+        """Test that a checkpoint of other data, or a broken one, isn't resumed"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.checkpoint")
+            self.run_pass(self.data, 1, ["--g", "3", "--checkpoint", path])
+            with self.assertRaises(CheckpointMismatch):
+                self.run_pass(self.data[:-1], 1, ["--g", "3", "--resume", path])
+
+            with open(path, "rb") as checkpoint_file:
+                written = checkpoint_file.read()
+            with open(path, "wb") as checkpoint_file:
+                checkpoint_file.write(written[:len(written) // 2])
+            with self.assertRaises(CheckpointMismatch):
+                self.run_pass(self.data, 1, ["--g", "3", "--resume", path])
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parse_args_compress(["-", "-", "--checkpoint", "x", "--until-no-gain"])
+
+    def test_mismatch_from_command_line(self):
+        """Test that convpress.py reports a checkpoint it can't resume in one line"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            original = os.path.join(directory, "original")
+            checkpoint = os.path.join(directory, "run.checkpoint")
+            with open(original, "wb") as original_file:
+                original_file.write(self.data)
+            with open(checkpoint, "wb") as checkpoint_file:
+                checkpoint_file.write(b"cc\x01broken")
+
+            finished = subprocess.run(
+                [sys.executable, os.path.join(ROOT, "convpress.py"), original,
+                 os.path.join(directory, "compressed"), "--resume", checkpoint],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+            self.assertEqual(finished.returncode, 1)
+            self.assertEqual(finished.stderr.decode().splitlines(),
+                             ["convpress.py: error: Checkpoint is truncated or corrupted."])
+            self.assertFalse(os.path.exists(os.path.join(directory, "compressed")))
+
+
+if __name__ == '__main__':
+    unittest.main()
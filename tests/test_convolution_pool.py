@@ -0,0 +1,63 @@
+"""
+Test to check if convolving in worker processes gives the same matches as convolving serially
+"""
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compares convolve_all with and without worker processes"""
+
+    def setUp(self) -> None:
+        rng = random.Random(3)
+        self.data = bytes(rng.choice(b"abcd") for _ in range(5000))
+        self.population = []
+        for _ in range(40):
+            new_filter = ConvFilter(rng.randrange(2, 5))
+            new_filter.randomize_from_list([b"a", b"b", b"c", b"d"], 0.5, b"\x00")
+            self.population.append(new_filter)
+        self.population.append(self.population[0])
+
+        self.serial = Convpress(ByteGenerator("latin1"))
+        self.parallel = Convpress(ByteGenerator("latin1"))
+        self.parallel.set_workers(2)
+        for convpress in [self.serial, self.parallel]:
+            convpress.load_bytelist_from_bytestring(self.data)
+            convpress.wildcard_byte = b"\x00"
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.parallel.close()
+        return super().tearDown()
+
+    def test_same_matches_in_population_order(self):
+        """Test that the workers' matches are merged in population order"""
+
+        self.serial.convolve_all(self.population)
+        self.parallel.convolve_all(self.population)
+        self.assertEqual(
+            self.parallel.current_filters_matches, self.serial.current_filters_matches)
+        self.assertEqual(
+            self.parallel.calculate_generation_score(), self.serial.calculate_generation_score())
+        self.assertEqual(
+            self.parallel.get_current_filters_scores(), self.serial.get_current_filters_scores())
+
+    def test_workers_see_new_data(self):
+        """Test that the workers get the data again after it changes"""
+
+        self.parallel.convolve_all(self.population)
+        for convpress in [self.serial, self.parallel]:
+            convpress.load_bytelist_from_bytestring(self.data[:1000])
+            convpress.convolve_all(self.population)
+        self.assertEqual(
+            self.parallel.current_filters_matches, self.serial.current_filters_matches)
+
+
+if __name__ == '__main__':
+    unittest.main()
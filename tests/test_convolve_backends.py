@@ -0,0 +1,66 @@
+"""
+Test to check if the numpy convolution finds exactly the same matches as the byte by byte scan
+"""
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress, ConvolutionBackend
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compares the matches of both convolution backends"""
+
+    def setUp(self) -> None:
+        byte_generator = ByteGenerator("latin1")
+        self.convpress = Convpress(byte_generator)
+        return super().setUp()
+
+    def matches_with_backend(self, filter_to_test: ConvFilter, backend: ConvolutionBackend):
+        """convolve the filter using a specific backend"""
+        self.convpress.set_convolution_backend(backend)
+        return self.convpress.convolve(filter_to_test)
+
+    def test_overlapping_matches(self):
+        """Test a kernel that overlaps itself in the data"""
+
+        filter_to_test = ConvFilter(2)
+        filter_to_test.set_kernel_bytes_using_bytestring(b"aa")
+        self.convpress.load_bytelist_from_bytestring(b"aaaaabaaab")
+        self.convpress.wildcard_byte = b"\x00"
+        matches = self.matches_with_backend(filter_to_test, ConvolutionBackend.NUMPY)
+        self.assertEqual(matches, [0, 2, 6])
+        self.assertEqual(
+            matches, self.matches_with_backend(filter_to_test, ConvolutionBackend.PYTHON))
+
+    def test_last_window_is_not_tested(self):
+        """Test that a match ending at the last byte is ignored, like the original scan"""
+
+        filter_to_test = ConvFilter(2)
+        filter_to_test.set_kernel_bytes_using_bytestring(b"yz")
+        self.convpress.load_bytelist_from_bytestring(b"yzabyz")
+        self.convpress.wildcard_byte = b"\x00"
+        self.assertEqual(self.matches_with_backend(filter_to_test, ConvolutionBackend.NUMPY), [0])
+
+    def test_random_kernels_with_wildcards(self):
+        """Test random data and kernels against both backends"""
+
+        rng = random.Random(1234)
+        alphabet = [b"a", b"b", b"c"]
+        for _ in range(200):
+            data = b"".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 120)))
+            self.convpress.load_bytelist_from_bytestring(data)
+            self.convpress.wildcard_byte = b"?"
+            filter_to_test = ConvFilter(rng.randrange(2, 6))
+            filter_to_test.randomize_from_list(alphabet, 0.5, b"?")
+            self.assertEqual(
+                self.matches_with_backend(filter_to_test, ConvolutionBackend.NUMPY),
+                self.matches_with_backend(filter_to_test, ConvolutionBackend.PYTHON)
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
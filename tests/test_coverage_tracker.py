@@ -0,0 +1,54 @@
+"""
+Test to check if the coverage counts are kept right between generations
+"""
+import random
+import unittest
+import sys
+import numpy as np
+from classes.CoverageTracker import CoverageTracker
+from utils.convolution import convolve_numpy
+from utils.coverage import covered_positions
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compares the counts updated with deltas with counts built from nothing"""
+
+    def test_counts_after_population_churn(self):
+        """Test random populations that keep some filters and replace the others"""
+
+        rng = random.Random(11)
+        data = bytes(rng.choice(b"abc") for _ in range(2000))
+        kernels = [b"ab", b"abc", b"a\x00c", b"ca", b"b\x00\x00a", b"cc", b"bb", b"cab"]
+
+        coverage_tracker = CoverageTracker()
+        population = [rng.choice(kernels) for _ in range(10)]
+        for _ in range(20):
+            keys = [(kernel, b"\x00") for kernel in population]
+            matches = [convolve_numpy(data, kernel, b"\x00") for kernel in population]
+            positions = coverage_tracker.update(keys, matches, len(data))
+
+            counts_should_be = np.zeros(len(data), dtype=np.int64)
+            for kernel, filter_matches in zip(population, matches):
+                counts_should_be[covered_positions(filter_matches, kernel, b"\x00")] += 1
+
+            self.assertTrue(np.array_equal(coverage_tracker.get_counts(), counts_should_be))
+            self.assertEqual(
+                coverage_tracker.get_covered_bytes(), np.count_nonzero(counts_should_be))
+            self.assertEqual(len(positions), len(population))
+
+            survivors = population[:rng.randrange(0, len(population))]
+            population = survivors + [rng.choice(kernels) for _ in range(10 - len(survivors))]
+
+    def test_new_data_size_starts_over(self):
+        """Test that counts are reset when the data size changes"""
+
+        coverage_tracker = CoverageTracker()
+        coverage_tracker.update([(b"ab", b"\x00")], [[0, 4]], 10)
+        coverage_tracker.update([(b"ab", b"\x00")], [[0]], 5)
+        self.assertEqual(coverage_tracker.get_counts().tolist(), [1, 1, 0, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
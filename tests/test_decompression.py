@@ -0,0 +1,114 @@
+"""
+Test to check if decompression gives back exactly the data that was compressed
+"""
+import io
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress
+from utils.decompression import decompress_buffer
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compresses data with filters and checks the decompressed result"""
+
+    def compress_and_decompress(self, encoding: str, data: bytes, kernels: list):
+        """compress data with the kernels and return the decompressed data"""
+
+        convpress = Convpress(ByteGenerator(encoding))
+        convpress.load_file(io.BytesIO(data))
+        filters = []
+        for kernel in kernels:
+            new_filter = ConvFilter(len(kernel))
+            new_filter.set_kernel_bytes_using_bytestring(
+                kernel.replace(b"?", convpress.get_wildcard_byte()))
+            filters.append(new_filter)
+        used_filters = convpress.compress(filters)
+        header = convpress.generate_header(used_filters)
+        compressed = header + bytes(convpress.get_bytelist())
+
+        decompressor = Convpress(ByteGenerator(encoding))
+        data_view = memoryview(compressed)
+        header_length = decompressor.parse_header(data_view)
+        decompressor.byte_list = data_view[header_length:]
+        decompressor.decompress()
+        return bytes(decompressor.get_bytelist())
+
+    def expand_byte_by_byte(self, convpress: Convpress):
+        """expand every filter byte using replace_byte_for_kernel"""
+
+        convpress.byte_list = bytearray(convpress.byte_list)
+        idx = 0
+        while idx < len(convpress.byte_list):
+            for byte_to_decompress, filter_used in zip(
+                    convpress.bytes_to_decompress, convpress.decompress_filters):
+                if convpress.byte_list[idx] == byte_to_decompress[0]:
+                    convpress.replace_byte_for_kernel(idx, filter_used)
+                    break
+            idx += 1
+        return bytes(convpress.byte_list)
+
+    def test_filters_without_wildcards(self):
+        """Test that kernels without wildcards expand like replace_byte_for_kernel does"""
+
+        data = b"abcabcxxabyzabcab" * 30
+        for encoding in ByteGenerator.get_supported_encodings():
+            convpress = Convpress(ByteGenerator(encoding))
+            convpress.load_file(io.BytesIO(data))
+            filters = []
+            for kernel in [b"abc", b"ab"]:
+                new_filter = ConvFilter(len(kernel))
+                new_filter.set_kernel_bytes_using_bytestring(kernel)
+                filters.append(new_filter)
+            header = convpress.generate_header(convpress.compress(filters))
+            body = bytes(convpress.get_bytelist())
+
+            byte_by_byte = Convpress(ByteGenerator(encoding))
+            byte_by_byte.parse_header(memoryview(header))
+            byte_by_byte.byte_list = bytearray(body)
+            self.assertEqual(self.expand_byte_by_byte(byte_by_byte), data)
+
+            self.assertEqual(self.compress_and_decompress(encoding, data, [b"abc", b"ab"]), data)
+
+    def test_wildcard_slot_holding_earlier_filter(self):
+        """Test a filter whose wildcard covers the byte of a filter applied before it"""
+
+        data = b"abcqz" * 30
+        for encoding in ByteGenerator.get_supported_encodings():
+            self.assertEqual(self.compress_and_decompress(encoding, data, [b"a?c", b"b?z"]), data)
+
+    def test_random_data_and_kernels(self):
+        """Test random data with random kernels with and without wildcards"""
+
+        rng = random.Random(42)
+        alphabet = b"abcd"
+        for _ in range(100):
+            data = bytes(rng.choice(alphabet) for _ in range(rng.randrange(0, 2000)))
+            kernels = []
+            for _ in range(rng.randrange(1, 6)):
+                size = rng.randrange(2, 5)
+                kernel = bytes(rng.choice(alphabet) for _ in range(size))
+                if size > 2 and rng.random() < 0.5:
+                    wildcard_idx = rng.randrange(1, size - 1)
+                    kernel = kernel[:wildcard_idx] + b"?" + kernel[wildcard_idx+1:]
+                kernels.append(kernel)
+            encoding = rng.choice(ByteGenerator.get_supported_encodings())
+            self.assertEqual(self.compress_and_decompress(encoding, data, kernels), data)
+
+    def test_output_length_from_the_data(self):
+        """Test kernels holding codes without a length in the header, and lengths it can't have"""
+
+        codes, kernels = [b"\x01", b"\x02"], [b"ab", b"\x01c"]
+        self.assertEqual(decompress_buffer(b"\x02\x02x", codes, kernels, b"?"), b"abcabcx")
+        self.assertEqual(decompress_buffer(b"\x02\x02x", codes, kernels, b"?", 7), b"abcabcx")
+        for wrong_length in [6, 8, 2**62]:
+            with self.assertRaises(ValueError):
+                decompress_buffer(b"\x02\x02x", codes, kernels, b"?", wrong_length)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Test to check if the generations stop once the best score stops improving
+"""
+import contextlib
+import io
+import unittest
+import sys
+from arguments import parse_args_compress
+from classes.ConvGeneticAlgorithm import ConvGeneticAlgorithm
+from tests.helpers import run_generations_with
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Counts generations without improvement and runs the generations with --patience"""
+
+    def test_generations_without_improvement(self):
+        """Test the count with and without a minimum improvement"""
+
+        genetic_algorithm = ConvGeneticAlgorithm()
+        self.assertEqual(genetic_algorithm.generations_without_improvement(), 0)
+        for score in [0.1, 0.5, 0.4, 0.52, 0.5, 0.53]:
+            genetic_algorithm.add_generation_score(score)
+        self.assertEqual(genetic_algorithm.generations_without_improvement(), 0)
+        self.assertEqual(genetic_algorithm.generations_without_improvement(min_delta=0.05), 4)
+        self.assertEqual(genetic_algorithm.generations_without_improvement(min_delta=0.5), 5)
+
+    def test_stops_on_plateau(self):
+        """Test that it stops once the best score hasn't improved in --patience generations"""
+
+        stop_reason, genetic_algorithm = run_generations_with(
+            ["--g", "200", "--patience", "3", "--min-delta", "0.01"], seed=40)
+        scores = genetic_algorithm.get_generation_scores()
+        self.assertEqual(stop_reason, "plateau")
+        self.assertLess(len(scores), 200)
+        self.assertEqual(genetic_algorithm.generations_without_improvement(0.01), 3)
+        self.assertEqual(len(genetic_algorithm.history), len(scores))
+
+    def test_runs_all_generations_without_patience(self):
+        """Test that without --patience every generation runs"""
+
+        stop_reason, genetic_algorithm = run_generations_with(["--g", "6"], seed=40)
+        self.assertEqual(stop_reason, "generations")
+        self.assertEqual(len(genetic_algorithm.get_generation_scores()), 6)
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parse_args_compress(["-", "-", "--patience", "0"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Test to check if files are loaded correctly for compression and decompression
+"""
+import io
+import tempfile
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress, UnexpectedHeaderFormat
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Tests bulk loading, the alphabet histogram and header parsing"""
+
+    def setUp(self) -> None:
+        byte_generator = ByteGenerator("latin1")
+        self.convpress = Convpress(byte_generator)
+        return super().setUp()
+
+    def test_load_file_for_compression(self):
+        """Test the data and the unique bytes of a file on disk"""
+
+        data = b"\xfd\xe8r\xc9\x1e?\xfda\xe8\xc9\xa4\xb9a\xfd\xe8\xfd7\xa4"
+        with tempfile.TemporaryFile() as input_file:
+            input_file.write(data)
+            input_file.seek(0)
+            self.convpress.load_file(input_file)
+
+        self.assertEqual(bytes(self.convpress.get_bytelist()), data)
+        self.assertEqual(
+            self.convpress.get_unique_bytelist(),
+            [bytes([byte]) for byte in sorted(set(data))]
+        )
+        self.assertEqual(self.convpress.get_wildcard_byte(), b"\x00")
+
+    def test_load_stream_for_compression(self):
+        """Test a file object that can't be memory-mapped or measured"""
+
+        data = b"abracadabra"
+        self.convpress.load_file(io.BytesIO(data))
+        self.assertEqual(bytes(self.convpress.get_bytelist()), data)
+        self.assertEqual(self.convpress.get_unique_bytelist(), [b"a", b"b", b"c", b"d", b"r"])
+
+    def test_load_file_for_decompression(self):
+        """Test that the header is parsed and the rest is the data"""
+
+        filter_to_write = ConvFilter(3)
+        filter_to_write.set_kernel_bytes_using_bytestring(b"a\x00c")
+        filter_to_write.set_byte_it_represents(b"\x01")
+        self.convpress.wildcard_byte = b"\x00"
+        header = self.convpress.generate_header([filter_to_write])
+
+        with tempfile.NamedTemporaryFile() as input_file:
+            input_file.write(header + b"\x01bxyz")
+            input_file.flush()
+            input_file.seek(0)
+            self.convpress.load_file_for_decompression(input_file)
+
+        self.assertEqual(self.convpress.get_wildcard_byte(), b"\x00")
+        self.assertEqual(self.convpress.bytes_to_decompress, [b"\x01"])
+        self.assertEqual(self.convpress.decompress_filters, [filter_to_write])
+        self.assertEqual(bytes(self.convpress.get_bytelist()), b"\x01bxyz")
+
+    def test_invalid_header(self):
+        """Test that a truncated header is rejected"""
+
+        with self.assertRaises(UnexpectedHeaderFormat):
+            self.convpress.parse_header(memoryview(b"cp\x000002\x0103ab"))
+
+
+if __name__ == '__main__':
+    unittest.main()
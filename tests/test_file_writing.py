@@ -0,0 +1,48 @@
+"""
+Test to check if output files are written atomically
+"""
+import os
+import tempfile
+import unittest
+import sys
+from utils.file_writing import write_atomically
+
+sys.path.append("..")
+
+
+class FailingChunks:
+    """iterable that breaks in the middle of the writing"""
+
+    def __iter__(self):
+        yield b"half of the "
+        raise RuntimeError("killed")
+
+
+class Testing(unittest.TestCase):
+    """Tests writing chunks to a file through a temporary file"""
+
+    def test_write_chunks(self):
+        """Test that all chunks end up in the file, in order"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "output.cp")
+            write_atomically(path, [b"cp", bytearray(b"\x00"), memoryview(b"0000data")])
+            with open(path, "rb") as output_file:
+                self.assertEqual(output_file.read(), b"cp\x000000data")
+            self.assertEqual(os.listdir(directory), ["output.cp"])
+
+    def test_failure_keeps_previous_file(self):
+        """Test that a failed write doesn't touch the existing file or leave temp files"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "output.cp")
+            write_atomically(path, [b"previous"])
+            with self.assertRaises(RuntimeError):
+                write_atomically(path, FailingChunks())
+            with open(path, "rb") as output_file:
+                self.assertEqual(output_file.read(), b"previous")
+            self.assertEqual(os.listdir(directory), ["output.cp"])
+
+
+if __name__ == '__main__':
+    unittest.main()
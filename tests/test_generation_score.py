@@ -0,0 +1,110 @@
+"""
+Test to check if the generation score and the filters' scores are calculated correctly
+"""
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress, RepetitionPenaltyType
+from utils.custom_map import map_easein
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compares the vectorized scoring with scoring byte by byte"""
+
+    def setUp(self) -> None:
+        rng = random.Random(5)
+        self.convpress = Convpress(ByteGenerator("latin1"))
+        self.convpress.load_bytelist_from_bytestring(
+            bytes(rng.choice(b"abc") for _ in range(3000)))
+        self.convpress.wildcard_byte = b"\x00"
+        self.population = []
+        for kernel in [b"ab", b"abc", b"a\x00c", b"ca", b"ab", b"b\x00\x00a", b"cc"]:
+            new_filter = ConvFilter(len(kernel))
+            new_filter.set_kernel_bytes_using_bytestring(kernel)
+            self.population.append(new_filter)
+        return super().setUp()
+
+    def scores_byte_by_byte(self, penalty_type: RepetitionPenaltyType):
+        """score every filter by walking over every byte it covers"""
+
+        size = len(self.convpress.get_bytelist())
+        affected_lists = []
+        for filter_used, matches in zip(self.population, self.convpress.current_filters_matches):
+            affected = [False] * size
+            for match_idx in matches:
+                for kernel_idx, kernel_byte in enumerate(filter_used.get_kernel()):
+                    if kernel_byte != self.convpress.wildcard_byte:
+                        affected[match_idx + kernel_idx] = True
+            affected_lists.append(affected)
+
+        repetitions = [sum(column) for column in zip(*affected_lists)]
+        scores = []
+        for affected in affected_lists:
+            score = 0.0
+            for idx, is_affected in enumerate(affected):
+                if not is_affected:
+                    continue
+                if repetitions[idx] <= 1:
+                    score += 1.0
+                    continue
+                ratio = (repetitions[idx] - 1) / (len(self.population) - 1)
+                if penalty_type is RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS:
+                    score += 1.0 / repetitions[idx]
+                elif penalty_type is RepetitionPenaltyType.LINEARLY_PROPORTIONAL:
+                    score += 1.0 - ratio
+                else:
+                    score += 1.0 - map_easein(ratio)
+            scores.append(score)
+        coverage = sum(1 for count in repetitions if count > 0) / size
+        return scores, coverage
+
+    def test_all_penalty_types(self):
+        """Test the scores and the coverage for every penalty type"""
+
+        for penalty_type in RepetitionPenaltyType:
+            self.convpress.set_repetition_penalty_type(penalty_type)
+            self.convpress.convolve_all(self.population)
+            coverage = self.convpress.calculate_generation_score()
+            scores_should_be, coverage_should_be = self.scores_byte_by_byte(penalty_type)
+            self.assertAlmostEqual(coverage, coverage_should_be)
+            for score, score_should_be in zip(
+                    self.convpress.get_current_filters_scores(), scores_should_be):
+                self.assertAlmostEqual(score, score_should_be)
+
+    def test_scores_kept_between_generations(self):
+        """Test that the scores kept for unchanged filters match scoring the population anew"""
+
+        rng = random.Random(6)
+        kernels = [new_filter.get_kernel_bytestring() for new_filter in self.population]
+        kernels += [b"bb", b"cab", b"c\x00\x00c"]
+        for _ in range(15):
+            survivors = self.population[:rng.randrange(0, len(self.population))]
+            self.population = survivors
+            for kernel in rng.sample(kernels, 7 - len(survivors)):
+                new_filter = ConvFilter(len(kernel))
+                new_filter.set_kernel_bytes_using_bytestring(kernel)
+                self.population.append(new_filter)
+            self.convpress.convolve_all(self.population)
+            self.convpress.calculate_generation_score()
+            scores_should_be, _ = self.scores_byte_by_byte(
+                RepetitionPenaltyType.DIVIDE_BY_NUMBER_OF_REPETITIONS)
+            for score, score_should_be in zip(
+                    self.convpress.get_current_filters_scores(), scores_should_be):
+                self.assertAlmostEqual(score, score_should_be)
+
+    def test_filter_without_matches(self):
+        """Test that a filter without matches scores zero"""
+
+        new_filter = ConvFilter(3)
+        new_filter.set_kernel_bytes_using_bytestring(b"zzz")
+        self.convpress.convolve_all([new_filter])
+        self.assertEqual(self.convpress.calculate_generation_score(), 0.0)
+        self.assertEqual(self.convpress.get_current_filters_scores(), [0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
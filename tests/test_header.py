@@ -0,0 +1,148 @@
+"""
+Test to check if headers of both versions are written and read back the same
+"""
+import io
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress, UnexpectedHeaderFormat
+from classes.Header import FLAG_NESTED, Header
+from utils.varint import decode_varint, encode_varint
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Writes and parses version 1 and version 2 headers"""
+
+    def compress(self, data: bytes, nested: bool = False):
+        """compress the data with a few filters, returns the convpress and the filters used"""
+
+        convpress = Convpress(ByteGenerator("latin1"))
+        if nested:
+            convpress.load_bytelist_for_compression(bytearray(data), nested=True)
+        else:
+            convpress.load_file(io.BytesIO(data))
+        filters = []
+        for kernel in [b"ab", b"c?a", b"ddd"]:
+            new_filter = ConvFilter(len(kernel))
+            new_filter.set_kernel_bytes_using_bytestring(
+                kernel.replace(b"?", convpress.get_wildcard_byte()))
+            filters.append(new_filter)
+        return convpress, convpress.compress(filters)
+
+    def decompress(self, compressed: bytes) -> Convpress:
+        """decompress a whole file held in memory"""
+
+        decompressor = Convpress(ByteGenerator("latin1"))
+        decompressor.load_bytelist_for_decompression(memoryview(compressed))
+        decompressor.decompress()
+        return decompressor
+
+    def test_varints(self):
+        """Test varints around the 7 bit boundaries"""
+
+        for value in [0, 1, 127, 128, 255, 300, 16383, 16384, 2**40 + 5]:
+            encoded = encode_varint(value)
+            self.assertEqual(decode_varint(b"x" + encoded + b"y", 1), (value, 1 + len(encoded)))
+        self.assertEqual(len(encode_varint(127)), 1)
+        with self.assertRaises(ValueError):
+            decode_varint(b"\x80", 0)
+
+    def test_no_limits_in_version_2(self):
+        """Test more than 9999 filters and kernels longer than 99 bytes"""
+
+        rng = random.Random(20)
+        kernels = [bytes(rng.randrange(256) for _ in range(rng.choice([2, 150, 300])))
+                   for _ in range(10500)]
+        header = Header(wildcard_byte=b"\x00", codes=[b"\x01"] * len(kernels), kernels=kernels,
+                        original_length=123456789)
+        written = header.to_bytes()
+        parsed, header_length = Header.from_buffer(memoryview(written + b"data"))
+        self.assertEqual(header_length, len(written))
+        self.assertEqual(parsed, header)
+        with self.assertRaises(ValueError):
+            Header(wildcard_byte=b"\x00", codes=[b"\x01"], kernels=[bytes(100)], version=1).to_bytes()
+
+    def test_version_1_still_decodes(self):
+        """Test that a file with a version 1 header decompresses like before"""
+
+        rng = random.Random(21)
+        data = bytes(rng.choice(b"abcddd") for _ in range(5000))
+        convpress, used_filters = self.compress(data)
+        header = Header(
+            wildcard_byte=convpress.get_wildcard_byte(),
+            codes=[used.get_byte_it_represents() for used in used_filters],
+            kernels=[used.get_kernel_bytestring() for used in used_filters],
+            version=1
+        ).to_bytes()
+        self.assertEqual(header[:2], b"cp")
+        decompressor = self.decompress(header + bytes(convpress.get_bytelist()))
+        self.assertEqual(decompressor.decompress_header.version, 1)
+        self.assertEqual(bytes(decompressor.get_bytelist()), data)
+
+    def test_version_2_original_length(self):
+        """Test that the original length is written and checked"""
+
+        rng = random.Random(22)
+        data = bytes(rng.choice(b"abcddd") for _ in range(5000))
+        convpress, used_filters = self.compress(data)
+        header = convpress.generate_header(used_filters)
+        self.assertEqual(header[:3], b"CP\x02")
+        compressed = header + bytes(convpress.get_bytelist())
+
+        decompressor = self.decompress(compressed)
+        self.assertEqual(decompressor.decompress_header.original_length, len(data))
+        self.assertFalse(decompressor.decompress_header.is_nested())
+        self.assertEqual(bytes(decompressor.get_bytelist()), data)
+
+        for wrong_length in [len(data) - 1, len(data) + 1, 10, 2**62]:
+            parsed, header_length = Header.from_buffer(memoryview(compressed))
+            parsed.original_length = wrong_length
+            with self.assertRaises(UnexpectedHeaderFormat):
+                self.decompress(parsed.to_bytes() + compressed[header_length:])
+
+        with self.assertRaises(UnexpectedHeaderFormat):
+            self.decompress(compressed[:len(header) - 2])
+
+    def test_nested_flag(self):
+        """Test that stacking a compressed file sets the nested flag"""
+
+        rng = random.Random(23)
+        data = bytes(rng.choice(b"abcddd") for _ in range(5000))
+        convpress, used_filters = self.compress(data)
+        compressed = convpress.generate_header(used_filters) + bytes(convpress.get_bytelist())
+
+        convpress, used_filters = self.compress(compressed, nested=True)
+        self.assertTrue(convpress.data_is_nested)
+        header = convpress.generate_header(used_filters)
+        parsed, _ = Header.from_buffer(memoryview(header))
+        self.assertEqual(parsed.flags & FLAG_NESTED, FLAG_NESTED)
+
+        decompressor = Convpress(ByteGenerator("latin1"))
+        decompressor.load_bytelist_for_decompression(
+            memoryview(header + bytes(convpress.get_bytelist())))
+        self.assertEqual(decompressor.decompress_all_layers(), 2)
+        self.assertEqual(bytes(decompressor.get_bytelist()), data)
+
+    def test_data_that_looks_like_a_header(self):
+        """Test that plain data starting like a header isn't taken for another layer"""
+
+        rng = random.Random(24)
+        data = b"cpa0000 " + bytes(rng.choice(b"abcddd") for _ in range(5000))
+        convpress, used_filters = self.compress(data)
+        self.assertFalse(convpress.data_is_nested)
+        header = convpress.generate_header(used_filters)
+        self.assertFalse(Header.from_buffer(memoryview(header))[0].is_nested())
+
+        decompressor = Convpress(ByteGenerator("latin1"))
+        decompressor.load_bytelist_for_decompression(
+            memoryview(header + bytes(convpress.get_bytelist())))
+        self.assertEqual(decompressor.decompress_all_layers(), 1)
+        self.assertEqual(bytes(decompressor.get_bytelist()), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
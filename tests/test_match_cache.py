@@ -0,0 +1,76 @@
+"""
+Test to check if the matches of kernels are cached between generations
+"""
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress
+from classes.MatchCache import MatchCache
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Tests the match cache and its use by convolve_all"""
+
+    def setUp(self) -> None:
+        byte_generator = ByteGenerator("latin1")
+        self.convpress = Convpress(byte_generator)
+        self.convpress.load_bytelist_from_bytestring(b"abcabcabxabcab" * 3)
+        self.convpress.wildcard_byte = b"\x00"
+        return super().setUp()
+
+    @staticmethod
+    def new_filter(kernel: bytes) -> ConvFilter:
+        """create a filter with the kernel"""
+        filter_to_return = ConvFilter(len(kernel))
+        filter_to_return.set_kernel_bytes_using_bytestring(kernel)
+        return filter_to_return
+
+    def test_least_recently_used_is_dropped(self):
+        """Test that the cache keeps at most max_size entries"""
+
+        match_cache = MatchCache(max_size=2)
+        match_cache.put("a", [1])
+        match_cache.put("b", [2])
+        self.assertEqual(match_cache.get("a"), [1])
+        match_cache.put("c", [3])
+        self.assertIsNone(match_cache.get("b"))
+        self.assertEqual(match_cache.get("c"), [3])
+        self.assertEqual(len(match_cache), 2)
+        self.assertEqual((match_cache.get_hits(), match_cache.get_misses()), (2, 1))
+
+    def test_repeated_kernels_are_not_convolved_again(self):
+        """Test that equal kernels hit the cache and get the same matches"""
+
+        population = [self.new_filter(b"abc"), self.new_filter(b"ab"), self.new_filter(b"abc")]
+        self.convpress.convolve_all(population)
+        first_matches = self.convpress.current_filters_matches
+        self.convpress.convolve_all(population)
+
+        match_cache = self.convpress.get_match_cache()
+        self.assertEqual(match_cache.get_misses(), 2)
+        self.assertEqual(match_cache.get_hits(), 4)
+        self.assertEqual(self.convpress.current_filters_matches, first_matches)
+        self.assertEqual(
+            self.convpress.current_filters_matches[0],
+            self.convpress.convolve(population[0])
+        )
+
+    def test_cache_is_cleared_when_data_changes(self):
+        """Test that replacing matches invalidates the cached matches"""
+
+        filter_to_test = self.new_filter(b"abc")
+        filter_to_test.set_byte_it_represents(b"\x01")
+        self.convpress.convolve_all([filter_to_test])
+        self.convpress.replace_matches_for_newbyte(
+            matches=self.convpress.convolve(filter_to_test),
+            filter_used=filter_to_test
+        )
+        self.convpress.convolve_all([filter_to_test])
+        self.assertEqual(self.convpress.current_filters_matches, [[]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Test to check if the phases of a compression are timed and written as JSON lines
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import sys
+from arguments import parse_args_compress
+from classes.Metrics import Metrics
+from classes.TimeBudget import TimeBudget
+from convpress import compress_pass
+from tests.helpers import loaded_convpress
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Times phases with and without a metrics file and a profile"""
+
+    def read_lines(self, filename: str) -> list:
+        """the JSON lines of the metrics file"""
+
+        with open(filename, encoding="utf-8") as metrics_file:
+            return [json.loads(line) for line in metrics_file]
+
+    def test_phases_and_summary(self):
+        """Test that every phase is a line and the summary adds them up"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "metrics.jsonl")
+            metrics = Metrics(filename)
+            metrics.set_context(pass_number=1)
+            for generation in range(3):
+                with metrics.phase("convolve", generation=generation):
+                    pass
+            with metrics.phase("compress"):
+                pass
+            metrics.count("filters_rejected", 2)
+            metrics.count("filters_rejected", 3)
+            metrics.close()
+
+            lines = self.read_lines(filename)
+
+        self.assertEqual([line["phase"] for line in lines[:-1]], ["convolve"] * 3 + ["compress"])
+        self.assertEqual([line["generation"] for line in lines[:3]], [0, 1, 2])
+        self.assertTrue(all(line["pass_number"] == 1 for line in lines[:-1]))
+        self.assertTrue(all(line["seconds"] >= 0 for line in lines[:-1]))
+        summary = lines[-1]
+        self.assertEqual(summary["event"], "summary")
+        self.assertEqual(summary["phases"]["convolve"]["count"], 3)
+        self.assertEqual(summary["counters"], {"filters_rejected": 5})
+
+    def test_without_file(self):
+        """Test that the totals are kept without writing anything"""
+
+        metrics = Metrics()
+        with self.assertRaises(KeyError):
+            with metrics.phase("score"):
+                raise KeyError()
+        metrics.emit("generation", score=1.0)
+        metrics.close()
+        self.assertEqual(list(metrics.get_phase_seconds()), ["score"])
+
+    def test_compress_pass(self):
+        """Test the phases, matches and rejected filters of a whole compression pass"""
+
+        convpress = loaded_convpress(seed=30, size=3000)
+        args = parse_args_compress(["-", "-", "--ps", "10", "--g", "3"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "metrics.jsonl")
+            prefix = os.path.join(directory, "profile")
+            metrics = Metrics(filename, prefix)
+            with contextlib.redirect_stdout(io.StringIO()):
+                used_filters = compress_pass(convpress, args, metrics, TimeBudget())
+            metrics.close()
+
+            lines = self.read_lines(filename)
+            profiles = sorted(os.listdir(directory))
+
+        phases = {line["phase"] for line in lines if line["event"] == "phase"}
+        self.assertEqual(phases, {"seed", "convolve", "score", "selection",
+                                  "reproduce", "mutation", "compress"})
+        self.assertEqual(profiles, sorted(["metrics.jsonl"] + [
+            f"profile.{phase}.prof" for phase in phases]))
+
+        generations = [line for line in lines if line["event"] == "generation"]
+        self.assertEqual([line["generation"] for line in generations], [0, 1, 2])
+        counters = lines[-1]["counters"]
+        self.assertEqual(counters["matches_found"],
+                         sum(line["matches_found"] for line in generations))
+        compressed = [line for line in lines if line["event"] == "compress"][0]
+        self.assertEqual(compressed["filters_used"], len(used_filters))
+        self.assertEqual(counters["filters_rejected"], compressed["filters_rejected"])
+
+
+if __name__ == '__main__':
+    unittest.main()
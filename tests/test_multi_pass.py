@@ -0,0 +1,108 @@
+"""
+Test to check if data compressed again in memory, with the headers stacked,
+decompresses back to the original (layer by layer or all at once)
+"""
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress
+from classes.Header import Header
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compresses three times in one Convpress and decompresses every layer"""
+
+    def compress_pass(self, convpress: Convpress) -> bytes:
+        """compress the loaded data with frequent pairs and return the header"""
+
+        data = bytes(convpress.get_bytelist())
+        pairs = sorted({data[idx:idx+2] for idx in range(len(data) - 1)},
+                       key=data.count, reverse=True)[:6]
+        filters = []
+        for pair in pairs:
+            new_filter = ConvFilter(3)
+            new_filter.set_kernel_bytes_using_bytestring(
+                pair[0:1] + convpress.get_wildcard_byte() + pair[1:2])
+            filters.append(new_filter)
+        used_filters = convpress.compress(filters_to_use=filters)
+        return convpress.generate_header(used_filters=used_filters)
+
+    def compress_three_times(self, original: bytes, nested: bool = True) -> bytes:
+        """
+        compress three times in one Convpress, stacking the headers
+        (with nested False like separate runs would, without the nested flag)
+        """
+
+        convpress = Convpress(ByteGenerator("latin1"))
+        convpress.load_bytelist_for_compression(bytearray(original))
+        header = self.compress_pass(convpress)
+        for _ in range(2):
+            convpress.set_byte_generator(ByteGenerator("latin1"))
+            convpress.load_bytelist_for_compression(
+                bytearray(header) + convpress.get_bytelist(), nested=nested)
+            self.assertNotIn(convpress.get_wildcard_byte(), convpress.get_bytelist())
+            header = self.compress_pass(convpress)
+        return header + bytes(convpress.get_bytelist())
+
+    def test_stacked_passes(self):
+        """Test that every pass gets a new wildcard and that the layers unwind one by one"""
+
+        rng = random.Random(13)
+        original = bytes(rng.choice(b"aabbbcd  ") for _ in range(5000))
+        compressed = self.compress_three_times(original)
+        self.assertLess(len(compressed), len(original))
+
+        for _ in range(3):
+            decompressor = Convpress(ByteGenerator("latin1"))
+            decompressor.load_bytelist_for_decompression(memoryview(compressed))
+            decompressor.decompress()
+            compressed = bytes(decompressor.get_bytelist())
+        self.assertEqual(compressed, original)
+
+    def test_all_layers_at_once(self):
+        """
+        Test unwinding every layer in memory, flagged as nested or not,
+        also for data that starts like a header
+        """
+
+        rng = random.Random(14)
+        for original in [
+                bytes(rng.choice(b"aabbbcd  ") for _ in range(5000)),
+                b"cp?0002" + bytes(rng.choice(b"aabbbcd  ") for _ in range(5000)),
+                Header(wildcard_byte=b"?", original_length=99).to_bytes()
+                + bytes(rng.choice(b"aabbbcd  ") for _ in range(5000))]:
+            for nested in [True, False]:
+                decompressor = Convpress(ByteGenerator("latin1"))
+                decompressor.load_bytelist_for_decompression(
+                    memoryview(self.compress_three_times(original, nested)))
+                self.assertEqual(decompressor.decompress_all_layers(), 3)
+                self.assertEqual(bytes(decompressor.get_bytelist()), original)
+
+            decompressor = Convpress(ByteGenerator("latin1"))
+            decompressor.load_bytelist_for_decompression(
+                memoryview(self.compress_three_times(original, nested=False)))
+            self.assertEqual(decompressor.decompress_all_layers(guess_layers=False), 1)
+
+    def test_version_1_zero_filter_header(self):
+        """Test that data under a version 1 header starting with a header of no filters is kept"""
+
+        rng = random.Random(15)
+        original = b"cpa0000 " + bytes(rng.choice(b"aabbbcd  ") for _ in range(5000))
+        convpress = Convpress(ByteGenerator("latin1"))
+        convpress.load_bytelist_for_compression(bytearray(original))
+        parsed, _ = Header.from_buffer(memoryview(self.compress_pass(convpress)))
+        parsed.version = 1
+
+        decompressor = Convpress(ByteGenerator("latin1"))
+        decompressor.load_bytelist_for_decompression(
+            memoryview(parsed.to_bytes() + bytes(convpress.get_bytelist())))
+        self.assertEqual(decompressor.decompress_all_layers(), 1)
+        self.assertEqual(bytes(decompressor.get_bytelist()), original)
+
+
+if __name__ == '__main__':
+    unittest.main()
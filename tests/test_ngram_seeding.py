@@ -0,0 +1,51 @@
+"""
+Test to check if the n-gram counting finds the most frequent (gapped) n-grams
+"""
+import random
+import unittest
+import sys
+from collections import Counter
+from utils.ngram import count_ngrams, gap_patterns, top_ngram_kernels
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Compares the n-gram counts with counting window by window"""
+
+    def test_counts(self):
+        """Test every gap pattern against a Counter over all windows"""
+
+        rng = random.Random(12)
+        data = bytes(rng.choice(b"abcd") for _ in range(2000))
+        for size in [2, 3, 5, 10]:
+            for literal_offsets in gap_patterns(size):
+                counts_should_be = Counter(
+                    bytes(data[idx + offset] for offset in literal_offsets)
+                    for idx in range(len(data) - size + 1))
+                first_positions, counts = count_ngrams(data, size, literal_offsets)
+                counted = {
+                    bytes(data[position + offset] for offset in literal_offsets): count
+                    for position, count in zip(first_positions.tolist(), counts.tolist())}
+                self.assertEqual(counted, dict(counts_should_be))
+
+    def test_top_kernels(self):
+        """Test that the repeated words come first and gaps hold the wildcard"""
+
+        data = b"the cat and the hat and the bat " * 20
+        kernels = top_ngram_kernels(data, range(2, 5), b"?", 20)
+        self.assertEqual(len(kernels), 20)
+        self.assertIn(b"the ", kernels)
+        self.assertIn(b" ?at", kernels)
+        for kernel in kernels:
+            self.assertNotEqual(kernel[0:1], b"?")
+            self.assertNotEqual(kernel[-1:], b"?")
+
+    def test_short_data(self):
+        """Test data shorter than the kernels"""
+
+        self.assertEqual(top_ngram_kernels(b"ab", range(3, 5), b"?", 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 """
 Test to check if matches are being replaced by the compression byte correctly
 """
+import random
 import unittest
 import sys
 from classes.ByteGenerator import ByteGenerator
@@ -105,6 +106,35 @@ class Testing(unittest.TestCase):
         should_be_this_length = len(input_byte_string) - (len(matches) * (kernel_size_without_wildcards - 1))
         self.assertTrue(len(self.convpress.byte_list) == should_be_this_length)
 
+    def test_random_matches_against_one_by_one_removal(self):
+        """Test random data against removing the matched bytes one by one"""
+
+        rng = random.Random(7)
+        self.convpress.wildcard_byte = b"?"
+        for _ in range(100):
+            data = bytes(rng.choice(b"xyz") for _ in range(rng.randrange(0, 200)))
+            kernel = bytes(rng.choice(b"xyz") for _ in range(rng.randrange(2, 6)))
+            if len(kernel) > 2:
+                kernel = kernel[:1] + b"?" + kernel[2:]
+            filter_to_test = ConvFilter(len(kernel))
+            filter_to_test.set_kernel_bytes_using_bytestring(kernel)
+            filter_to_test.set_byte_it_represents(b"\x07")
+            self.convpress.load_bytelist_from_bytestring(data)
+            matches = self.convpress.convolve(filter_to_test)
+
+            bytestring_should_be = bytearray(data)
+            for matched_idx in reversed(matches):
+                for kernel_idx in reversed(range(1, len(kernel))):
+                    if kernel[kernel_idx:kernel_idx+1] != b"?":
+                        bytestring_should_be.pop(matched_idx + kernel_idx)
+                bytestring_should_be[matched_idx] = 7
+
+            self.convpress.replace_matches_for_newbyte(
+                    matches = matches,
+                    filter_used = filter_to_test
+                    )
+            self.assertTrue(bytelist_to_bytestring(self.convpress.byte_list) == bytestring_should_be)
+
 if __name__ == '__main__':
 
     unittest.main()
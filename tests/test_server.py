@@ -0,0 +1,139 @@
+"""
+Test to check if the compression server runs jobs sent to its unix socket, refusing them when full
+"""
+import asyncio
+import os
+import random
+import signal
+import tempfile
+import threading
+import time
+import unittest
+import sys
+from classes.CompressionServer import CompressionServer
+from utils.server_protocol import send_request
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Starts a server in a thread and talks to it over a unix socket"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.socket_path = os.path.join(self.directory.name, "convpress.sock")
+        rng = random.Random(70)
+        self.data = bytes(rng.choice(b"abcddd  ") for _ in range(20000))
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        return super().tearDown()
+
+    def start_server(self, max_pending: int = 4, max_size: int = 1000000) -> threading.Thread:
+        """start a server with 2 workers in a thread and wait until it listens"""
+
+        server = CompressionServer(workers=2, max_pending=max_pending, max_size=max_size)
+        thread = threading.Thread(target=asyncio.run, args=(server.serve(self.socket_path),))
+        thread.start()
+        deadline = time.monotonic() + 60
+        while not os.path.exists(self.socket_path):
+            if time.monotonic() > deadline or not thread.is_alive():
+                self.fail("server didn't start")
+            time.sleep(0.05)
+        return thread
+
+    def stop_server(self, thread: threading.Thread):
+        """ask the server to shut down and wait for it"""
+
+        answer, _ = send_request(self.socket_path, "shutdown")
+        self.assertTrue(answer["ok"])
+        thread.join(60)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_jobs(self):
+        """Test a round trip, the stats and the errors sent back"""
+
+        thread = self.start_server(max_size=len(self.data))
+        try:
+            answer, compressed = send_request(
+                self.socket_path, "compress", self.data, {"seed": 1, "ps": 20, "g": 5})
+            self.assertTrue(answer["ok"])
+            self.assertEqual(answer["stats"]["input_size"], len(self.data))
+            self.assertEqual(answer["stats"]["output_size"], len(compressed))
+            self.assertLess(len(compressed), len(self.data))
+
+            answer, decompressed = send_request(self.socket_path, "decompress", compressed)
+            self.assertTrue(answer["ok"])
+            self.assertEqual(decompressed, self.data)
+
+            answer, _ = send_request(self.socket_path, "compress", self.data, {"population": 20})
+            self.assertEqual(answer["error"], "TypeError")
+            answer, _ = send_request(self.socket_path, "decompress", b"not compressed")
+            self.assertEqual(answer["error"], "UnexpectedHeaderFormat")
+            answer, _ = send_request(self.socket_path, "compress", self.data + b"x")
+            self.assertEqual(answer["error"], "too_big")
+            answer, _ = send_request(self.socket_path, "rename")
+            self.assertEqual(answer["error"], "bad_request")
+
+            answer, _ = send_request(self.socket_path, "stats")
+            self.assertEqual(answer["stats"]["jobs"], 2)
+            self.assertEqual(answer["stats"]["failed"], 2)
+            self.assertEqual(answer["stats"]["too_big"], 1)
+            self.assertEqual(answer["stats"]["pending"], 0)
+        finally:
+            self.stop_server(thread)
+
+    def test_busy(self):
+        """Test that a job past max_pending is refused instead of queued"""
+
+        thread = self.start_server(max_pending=1)
+        try:
+            answers = []
+            slow_job = threading.Thread(target=lambda: answers.append(send_request(
+                self.socket_path, "compress", self.data, {"seed": 1, "ps": 40, "g": 100000,
+                                                          "time_budget": 1.5})))
+            slow_job.start()
+            while send_request(self.socket_path, "stats")[0]["stats"]["pending"] == 0:
+                time.sleep(0.01)
+
+            answer, _ = send_request(self.socket_path, "compress", self.data)
+            self.assertEqual(answer["error"], "busy")
+
+            slow_job.join()
+            self.assertTrue(answers[0][0]["ok"])
+            answer, _ = send_request(self.socket_path, "stats")
+            self.assertEqual(answer["stats"]["busy"], 1)
+        finally:
+            self.stop_server(thread)
+
+    def test_killed_worker(self):
+        """Test that jobs are still answered after a worker is killed"""
+
+        thread = self.start_server()
+        try:
+            answer, _ = send_request(self.socket_path, "compress", self.data, {"seed": 1, "g": 2})
+            killed_pid = answer["stats"]["worker_pid"]
+            os.kill(killed_pid, signal.SIGKILL)
+
+            # the jobs sent before the pool notices the dead worker may fail,
+            # but they're answered, and once the workers are started again jobs run
+            for _ in range(20):
+                answer, compressed = send_request(
+                    self.socket_path, "compress", self.data, {"seed": 1, "g": 2})
+                if answer["ok"]:
+                    self.assertNotEqual(answer["stats"]["worker_pid"], killed_pid)
+                    break
+                self.assertEqual(answer["error"], "internal")
+                time.sleep(0.1)
+            self.assertTrue(answer["ok"])
+
+            answer, decompressed = send_request(self.socket_path, "decompress", compressed)
+            self.assertEqual(decompressed, self.data)
+        finally:
+            self.stop_server(thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Test to check if the suffix array index finds the same matches as scanning the data
+"""
+import random
+import unittest
+import sys
+from classes.ByteGenerator import ByteGenerator
+from classes.ConvFilter import ConvFilter
+from classes.Convpress import Convpress
+from classes.SuffixIndex import SuffixIndex, build_suffix_array
+from utils.convolution import buffer_as_array
+
+sys.path.append("..")
+
+
+class Testing(unittest.TestCase):
+    """Tests the suffix array and convolving through the index"""
+
+    def test_suffix_array_is_sorted(self):
+        """Test the suffix array against sorting all suffixes"""
+
+        rng = random.Random(8)
+        for data in [b"", b"a", b"aaaaaaa", b"banana", b"mississippi", b"\x00" * 9, b"a\x00\x00"] + [
+                bytes(rng.choice(b"a\x00") for _ in range(rng.randrange(1, 200))) for _ in range(20)]:
+            suffix_array = build_suffix_array(buffer_as_array(data)).tolist()
+            self.assertEqual(suffix_array, sorted(range(len(data)), key=lambda idx: data[idx:]))
+
+    def test_positions_of_sequence(self):
+        """Test that every occurrence is found, overlapping ones included"""
+
+        suffix_index = SuffixIndex(b"abababcab")
+        self.assertEqual(suffix_index.positions(b"ab").tolist(), [0, 2, 4, 7])
+        self.assertEqual(suffix_index.positions(b"aba").tolist(), [0, 2])
+        self.assertEqual(suffix_index.count(b"zz"), 0)
+
+    def test_convolve_with_index(self):
+        """Test random kernels with and without wildcards with and without the index"""
+
+        rng = random.Random(9)
+        data = bytes(rng.choice(b"abcdefghij") for _ in range(4000))
+        scanning = Convpress(ByteGenerator("latin1"))
+        indexed = Convpress(ByteGenerator("latin1"))
+        for convpress in [scanning, indexed]:
+            convpress.load_bytelist_from_bytestring(data)
+            convpress.wildcard_byte = b"?"
+        indexed.build_match_index()
+
+        for _ in range(200):
+            size = rng.randrange(2, 7)
+            filter_to_test = ConvFilter(size)
+            filter_to_test.set_kernel_bytes_using_bytestring(
+                bytes(rng.choice(b"abcdefghij??") for _ in range(size)))
+            self.assertEqual(indexed.convolve(filter_to_test), scanning.convolve(filter_to_test))
+
+
+if __name__ == '__main__':
+    unittest.main()
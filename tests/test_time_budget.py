@@ -0,0 +1,71 @@
+"""
+Test to check if a run with a time budget stops the generations in time
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from classes.TimeBudget import TimeBudget
+from tests.helpers import run_generations_with
+
+sys.path.append("..")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Testing(unittest.TestCase):
+    """Predicts whether generations fit and runs convpress.py with --time-budget"""
+
+    def test_prediction(self):
+        """Test that the slowest generation and the compress reserve are taken into account"""
+
+        self.assertTrue(TimeBudget().next_generation_fits())
+        time_budget = TimeBudget(10)
+        self.assertTrue(time_budget.next_generation_fits())
+        # 3 of the slowest generation are kept for compressing and writing
+        time_budget.record_generation(2)
+        time_budget.record_generation(1)
+        self.assertTrue(time_budget.next_generation_fits())
+        time_budget.record_generation(2.5)
+        self.assertTrue(time_budget.fits(1))
+        self.assertFalse(time_budget.next_generation_fits())
+
+    def test_stops_generations(self):
+        """Test that with no time left only the first generation runs"""
+
+        stop_reason, genetic_algorithm = run_generations_with(
+            ["--g", "50"], seed=50, time_budget=TimeBudget(1e-9))
+        self.assertEqual(stop_reason, "time_budget")
+        self.assertEqual(len(genetic_algorithm.get_generation_scores()), 1)
+
+    def test_whole_run_fits(self):
+        """Test that a run of many generations and passes ends within the budget and decompresses"""
+
+        rng = random.Random(51)
+        data = bytes(rng.choice(b"abcdefgh  ") for _ in range(200000))
+        with tempfile.TemporaryDirectory() as directory:
+            original = os.path.join(directory, "original")
+            compressed = os.path.join(directory, "compressed")
+            decompressed = os.path.join(directory, "decompressed")
+            with open(original, "wb") as original_file:
+                original_file.write(data)
+
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(ROOT, "convpress.py"), original, compressed,
+                            "--g", "100000", "--until-no-gain", "--time-budget", "2"],
+                           check=True, stdout=subprocess.DEVNULL)
+            seconds = time.perf_counter() - start
+            subprocess.run([sys.executable, os.path.join(ROOT, "deconvpress.py"), compressed,
+                            decompressed, "--all-layers"], check=True, stdout=subprocess.DEVNULL)
+            with open(decompressed, "rb") as decompressed_file:
+                self.assertEqual(decompressed_file.read(), data)
+
+        # the interpreter starting and importing numpy isn't part of the budget
+        self.assertLess(seconds, 2 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
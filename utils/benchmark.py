@@ -0,0 +1,112 @@
+"""
+functions for benchmarking: synthetic data, timing, peak memory and baselines.
+"""
+import lzma
+import time
+import tracemalloc
+import zlib
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from utils.file_loading import byte_histogram
+
+CORPUS_KINDS = ["repetitive", "text", "random"]
+
+
+def make_corpus(kind: str, size: int, seed: int) -> bytes:
+    """
+    Synthetic data of that size, the same for the same kind, size and seed:
+    repetitive: a handful of short phrases over a small alphabet, one after the other
+    text: words of a made up vocabulary with zipf-like frequencies, separated by spaces
+    random: uniformly random bytes (nothing to compress), 192 of the byte values only,
+    because convpress needs bytes that aren't in the data for its wildcard and filters
+    """
+    rng = np.random.default_rng([seed, CORPUS_KINDS.index(kind), size])
+    if kind == "random":
+        return rng.integers(0, 192, size, dtype=np.uint8).tobytes()
+
+    if kind == "repetitive":
+        pieces = [rng.integers(97, 103, rng.integers(4, 16), dtype=np.uint8).tobytes()
+                  for _ in range(8)]
+        probabilities = np.full(len(pieces), 1 / len(pieces))
+        separator = b""
+    else:
+        pieces = [rng.integers(97, 123, rng.integers(1, 10), dtype=np.uint8).tobytes()
+                  for _ in range(500)]
+        probabilities = 1 / np.arange(1, len(pieces) + 1)
+        probabilities /= probabilities.sum()
+        separator = b" "
+
+    chunks = []
+    length = 0
+    while length < size:
+        for piece_idx in rng.choice(len(pieces), size=max(size // 4, 16), p=probabilities):
+            chunks.append(pieces[piece_idx])
+            length += len(pieces[piece_idx]) + len(separator)
+    return separator.join(chunks)[:size]
+
+
+def byte_entropy(data: bytes) -> float:
+    """shannon entropy of the byte values, in bits per byte (0 to 8)"""
+    if len(data) == 0:
+        return 0.0
+    probabilities = byte_histogram(data) / len(data)
+    probabilities = probabilities[probabilities > 0]
+    return float(-(probabilities * np.log2(probabilities)).sum())
+
+
+def measure(setup: Callable, run: Callable, repeat: int) -> Dict:
+    """
+    Time run(setup()) repeat times and keep the fastest time
+    (setup isn't timed), then run it once more under tracemalloc
+    for the peak memory it allocates. Returns the times and the last result.
+    """
+    seconds = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        seconds.append(time.perf_counter() - start)
+
+    state = setup()
+    tracemalloc.start()
+    try:
+        result = run(state)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(seconds), "peak_memory_bytes": peak_memory, "result": result}
+
+
+def throughput(size: int, seconds: float) -> float:
+    """megabytes (10^6 bytes) per second"""
+    if seconds <= 0:
+        return None
+    return size / 1e6 / seconds
+
+
+def scaling_exponent(sizes: List[int], seconds: List[float]) -> float:
+    """
+    k in seconds ~ size^k, fitted on a log-log scale
+    (1 is linear, 2 quadratic). None with fewer than 2 sizes.
+    """
+    if len(set(sizes)) < 2:
+        return None
+    exponent, _ = np.polyfit(np.log(sizes), np.log(np.maximum(seconds, 1e-9)), 1)
+    return float(exponent)
+
+
+def baselines(data: bytes, repeat: int) -> Dict[str, Dict]:
+    """compression ratio and speed of zlib (level 9) and lzma (preset 6) on the data"""
+    results = {}
+    for name, compress in [("zlib", lambda data: zlib.compress(data, 9)),
+                           ("lzma", lambda data: lzma.compress(data, preset=6))]:
+        measured = measure(lambda: data, compress, repeat)
+        results[name] = {
+            "seconds": measured["seconds"],
+            "mb_per_s": throughput(len(data), measured["seconds"]),
+            "ratio": len(measured["result"]) / max(len(data), 1)
+        }
+    return results
@@ -0,0 +1,204 @@
+"""
+functions for the block stream format, where the data is compressed block by block
+with filters that were found on a sample of it:
+
+"cs" marker
++ 10 bytes with the length of the header that follows (0000000000 to 9999999999)
++ a convpress header with the wildcard and the filters (see classes/Header.py)
+then for each block
+    + a bit mask of the filters applied to the block (one bit per filter, in header order)
+    + 10 bytes with the length of the compressed block
+    + the compressed block
+then an empty block (mask and length all zeros)
+and the block table, so blocks can be found without reading the ones before them:
+    "bt" marker
+    + for each block, 10 bytes with its original length and 10 bytes with its compressed length
+      (mask and length included)
+    + 10 bytes with the number of blocks
+    + "bt" marker again, so the table can be found from the end of the file.
+The block table is also the seek index: it maps every block's offset in the file
+to its offset in the original data, so a byte range only needs the blocks covering it.
+"""
+import bisect
+import os
+from itertools import accumulate
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from utils.convolution import convolve_numpy
+from utils.decompression import decompress_buffer
+from utils.file_loading import byte_histogram
+from utils.streaming import read_exactly
+from utils.substitution import substitute_matches
+
+STREAM_MARKER = b"cs"
+TABLE_MARKER = b"bt"
+LENGTH_DIGITS = 10
+
+
+def mask_length(number_of_filters: int) -> int:
+    """how many bytes the mask of applied filters takes"""
+    return (number_of_filters + 7) // 8
+
+
+def encode_length(length: int) -> bytes:
+    """length as a fixed number of ascii digits"""
+    return f"{length:0{LENGTH_DIGITS}}".encode("latin1")
+
+
+def decode_length(digits: bytes) -> int:
+    """read a length written by encode_length"""
+    if len(digits) != LENGTH_DIGITS or not digits.isdigit():
+        raise ValueError("Block stream is truncated or corrupted.")
+    return int(digits)
+
+
+def stream_header(header: bytes) -> bytes:
+    """start of a block stream, holding the header with the filters"""
+    return STREAM_MARKER + encode_length(len(header)) + header
+
+
+def read_stream_header(file) -> bytes:
+    """read the start of a block stream and return the header with the filters"""
+    if read_exactly(file, len(STREAM_MARKER)) != STREAM_MARKER:
+        raise ValueError("First two bytes aren't the block stream marker.")
+    header_length = decode_length(read_exactly(file, LENGTH_DIGITS))
+    header = read_exactly(file, header_length)
+    if len(header) != header_length:
+        raise ValueError("Block stream header is truncated.")
+    return header
+
+
+def end_of_stream(number_of_filters: int) -> bytes:
+    """the empty block that closes the stream"""
+    return bytes(mask_length(number_of_filters)) + encode_length(0)
+
+
+def compress_block(block: bytes, kernels: List[bytes], codes: List[bytes],
+                   wildcard_byte: bytes) -> bytes:
+    """
+    Compress one block with the filters, in order, and return it ready to be written.
+    A filter is skipped if its code already shows up in the block
+    (it couldn't be told apart from the data) or if it has no matches.
+    """
+    data = bytearray(block)
+    present = byte_histogram(block) > 0
+    applied = np.zeros(len(kernels), dtype=bool)
+    for filter_idx, (kernel, code) in enumerate(zip(kernels, codes)):
+        if present[code[0]]:
+            continue
+        matches = convolve_numpy(data, kernel, wildcard_byte)
+        if len(matches) == 0:
+            continue
+        data = substitute_matches(data, matches, kernel, wildcard_byte, code)
+        applied[filter_idx] = True
+    return np.packbits(applied).tobytes() + encode_length(len(data)) + bytes(data)
+
+
+def read_block_frames(file, number_of_filters: int) -> Iterator[Tuple[bytes, bytes]]:
+    """read the (mask, compressed block) of every block until the empty block"""
+    while True:
+        mask = read_exactly(file, mask_length(number_of_filters))
+        length = decode_length(read_exactly(file, LENGTH_DIGITS))
+        if len(mask) != mask_length(number_of_filters):
+            raise ValueError("Block stream is truncated.")
+        if length == 0:
+            return
+        payload = read_exactly(file, length)
+        if len(payload) != length:
+            raise ValueError("Block stream is truncated.")
+        yield mask, payload
+
+
+def decompress_block(mask: bytes, payload: bytes, kernels: List[bytes], codes: List[bytes],
+                     wildcard_byte: bytes) -> bytearray:
+    """decompress one block with the filters its mask says were applied"""
+    applied = np.unpackbits(np.frombuffer(mask, dtype=np.uint8))[:len(kernels)]
+    applied_indexes = np.flatnonzero(applied).tolist()
+    return decompress_buffer(
+        payload,
+        codes=[codes[filter_idx] for filter_idx in applied_indexes],
+        kernels=[kernels[filter_idx] for filter_idx in applied_indexes],
+        wildcard_byte=wildcard_byte
+    )
+
+
+def block_table(entries: List[Tuple[int, int]]) -> bytes:
+    """the block table for the (original length, compressed length) of every block"""
+    parts = [TABLE_MARKER]
+    for original_length, compressed_length in entries:
+        parts.append(encode_length(original_length))
+        parts.append(encode_length(compressed_length))
+    parts.append(encode_length(len(entries)))
+    parts.append(TABLE_MARKER)
+    return b"".join(parts)
+
+
+def read_block_table(file) -> List[Tuple[int, int]]:
+    """read the block table from the end of a seekable block stream file"""
+    footer_length = LENGTH_DIGITS + len(TABLE_MARKER)
+    try:
+        file.seek(-footer_length, os.SEEK_END)
+    except OSError as exception:
+        raise ValueError("Block stream has no block table.") from exception
+    footer = read_exactly(file, footer_length)
+    if footer[LENGTH_DIGITS:] != TABLE_MARKER:
+        raise ValueError("Block stream has no block table.")
+    number_of_blocks = decode_length(footer[:LENGTH_DIGITS])
+
+    entry_length = 2 * LENGTH_DIGITS
+    table_length = len(TABLE_MARKER) + number_of_blocks * entry_length + footer_length
+    try:
+        file.seek(-table_length, os.SEEK_END)
+    except OSError as exception:
+        raise ValueError("Block table is corrupted.") from exception
+    table = read_exactly(file, table_length)
+    if table[:len(TABLE_MARKER)] != TABLE_MARKER:
+        raise ValueError("Block table is corrupted.")
+
+    entries = []
+    for entry_start in range(len(TABLE_MARKER), len(TABLE_MARKER) + number_of_blocks * entry_length,
+                             entry_length):
+        entries.append((
+            decode_length(table[entry_start:entry_start + LENGTH_DIGITS]),
+            decode_length(table[entry_start + LENGTH_DIGITS:entry_start + entry_length])
+        ))
+    return entries
+
+
+def frames_start(header_length: int) -> int:
+    """offset in the file of the first block, right after the stream header"""
+    return len(STREAM_MARKER) + LENGTH_DIGITS + header_length
+
+
+def blocks_in_range(entries: List[Tuple[int, int]], first_block_offset: int,
+                    start: int, end: int) -> List[Tuple[int, int, int]]:
+    """
+    (offset in the file, compressed length, offset in the original data)
+    of the blocks that hold the original bytes from start up to end (exclusive)
+    """
+    original_ends = list(accumulate(original_length for original_length, _ in entries))
+    compressed_ends = list(accumulate(compressed_length for _, compressed_length in entries))
+    blocks = []
+    block_idx = bisect.bisect_right(original_ends, start)
+    while block_idx < len(entries) and start < end:
+        original_offset = original_ends[block_idx] - entries[block_idx][0]
+        if original_offset >= end:
+            break
+        compressed_length = entries[block_idx][1]
+        file_offset = first_block_offset + compressed_ends[block_idx] - compressed_length
+        blocks.append((file_offset, compressed_length, original_offset))
+        block_idx += 1
+    return blocks
+
+
+def read_frame_at(file, offset: int, length: int, number_of_filters: int) -> Tuple[bytes, bytes]:
+    """read the (mask, compressed block) of the block at that offset of a seekable file"""
+    file.seek(offset)
+    frame = read_exactly(file, length)
+    mask_end = mask_length(number_of_filters)
+    if len(frame) != length or decode_length(frame[mask_end:mask_end + LENGTH_DIGITS]) != (
+            length - mask_end - LENGTH_DIGITS):
+        raise ValueError("Block table doesn't match the blocks.")
+    return frame[:mask_end], frame[mask_end + LENGTH_DIGITS:]
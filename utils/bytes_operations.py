@@ -1,13 +1,13 @@
-from typing import List
-
-def bytestring_to_bytelist(bytestring: bytes):
-    bytelist = []
-    for idx in range(len(bytestring)):
-        bytelist.append(bytestring[idx:idx+1])
-    return bytelist
-
-def bytelist_to_bytestring(bytelist: List[bytes]):
-    bytestring = b""
-    for idx in range(len(bytelist)):
-        bytestring += bytelist[idx]
-    return bytestring
\ No newline at end of file
+"""
+functions to move between bytestrings and byte buffers without copying them.
+"""
+
+
+def bytestring_to_bytelist(bytestring: bytes) -> memoryview:
+    """zero-copy view of a bytestring that can be indexed byte by byte"""
+    return memoryview(bytestring)
+
+
+def bytelist_to_bytestring(bytelist) -> memoryview:
+    """zero-copy view of a byte buffer (bytearray, memoryview or uint8 array)"""
+    return memoryview(bytelist)
@@ -0,0 +1,78 @@
+"""
+functions to match a kernel against a whole byte buffer using numpy.
+"""
+from typing import List
+
+import numpy as np
+
+
+def buffer_as_array(buffer) -> np.ndarray:
+    """zero-copy uint8 view of a bytes-like buffer"""
+    return np.frombuffer(buffer, dtype=np.uint8)
+
+
+def kernel_literal_mask(kernel: bytes, wildcard_byte: bytes) -> np.ndarray:
+    """boolean mask that is True where the kernel byte isn't the wildcard"""
+    kernel_array = buffer_as_array(kernel)
+    if not wildcard_byte:
+        return np.ones(len(kernel_array), dtype=bool)
+    return kernel_array != wildcard_byte[0]
+
+
+def find_candidate_positions(data: np.ndarray, kernel: bytes, wildcard_byte: bytes) -> np.ndarray:
+    """
+    Positions where every literal byte of the kernel matches the data.
+    Like the original scan, the last window (len(data) - kernel size) is never tested.
+    """
+    kernel_array = buffer_as_array(kernel)
+    windows = len(data) - len(kernel_array)
+    if windows <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    match_mask = np.ones(windows, dtype=bool)
+    literal_mask = kernel_literal_mask(kernel, wildcard_byte)
+    for kernel_idx in np.flatnonzero(literal_mask):
+        match_mask &= data[kernel_idx:kernel_idx + windows] == kernel_array[kernel_idx]
+    return np.flatnonzero(match_mask)
+
+
+def filter_candidate_positions(data: np.ndarray, candidates: np.ndarray, kernel: bytes,
+                               wildcard_byte: bytes) -> np.ndarray:
+    """
+    Keep the candidate positions (sorted) where every literal byte of the kernel
+    matches the data, testing the same windows as find_candidate_positions
+    """
+    kernel_array = buffer_as_array(kernel)
+    windows = len(data) - len(kernel_array)
+    candidates = candidates[(candidates >= 0) & (candidates < windows)]
+
+    literal_mask = kernel_literal_mask(kernel, wildcard_byte)
+    for kernel_idx in np.flatnonzero(literal_mask):
+        candidates = candidates[data[candidates + kernel_idx] == kernel_array[kernel_idx]]
+    return candidates
+
+
+def select_non_overlapping(candidates: np.ndarray, kernel_size: int) -> List[int]:
+    """
+    Greedy left-to-right selection of candidates
+    so that no two selected matches overlap
+    """
+    if len(candidates) == 0:
+        return []
+    if np.all(np.diff(candidates) >= kernel_size):
+        return candidates.tolist()
+
+    matches = []
+    next_free_idx = -1
+    for candidate in candidates.tolist():
+        if candidate >= next_free_idx:
+            matches.append(candidate)
+            next_free_idx = candidate + kernel_size
+    return matches
+
+
+def convolve_numpy(buffer, kernel: bytes, wildcard_byte: bytes) -> List[int]:
+    """Find the same non-overlapping matches as Convpress' byte by byte scan"""
+    candidates = find_candidate_positions(
+        buffer_as_array(buffer), kernel, wildcard_byte)
+    return select_non_overlapping(candidates, len(kernel))
@@ -0,0 +1,29 @@
+"""
+functions to work out which bytes of the data the filters' matches cover.
+Coverage is kept sparse: one array of covered positions per filter.
+"""
+from typing import List
+
+import numpy as np
+
+from utils.convolution import kernel_literal_mask
+
+
+def covered_positions(matches: List[int], kernel: bytes, wildcard_byte: bytes) -> np.ndarray:
+    """
+    Sorted positions covered by the matches of a kernel
+    (bytes under the kernel's wildcards aren't covered)
+    """
+    literal_offsets = np.flatnonzero(kernel_literal_mask(kernel, wildcard_byte))
+    match_positions = np.asarray(matches, dtype=np.intp)
+    return (match_positions[:, None] + literal_offsets).ravel()
+
+
+def sum_per_filter(values: np.ndarray, positions_per_filter: List[np.ndarray]) -> np.ndarray:
+    """
+    Sum values that were gathered for the concatenated positions of all filters
+    back into one total per filter
+    """
+    lengths = [len(positions) for positions in positions_per_filter]
+    filter_ids = np.repeat(np.arange(len(lengths)), lengths)
+    return np.bincount(filter_ids, weights=values, minlength=len(lengths))
@@ -1,7 +1,7 @@
 """
 functions to map values from one domain to another.
 """
-import math
+import numpy as np
 
 def map_easein(percentage: float) -> float:
     """
@@ -10,5 +10,6 @@ def map_easein(percentage: float) -> float:
     but mapped to a growing curve.
     Values closer to zero get valuyes closer to zero
     and ramp up fast when it's closer to 1.
+    Also works on numpy arrays of percentages.
     """
-    return math.cos(math.radians(-90 + percentage * 90))
+    return np.cos(np.radians(-90 + percentage * 90))
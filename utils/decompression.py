@@ -0,0 +1,182 @@
+"""
+functions to expand compressed data back into the original bytes using numpy.
+
+Every filter byte (code) found in the compressed data is replaced by its kernel.
+The bytes under the kernel's wildcards weren't removed by the compression,
+so they are the bytes that follow the code and are moved into the wildcard slots.
+Filters are expanded in the reverse order they were applied when compressing.
+"""
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def kernel_slots(code: int, kernel: bytes, wildcard_byte: bytes):
+    """
+    Split a kernel into the bytes written for every occurrence of its code
+    and the positions that are filled with the bytes following the code.
+    A wildcard in the first position keeps the code itself, as it always did.
+    """
+    kernel_values = np.frombuffer(kernel, dtype=np.uint8).copy()
+    literal_mask = np.ones(len(kernel_values), dtype=bool)
+    if wildcard_byte:
+        literal_mask = kernel_values != wildcard_byte[0]
+    if not literal_mask[0]:
+        kernel_values[0] = code
+        literal_mask[0] = True
+    literal_positions = np.flatnonzero(literal_mask)
+    return literal_positions, kernel_values[literal_positions], np.flatnonzero(~literal_mask)
+
+
+def extra_bytes_table(table: Dict[int, bytes], wildcard_byte: bytes) -> np.ndarray:
+    """256-entry table of how many bytes each code adds when it's expanded"""
+    extra = np.zeros(256, dtype=np.int64)
+    for code, kernel in table.items():
+        _, _, wildcard_positions = kernel_slots(code, kernel, wildcard_byte)
+        extra[code] = len(kernel) - 1 - len(wildcard_positions)
+    return extra
+
+
+def expanded_length(data: np.ndarray, groups: List[List[int]], table: Dict[int, bytes],
+                    wildcard_byte: bytes) -> int:
+    """
+    Exact length of the decompressed data, worked out from how many times
+    every byte value occurs after each pass (kernels may hold codes of a later pass),
+    so it's known from the data before any buffer is allocated.
+    """
+    counts = [int(count) for count in np.bincount(data, minlength=256)]
+    for group in groups:
+        occurrences = [counts[code] for code in group]
+        for code in group:
+            counts[code] = 0
+        for code, occurrence_count in zip(group, occurrences):
+            if occurrence_count == 0:
+                continue
+            _, literal_values, _ = kernel_slots(code, table[code], wildcard_byte)
+            for value in literal_values.tolist():
+                counts[value] += occurrence_count
+    return sum(counts)
+
+
+def group_codes_for_expansion(codes: List[int], table: Dict[int, bytes],
+                              wildcard_byte: bytes) -> List[List[int]]:
+    """
+    Group codes (in the reverse order they were applied) that can be expanded
+    in the same pass. Kernels without wildcards don't take any following bytes,
+    so consecutive ones are expanded together. Kernels with wildcards
+    get a pass of their own, because the bytes in their wildcard slots
+    may be codes that must only be expanded afterwards.
+    """
+    groups: List[List[int]] = []
+    can_join_last_group = False
+    for code in reversed(codes):
+        kernel = table[code]
+        has_wildcards = len(kernel_slots(code, kernel, wildcard_byte)[2]) > 0
+        has_codes = any(kernel_byte in table for kernel_byte in kernel)
+        can_join = not has_wildcards and not has_codes
+        if can_join and can_join_last_group:
+            groups[-1].append(code)
+        else:
+            groups.append([code])
+        can_join_last_group = can_join
+    return groups
+
+
+def expand_codes(source: np.ndarray, target: np.ndarray, group: List[int],
+                 table: Dict[int, bytes], wildcard_byte: bytes) -> Optional[int]:
+    """
+    Expand every occurrence of the codes in the group from source into target
+    in one pass over the source and return how many bytes were written
+    (None when none of the codes are in the source).
+    Where each byte goes is its position plus the bytes added by the codes before it
+    (an exclusive prefix sum), so the pass is linear in the length of the source.
+    """
+    is_code = np.zeros(256, dtype=bool)
+    is_code[group] = True
+    extra = extra_bytes_table({code: table[code] for code in group}, wildcard_byte)
+
+    positions = np.flatnonzero(is_code[source])
+    if len(positions) == 0:
+        return None
+
+    # where every byte of the source goes in the target
+    # (int32 when the target is small enough, it's half the memory traffic)
+    index_type = np.int32 if len(target) < 2**31 else np.int64
+    added = extra.astype(index_type)[source]
+    destinations = np.cumsum(added, dtype=index_type)
+    output_length = len(source) + int(destinations[-1])
+    destinations -= added
+    destinations += np.arange(len(source), dtype=index_type)
+    del added
+
+    # every byte is copied first, then the kernels are written over the codes
+    # and the bytes that went in their wildcard slots (those are inside the kernels)
+    target[destinations] = source
+
+    starts = destinations[positions]
+    occurrence_codes = source[positions]
+    for code in group:
+        selected = occurrence_codes == code
+        if not np.any(selected):
+            continue
+        literal_positions, literal_values, wildcard_positions = kernel_slots(
+            code, table[code], wildcard_byte)
+
+        code_starts = starts[selected]
+        target[code_starts[:, None] + literal_positions] = literal_values
+
+        if len(wildcard_positions) > 0:
+            payload = positions[selected][:, None] + 1 + np.arange(len(wildcard_positions))
+            if payload[-1, -1] >= len(source):
+                raise ValueError("Data ends in the middle of a filter's wildcards.")
+            target[code_starts[:, None] + wildcard_positions] = source[payload]
+
+    return output_length
+
+
+def decompress_buffer(data, codes: List[bytes], kernels: List[bytes],
+                      wildcard_byte: bytes, output_length: int = None) -> bytearray:
+    """
+    Decompress data that was compressed with the filters given in the order
+    they were applied (the order they are written in the header).
+    The output length is worked out from the data first (and has to be the one
+    the header says, if it has one), then the passes ping-pong
+    between two preallocated buffers of that size.
+    """
+    source = np.frombuffer(data, dtype=np.uint8)
+    table: Dict[int, bytes] = {}
+    for code, kernel in zip(codes, kernels):
+        table.setdefault(code[0], kernel)
+    applied_codes = list(dict.fromkeys(code[0] for code in codes))
+    groups = group_codes_for_expansion(applied_codes, table, wildcard_byte)
+
+    # checked before allocating, a corrupt header can claim any length
+    length_of_data = expanded_length(source, groups, table, wildcard_byte)
+    if output_length is not None and output_length != length_of_data:
+        raise ValueError("Data doesn't expand to the original length in the header.")
+    if length_of_data > sys.maxsize:
+        raise ValueError("Data expands past the largest possible length.")
+    output_length = length_of_data
+    buffers = [bytearray(output_length), bytearray(output_length)]
+    arrays = [np.frombuffer(buffer, dtype=np.uint8) for buffer in buffers]
+
+    current = 0
+    arrays[current][:len(source)] = source
+    length = len(source)
+    for group in groups:
+        try:
+            written = expand_codes(
+                arrays[current][:length], arrays[1 - current], group, table, wildcard_byte)
+        except IndexError as exception:
+            raise ValueError("Data expands past its original length.") from exception
+        if written is None:
+            continue
+        length = written
+        current = 1 - current
+
+    if length != output_length:
+        raise ValueError("Data doesn't match the filters in the header.")
+
+    del arrays
+    return buffers[current]
@@ -0,0 +1,44 @@
+"""
+functions to load whole files in bulk instead of byte by byte.
+"""
+import mmap
+import os
+
+import numpy as np
+
+
+def read_into_bytearray(file) -> bytearray:
+    """
+    Read the whole file into one preallocated bytearray.
+    Falls back to a plain read() when the size can't be known (pipes, stdin).
+    """
+    try:
+        size = os.fstat(file.fileno()).st_size - file.tell()
+    except (AttributeError, OSError, ValueError):
+        return bytearray(file.read())
+
+    buffer = bytearray(max(size, 0))
+    bytes_read = file.readinto(buffer) if size > 0 else 0
+    if bytes_read != size:
+        del buffer[bytes_read:]
+    rest = file.read()
+    if rest:
+        buffer += rest
+    return buffer
+
+
+def map_file(file) -> memoryview:
+    """
+    Memory-map the whole file read-only and return a view of it.
+    Files that can't be mapped (empty files, pipes) are read instead.
+    """
+    try:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        return memoryview(file.read())
+    return memoryview(mapped)
+
+
+def byte_histogram(buffer) -> np.ndarray:
+    """count how many times each of the 256 byte values shows up in the buffer"""
+    return np.bincount(np.frombuffer(buffer, dtype=np.uint8), minlength=256)
@@ -0,0 +1,35 @@
+"""
+functions to write output files in one go, without leaving half-written files behind.
+"""
+import os
+import tempfile
+from typing import Iterable
+
+
+def current_umask() -> int:
+    """get the process umask (it can only be read by setting it)"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def write_atomically(path: str, chunks: Iterable) -> None:
+    """
+    Write all chunks (bytes, bytearrays or memoryviews) to a temporary file
+    in the same directory and rename it over the path once it's complete.
+    If anything fails (or the job is killed) the path is left untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            temp_file.writelines(chunks)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.chmod(temp_path, 0o666 & ~current_umask())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
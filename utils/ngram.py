@@ -0,0 +1,78 @@
+"""
+functions to count which n-grams (and gapped n-grams) occur the most in the data,
+used to seed the first generation with kernels that are known to match.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from utils.convolution import buffer_as_array
+
+
+def gap_patterns(size: int) -> List[np.ndarray]:
+    """
+    Offsets of the literal bytes for a kernel of that size:
+    one without wildcards and one for every single wildcard
+    (never at the ends, like ConvFilter.randomize_from_list)
+    """
+    patterns = [np.arange(size)]
+    for gap_idx in range(1, size - 1):
+        patterns.append(np.delete(np.arange(size), gap_idx))
+    return patterns
+
+
+def window_keys(data: np.ndarray, size: int, literal_offsets: np.ndarray) -> np.ndarray:
+    """
+    One comparable key per window of the data, made of the window's literal bytes:
+    packed in an integer when they fit, otherwise a raw bytes view
+    """
+    windows = len(data) - size + 1
+    columns = [data[offset:offset + windows] for offset in literal_offsets]
+    if len(columns) <= 8:
+        keys = np.zeros(windows, dtype=np.uint64)
+        for column in columns:
+            keys = (keys << np.uint64(8)) | column
+        return keys
+    stacked = np.ascontiguousarray(np.stack(columns, axis=1))
+    return stacked.view(np.dtype((np.void, len(columns)))).ravel()
+
+
+def count_ngrams(buffer, size: int, literal_offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count every distinct (gapped) n-gram of the data, overlaps included.
+    Returns the position where each one first occurs and how many times it occurs.
+    """
+    data = buffer_as_array(buffer)
+    if len(data) < size:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    _, first_positions, counts = np.unique(
+        window_keys(data, size, literal_offsets), return_index=True, return_counts=True)
+    return first_positions, counts
+
+
+def top_ngram_kernels(buffer, sizes: range, wildcard_byte: bytes, how_many: int) -> List[bytes]:
+    """
+    The kernels (with wildcard_byte in their gaps) that would save the most bytes,
+    estimated as occurrences * (literal bytes - 1) because every match
+    is replaced by a single byte
+    """
+    candidates = []
+    for size in sizes:
+        for literal_offsets in gap_patterns(size):
+            if len(literal_offsets) < size and not wildcard_byte:
+                continue
+            first_positions, counts = count_ngrams(buffer, size, literal_offsets)
+            gains = counts * (len(literal_offsets) - 1)
+            for idx in np.argsort(-gains, kind="stable")[:how_many]:
+                if counts[idx] < 2:
+                    break
+                candidates.append((int(gains[idx]), int(first_positions[idx]), size, literal_offsets))
+
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    kernels = []
+    for _, position, size, literal_offsets in candidates[:how_many]:
+        kernel = bytearray(wildcard_byte * size if wildcard_byte else bytes(size))
+        for offset in literal_offsets:
+            kernel[offset] = buffer[position + offset]
+        kernels.append(bytes(kernel))
+    return kernels
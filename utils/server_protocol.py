@@ -0,0 +1,100 @@
+"""
+functions to send requests to the compression server and read its answers.
+Every message is a json header and a payload, each one after its length
+written like the lengths of a block stream (LENGTH_DIGITS ascii digits).
+"""
+import asyncio
+import json
+import socket
+from typing import Dict, Tuple
+
+from utils.block_stream import LENGTH_DIGITS
+from utils.streaming import read_exactly
+
+
+class ProtocolError(Exception):
+    """Error for when a message isn't what was expected"""
+
+
+def encode_message(header: Dict, payload: bytes = b"") -> bytes:
+    """a message: the json header and the payload, each after its length"""
+    header_bytes = json.dumps(header).encode("utf-8")
+    return b"".join([
+        f"{len(header_bytes):0{LENGTH_DIGITS}}".encode("latin1"), header_bytes,
+        f"{len(payload):0{LENGTH_DIGITS}}".encode("latin1"), payload
+    ])
+
+
+def decode_length(digits: bytes) -> int:
+    """read a length of a message"""
+    if len(digits) != LENGTH_DIGITS or not digits.isdigit():
+        raise ProtocolError("Message is truncated or corrupted.")
+    return int(digits)
+
+
+def decode_header(header_bytes: bytes) -> Dict:
+    """read the json header of a message"""
+    try:
+        header = json.loads(header_bytes.decode("utf-8"))
+    except ValueError as exception:
+        raise ProtocolError("Message header isn't valid json.") from exception
+    if not isinstance(header, dict):
+        raise ProtocolError("Message header isn't a json object.")
+    return header
+
+
+async def read_header(reader: asyncio.StreamReader) -> Dict:
+    """
+    read the header of the next message (None if the connection was closed before it),
+    the payload is left to be read with read_payload
+    """
+    try:
+        digits = await reader.readexactly(LENGTH_DIGITS)
+    except asyncio.IncompleteReadError as exception:
+        if len(exception.partial) == 0:
+            return None
+        raise ProtocolError("Message is truncated or corrupted.") from exception
+    try:
+        return decode_header(await reader.readexactly(decode_length(digits)))
+    except asyncio.IncompleteReadError as exception:
+        raise ProtocolError("Message is truncated or corrupted.") from exception
+
+
+async def read_payload_length(reader: asyncio.StreamReader) -> int:
+    """read the length of the payload that follows a header"""
+    try:
+        return decode_length(await reader.readexactly(LENGTH_DIGITS))
+    except asyncio.IncompleteReadError as exception:
+        raise ProtocolError("Message is truncated or corrupted.") from exception
+
+
+async def read_payload(reader: asyncio.StreamReader, length: int) -> bytes:
+    """read a payload of that length"""
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError as exception:
+        raise ProtocolError("Message is truncated or corrupted.") from exception
+
+
+def read_message(file) -> Tuple[Dict, bytes]:
+    """read a whole message from a file (like a socket's makefile("rb"))"""
+    header = decode_header(read_exactly(file, decode_length(read_exactly(file, LENGTH_DIGITS))))
+    payload_length = decode_length(read_exactly(file, LENGTH_DIGITS))
+    payload = read_exactly(file, payload_length)
+    if len(payload) != payload_length:
+        raise ProtocolError("Message is truncated or corrupted.")
+    return header, payload
+
+
+def send_request(socket_path: str, operation: str, payload: bytes = b"",
+                 params: Dict = None, timeout: float = None) -> Tuple[Dict, bytes]:
+    """
+    send one request to the server listening on the unix socket
+    and wait for its answer, returns the answer's header and payload
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        connection.sendall(encode_message({"op": operation, "params": params or {}}, payload))
+        with connection.makefile("rb") as answer:
+            return read_message(answer)
@@ -0,0 +1,124 @@
+"""
+functions to read and write data block by block, so only a few blocks are in memory at a time.
+"-" stands for stdin/stdout, so the tools can be used in shell pipelines.
+"""
+import contextlib
+import queue
+import sys
+import threading
+from typing import Iterable, Iterator
+
+from utils.file_writing import write_atomically
+
+
+def read_exactly(file, size: int) -> bytes:
+    """read size bytes (pipes can return less per read), fewer only at the end of the file"""
+    chunks = []
+    missing = size
+    while missing > 0:
+        chunk = file.read(missing)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        missing -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_blocks(file, block_size: int) -> Iterator[bytes]:
+    """read the file in blocks of block_size bytes (the last one can be shorter)"""
+    while True:
+        block = read_exactly(file, block_size)
+        if not block:
+            return
+        yield block
+        if len(block) < block_size:
+            return
+
+
+def peek_bytes(file, size: int) -> bytes:
+    """
+    look at the first bytes of a buffered file without consuming them
+    (works for stdin too, which can't seek back)
+    """
+    if hasattr(file, "peek"):
+        return file.peek(size)[:size]
+    position = file.tell()
+    data = file.read(size)
+    file.seek(position)
+    return data
+
+
+def prefetch(items: Iterable, depth: int = 1) -> Iterator:
+    """
+    Produce the items in a background thread, up to depth items ahead,
+    so reading the next block overlaps with processing the current one.
+    Errors are raised in the consumer, in order.
+    """
+    finished = object()
+    produced: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                produced.put((item, None))
+            produced.put((finished, None))
+        except BaseException as exception:  # pylint: disable=broad-except
+            produced.put((finished, exception))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, exception = produced.get()
+            if exception is not None:
+                raise exception
+            if item is finished:
+                return
+            yield item
+    finally:
+        # the producer stops at its next item, a waiting put is unblocked by taking its item
+        stop.set()
+        try:
+            produced.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def slice_blocks(blocks: Iterable, start: int, end: int = None) -> Iterator[memoryview]:
+    """
+    the bytes from start up to end (exclusive, None for the end) of the data made by
+    the blocks one after the other, stopping as soon as end is reached
+    """
+    block_offset = 0
+    for block in blocks:
+        if end is not None and block_offset >= end:
+            return
+        block_end = block_offset + len(block)
+        if block_end > start:
+            yield memoryview(block)[
+                max(start - block_offset, 0):None if end is None else end - block_offset]
+        block_offset = block_end
+
+
+def messages_to_stderr(output_path: str):
+    """
+    context in which prints go to stderr when the output is "-",
+    so progress messages don't end up mixed with the data on stdout
+    """
+    if output_path == "-":
+        return contextlib.redirect_stdout(sys.stderr)
+    return contextlib.nullcontext()
+
+
+def write_output(path: str, chunks: Iterable) -> None:
+    """write the chunks to stdout if the path is "-", otherwise to the file, atomically"""
+    if path == "-":
+        # the real stdout, even while prints are redirected by messages_to_stderr
+        output = sys.__stdout__.buffer
+        output.writelines(chunks)
+        output.flush()
+        return
+    write_atomically(path, chunks)
@@ -0,0 +1,35 @@
+"""
+functions to replace kernel matches in a byte buffer by the byte representing the filter.
+"""
+from typing import List
+
+import numpy as np
+
+from utils.convolution import buffer_as_array, kernel_literal_mask
+
+
+def substitute_matches(buffer, matches: List[int], kernel: bytes,
+                       wildcard_byte: bytes, newbyte: bytes) -> bytearray:
+    """
+    Build the substituted buffer in one forward sweep:
+    the first byte of every match becomes the newbyte,
+    the other literal bytes of the match are dropped
+    and the bytes under the kernel's wildcards are kept.
+    Matches must be sorted and must not overlap (as convolve returns them).
+    """
+    data = buffer_as_array(buffer)
+    positions = np.asarray(matches, dtype=np.intp)
+
+    removed_offsets = np.flatnonzero(kernel_literal_mask(kernel, wildcard_byte)[1:]) + 1
+    keep = np.ones(len(data), dtype=bool)
+    keep[(positions[:, None] + removed_offsets).ravel()] = False
+
+    substituted = bytearray(int(np.count_nonzero(keep)))
+    substituted_array = buffer_as_array(substituted)
+    np.compress(keep, data, out=substituted_array)
+
+    # every match before removed the same number of bytes
+    substituted_array[positions - np.arange(len(positions)) * len(removed_offsets)] = newbyte[0]
+
+    del substituted_array
+    return substituted
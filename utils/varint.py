@@ -0,0 +1,32 @@
+"""
+functions to write and read unsigned integers as LEB128 varints:
+7 bits per byte, the high bit set on every byte but the last.
+"""
+from typing import Tuple
+
+
+def encode_varint(value: int) -> bytes:
+    """the varint bytes for a non negative integer"""
+    if value < 0:
+        raise ValueError("Varints can't be negative.")
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append((value & 0x7f) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def decode_varint(data, offset: int) -> Tuple[int, int]:
+    """read the varint at the offset and return it with the offset right after it"""
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Varint is truncated.")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7